@@ -0,0 +1,23 @@
+# Combined entry point: all four routers in one FastAPI app behind one Mangum
+# handler, so every route shares a single warm container, the tenant engine
+# registry and the in-process caches. Deploy with serverless.combined.yml; the
+# per-router lambdas keep working unchanged.
+from fastapi import FastAPI
+from masterdata_lambda.router import router as masterdata_router
+from masterdata_lambda.calculation_router import router as calculation_router
+from networkflow_lambda.router import router as networkflow_router
+from tenant_lambda.router import router as tenant_router
+from user_role_permission_lambda.router import router as user_router
+
+app = FastAPI()
+app.include_router(masterdata_router)
+app.include_router(calculation_router)
+app.include_router(networkflow_router)
+app.include_router(tenant_router)
+app.include_router(user_router)
+
+from mangum import Mangum
+handler = Mangum(app)
+
+# SQS trigger for asynchronous tenant provisioning (TENANT_JOB_QUEUE=sqs)
+from tenant_lambda.jobs import worker_handler
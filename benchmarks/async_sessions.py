@@ -0,0 +1,140 @@
+"""
+Requests per second for sync and async tenant sessions under uvicorn. PostgreSQL.
+
+    python -m benchmarks.async_sessions --tenant acme [--clients 50 200] [--duration 10]
+
+Serves three probe routes from a uvicorn process, each listing up to 20
+network flows of --tenant with token verification stubbed out:
+
+    /sync      def route on Depends(get_db), run in the threadpool
+    /async     async def route on Depends(get_async_db)
+    /blocking  async def route on Depends(get_db), as create_network_flow was
+               before the async sessions: the query stalls the event loop
+
+An httpx client in this process keeps --clients requests in flight against
+each route for --duration seconds. Needs uvicorn, which the lambdas do not
+ship (`pip install uvicorn`), and a tenant database at the Alembic head.
+"""
+import sys
+import time
+import asyncio
+import argparse
+import multiprocessing
+from benchmarks.common import percentile
+
+ROUTES = ("sync", "async", "blocking")
+
+
+def _probe_app(tenant: str):
+    from fastapi import FastAPI, Depends
+    from sqlalchemy import select
+    from sqlalchemy.orm import Session
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from shared.db import get_db
+    from shared.async_db import get_async_db
+    from shared.models import NetworkFlow
+    from shared.security import verify_token
+
+    query = select(NetworkFlow.id).limit(20)
+    app = FastAPI()
+    app.dependency_overrides[verify_token] = lambda: {"custom:tenant_id": tenant}
+
+    @app.get("/sync")
+    def sync_probe(db: Session = Depends(get_db)):
+        return len(db.execute(query).all())
+
+    @app.get("/async")
+    async def async_probe(db: AsyncSession = Depends(get_async_db)):
+        return len((await db.execute(query)).all())
+
+    @app.get("/blocking")
+    async def blocking_probe(db: Session = Depends(get_db)):
+        return len(db.execute(query).all())
+
+    return app
+
+
+def _serve(tenant: str, port: int):
+    import uvicorn
+    uvicorn.run(_probe_app(tenant), host="127.0.0.1", port=port, log_level="warning")
+
+
+async def _load(url: str, clients: int, duration: float) -> tuple:
+    import httpx
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.get(url)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        await asyncio.gather(*(worker(client) for _ in range(clients)))
+    return latencies, errors
+
+
+async def _wait_until_up(url: str, timeout: float = 30.0):
+    import httpx
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                response = await client.get(url)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{url} answered {response.status_code}: {response.text}")
+                return
+            except httpx.TransportError:
+                if time.perf_counter() > deadline:
+                    raise
+                await asyncio.sleep(0.2)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark sync and async tenant sessions under uvicorn")
+    parser.add_argument("--tenant", required=True, help="tenant id whose database (or schema) is queried")
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per route and client count")
+    parser.add_argument("--routes", nargs="+", choices=ROUTES, default=list(ROUTES))
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        print("uvicorn is not installed: pip install uvicorn")
+        return 1
+
+    server = multiprocessing.Process(target=_serve, args=(args.tenant, args.port), daemon=True)
+    server.start()
+    try:
+        base = f"http://127.0.0.1:{args.port}"
+        for route in args.routes:
+            asyncio.run(_wait_until_up(f"{base}/{route}"))
+        for clients in args.clients:
+            print(f"{clients} concurrent clients, {args.duration:.0f} s per route")
+            for route in args.routes:
+                latencies, errors = asyncio.run(_load(f"{base}/{route}", clients, args.duration))
+                print(
+                    f"  /{route:<9} {len(latencies) / args.duration:9.1f} req/s"
+                    f"  p50 {percentile(latencies, 50) * 1000:8.1f} ms  p99 {percentile(latencies, 99) * 1000:8.1f} ms"
+                    f"  errors {errors}"
+                )
+    finally:
+        server.terminate()
+        server.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
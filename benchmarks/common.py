@@ -0,0 +1,73 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Every script runs from the repository root as `python -m benchmarks.<name>`
+and needs no AWS account. Scripts that talk to PostgreSQL read the same
+dev_* variables as the lambdas.
+"""
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# shared.security refuses to import without Cognito settings; any value works offline
+os.environ.setdefault("COGNITO_REGION", "us-east-1")
+os.environ.setdefault("COGNITO_USERPOOL_ID", "benchmark-pool")
+os.environ.setdefault("COGNITO_APP_CLIENT_ID", "benchmark-client")
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def measure(fn, repeat: int, setup=None) -> list:
+    """Seconds taken by each of repeat calls of fn; setup runs untimed before each call."""
+    durations = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def report(label: str, durations: list, items: int = 1):
+    """Print mean/p50/p99 per call and, when items > 1, items per second."""
+    mean = sum(durations) / len(durations)
+    line = (
+        f"{label:<40} mean {mean * 1000:9.3f} ms  p50 {percentile(durations, 50) * 1000:9.3f} ms"
+        f"  p99 {percentile(durations, 99) * 1000:9.3f} ms"
+    )
+    if items > 1:
+        line += f"  {items / mean:12,.0f} /s"
+    print(line)
+
+
+def sqlite_sessionmaker():
+    """Sessionmaker on a fresh in-memory SQLite database holding every model's table."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from shared.models import Base
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def seed_tables():
+    """HydraulicTables built from the seed catalogue files, without a database."""
+    from shared.hydraulics import HydraulicTables, TABLE_RESOURCES
+    from shared.masterdata import RESOURCES
+    from shared.seed_data import parse_seed_file
+    rows = {}
+    for resource_type in TABLE_RESOURCES:
+        columns = [column.name for column in RESOURCES[resource_type][0].__table__.columns]
+        rows[resource_type] = [dict(zip(columns, values)) for values in parse_seed_file(resource_type)]
+    return HydraulicTables(rows["pipe"], rows["fitting"], rows["gas"], rows["liquid"], version="seed")
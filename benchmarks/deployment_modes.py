@@ -0,0 +1,137 @@
+"""
+Cold starts and latency of the split and combined deployments under a replayed workload.
+
+    python -m benchmarks.deployment_modes [--trace requests.csv] [--hours 24] [--keepalive 600]
+
+The workload is either a CSV trace of `offset_seconds,lambda` rows, where
+lambda is one of masterdata, networkflow, tenant or userrole, or a
+synthetic one: Poisson arrivals per lambda at --rates requests per hour,
+scaled by a day/night cycle. The same request sequence is replayed twice:
+
+    split     one function per lambda (serverless.yml)
+    combined  every request goes to api_lambda (serverless.combined.yml)
+
+Lambda is simulated with one request per container. A request reuses an
+idle container of its function when one has been idle for less than
+--keepalive seconds; otherwise it cold-starts a new one. A cold request
+pays its entry point's import time, measured with `python -X importtime`
+(shared.importtime) in a fresh interpreter, on top of --warm-ms. The warm
+path runs the same code in both modes, so it is one constant here.
+"""
+import sys
+import math
+import heapq
+import argparse
+import numpy as np
+from benchmarks.common import percentile
+
+LAMBDAS = ("masterdata", "networkflow", "tenant", "userrole")
+
+
+def _synthetic(rates: dict, hours: float, rng) -> list:
+    """(offset_seconds, lambda) arrivals; the rate peaks mid-day at twice the mean and falls to zero at midnight."""
+    requests = []
+    duration = hours * 3600
+    for name, per_hour in rates.items():
+        peak = 2 * per_hour / 3600
+        t = 0.0
+        while True:
+            # Thinning: draw at the peak rate, keep each arrival with probability rate(t) / peak
+            t += rng.exponential(1 / peak) if peak else duration
+            if t >= duration:
+                break
+            if rng.random() < (1 - math.cos(2 * math.pi * t / 86400)) / 2:
+                requests.append((t, name))
+    return sorted(requests)
+
+
+def _read_trace(path: str) -> list:
+    requests = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#") or line.lower().startswith("offset"):
+                continue
+            offset, name = (part.strip() for part in line.split(",")[:2])
+            if name not in LAMBDAS:
+                raise ValueError(f"{path}:{line_number}: unknown lambda {name!r}")
+            requests.append((float(offset), name))
+    return sorted(requests)
+
+
+def replay(requests: list, function_of, cold_ms: dict, warm_ms: float, keepalive: float) -> dict:
+    """Simulate each function's containers; return per-request latencies (ms) and cold flags."""
+    idle = {}  # function -> heap of -free_at: the most recently used container is reused first
+    busy = []  # heap of (free_at, function)
+    latencies, cold = [], []
+    for t, name in requests:
+        while busy and busy[0][0] <= t:
+            free_at, function = heapq.heappop(busy)
+            heapq.heappush(idle.setdefault(function, []), -free_at)
+        function = function_of(name)
+        pool = idle.setdefault(function, [])
+        # Containers idle for longer than the keepalive have been reclaimed
+        pool[:] = [entry for entry in pool if t + entry < keepalive]
+        heapq.heapify(pool)
+        if pool:
+            heapq.heappop(pool)
+            latency, is_cold = warm_ms, False
+        else:
+            latency, is_cold = cold_ms[function] + warm_ms, True
+        heapq.heappush(busy, (t + latency / 1000, function))
+        latencies.append(latency)
+        cold.append(is_cold)
+    return {"latencies": latencies, "cold": cold}
+
+
+def _report(label: str, requests: list, result: dict):
+    latencies, cold = result["latencies"], result["cold"]
+    print(
+        f"{label:<10} {sum(cold):6} cold of {len(cold):7} ({100 * sum(cold) / max(1, len(cold)):5.2f}%)"
+        f"  p50 {percentile(latencies, 50):8.1f} ms  p99 {percentile(latencies, 99):8.1f} ms"
+    )
+    for name in LAMBDAS:
+        indices = [i for i, (_, n) in enumerate(requests) if n == name]
+        if not indices:
+            continue
+        lambda_cold = sum(cold[i] for i in indices)
+        lambda_latencies = [latencies[i] for i in indices]
+        print(
+            f"  {name:<12} {lambda_cold:6} cold of {len(indices):7} ({100 * lambda_cold / len(indices):5.2f}%)"
+            f"  p99 {percentile(lambda_latencies, 99):8.1f} ms"
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare cold starts of the split and combined deployments")
+    parser.add_argument("--trace", help="CSV of offset_seconds,lambda rows; synthetic workload when omitted")
+    parser.add_argument("--hours", type=float, default=24.0, help="length of the synthetic workload")
+    parser.add_argument(
+        "--rates", type=float, nargs=4, default=[600.0, 30.0, 2.0, 120.0], metavar=("MASTERDATA", "NETWORKFLOW", "TENANT", "USERROLE"),
+        help="mean requests per hour per lambda for the synthetic workload",
+    )
+    parser.add_argument("--keepalive", type=float, default=600.0, help="seconds an idle container is kept warm")
+    parser.add_argument("--warm-ms", type=float, default=20.0, help="handler time of a warm request")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from shared.importtime import LAMBDAS as ENTRY_POINTS, measure, total_ms
+    if args.trace:
+        requests = _read_trace(args.trace)
+    else:
+        requests = _synthetic(dict(zip(LAMBDAS, args.rates)), args.hours, np.random.default_rng(args.seed))
+    print(f"{len(requests)} requests over {(requests[-1][0] if requests else 0) / 3600:.1f} h")
+
+    cold_ms = {}
+    for name in LAMBDAS + ("api",):
+        cold_ms[name] = total_ms(measure(ENTRY_POINTS[name]))
+        print(f"  cold import {name:<12} {cold_ms[name]:8.1f} ms")
+    print()
+
+    _report("split", requests, replay(requests, lambda name: name, cold_ms, args.warm_ms, args.keepalive))
+    _report("combined", requests, replay(requests, lambda name: "api", cold_ms, args.warm_ms, args.keepalive))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Compressible gas-flow throughput in lines per second.
+
+    python -m benchmarks.gas_flow [--lines 1000 10000] [--segments 20] [--repeat 5]
+
+Lines pick random pipes with a known inner diameter from the seed
+catalogue and carry air at 5-7 bar g and 10-30 m/s at the inlet over
+50-500 m, so a share of them choke inside the line. Each line of output
+is one gas_flow call for the whole batch, isothermal and adiabatic.
+"""
+import sys
+import argparse
+import numpy as np
+from benchmarks.common import measure, report, seed_tables
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the marched compressible gas-flow calculation")
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--segments", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    from shared.gas_flow import gas_flow, GAS_FLOW_MODES
+    tables = seed_tables()
+    pipes = tables.pipes
+    usable = np.flatnonzero(pipes.inner_diameter > 0)
+    rng = np.random.default_rng(0)
+
+    for count in args.lines:
+        index = rng.choice(usable, count)
+        area = np.pi * pipes.inner_diameter[index] ** 2 / 4.0
+        flow = area * rng.uniform(10.0, 30.0, count) * 3600.0
+        pressure = rng.uniform(5.0, 7.0, count)
+        length = rng.uniform(50.0, 500.0, count)
+        lines = [
+            {"fluid": "Air", "pipe_id": pipes.ids[i], "length_m": float(l), "inlet_pressure_bar_g": float(p),
+             "inlet_temperature_in_k": 293.15, "flow_rate_m3_per_h": float(q)}
+            for i, l, p, q in zip(index, length, pressure, flow)
+        ]
+        print(f"\n{count:,} lines, {args.segments} segments, {args.repeat} runs each")
+        for mode in GAS_FLOW_MODES:
+            result = gas_flow(tables, lines, mode=mode, segments=args.segments)
+            report(f"  gas_flow {mode}", measure(
+                lambda: gas_flow(tables, lines, mode=mode, segments=args.segments), args.repeat
+            ), count)
+            print(f"    {int(result['choked'].sum()):,} of {count:,} lines choked")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
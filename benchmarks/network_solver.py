@@ -0,0 +1,70 @@
+"""
+Network solver scaling on synthetic grid and tree networks.
+
+    python -m benchmarks.network_solver [--grid 10 30 70 100 150] [--tree 1000 10000 50000] [--repeat 3]
+
+A grid of side n has n*n nodes and 2n(n-1) pipes and is fed at its four
+corners; a tree of n nodes hangs from one fixed-pressure root, each node
+attached to a random earlier one. Every pipe is the same 6 in Sch. 40 steel
+catalogue pipe, 100 m long, and every junction draws 0.5 m3/h of water.
+parse_network and solve_network are timed separately on one core.
+"""
+import sys
+import argparse
+import numpy as np
+from benchmarks.common import measure, report, seed_tables
+
+
+def _grid(side: int, pipe_id: str) -> dict:
+    def node(i, j):
+        return f"n{i}_{j}"
+    corners = {(0, 0), (0, side - 1), (side - 1, 0), (side - 1, side - 1)}
+    nodes = [
+        {"id": node(i, j), "pressure_bar_g": 5.0} if (i, j) in corners else {"id": node(i, j), "demand_m3_per_h": 0.5}
+        for i in range(side) for j in range(side)
+    ]
+    pipes = [
+        {"from": node(i, j), "to": node(i + di, j + dj), "length_m": 100.0, "pipe_id": pipe_id}
+        for i in range(side) for j in range(side) for di, dj in ((1, 0), (0, 1))
+        if i + di < side and j + dj < side
+    ]
+    return {"fluid": "Water", "nodes": nodes, "pipes": pipes}
+
+
+def _tree(count: int, pipe_id: str, rng) -> dict:
+    nodes = [{"id": "n0", "pressure_bar_g": 5.0}] + [{"id": f"n{i}", "demand_m3_per_h": 0.5} for i in range(1, count)]
+    parents = [int(rng.integers(0, i)) for i in range(1, count)]
+    pipes = [{"from": f"n{parent}", "to": f"n{i}", "length_m": 100.0, "pipe_id": pipe_id} for i, parent in enumerate(parents, 1)]
+    return {"fluid": "Water", "nodes": nodes, "pipes": pipes}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the hydraulic network solver on synthetic networks")
+    parser.add_argument("--grid", type=int, nargs="*", default=[10, 30, 70, 100, 150], help="grid sides")
+    parser.add_argument("--tree", type=int, nargs="*", default=[1000, 10000, 50000], help="tree node counts")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    from shared.network_solver import parse_network, solve_network
+    tables = seed_tables()
+    pipe_id = tables.pipes.ids[tables.pipes.index(None, "Steel (ANSI)", "Sch. 40", 150)]
+    water = tables.fluid("Water").properties(293.15, 0.0)
+    density, viscosity = float(water["density"][0]), float(water["viscosity"][0])
+    rng = np.random.default_rng(0)
+
+    cases = [(f"grid {side}x{side}", _grid(side, pipe_id)) for side in args.grid]
+    cases += [(f"tree {count:,}", _tree(count, pipe_id, rng)) for count in args.tree]
+    for label, document in cases:
+        network = parse_network(document, tables)
+        result = solve_network(network, density, viscosity)
+        print(
+            f"\n{label}: {network.node_count:,} nodes, {network.pipe_count:,} pipes, "
+            f"converged={result['converged']} in {result['iterations']} iterations"
+        )
+        report("  parse_network", measure(lambda: parse_network(document, tables), args.repeat), network.pipe_count)
+        report("  solve_network", measure(lambda: solve_network(network, density, viscosity), args.repeat), network.pipe_count)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
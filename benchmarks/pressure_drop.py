@@ -0,0 +1,62 @@
+"""
+Pressure-drop throughput in segments per second.
+
+    python -m benchmarks.pressure_drop [--segments 1000 10000 100000] [--repeat 5]
+
+Segments pick random pipes with a known inner diameter from the seed
+catalogue, carry water at 1-3 m/s and two long-radius elbows each. The
+calculate_segments line includes resolving every segment's pipe and
+fittings from the request dicts; the pressure_drop line is the vectorized
+Darcy-Weisbach core alone, for Swamee-Jain and Colebrook.
+"""
+import sys
+import argparse
+import numpy as np
+from benchmarks.common import measure, report, seed_tables
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark vectorized pressure-drop calculations")
+    parser.add_argument("--segments", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    from shared.hydraulics import calculate_segments, pressure_drop
+    tables = seed_tables()
+    pipes = tables.pipes
+    fitted = []
+    for size in np.unique(pipes.size[~np.isnan(pipes.size)]):
+        try:
+            tables.fittings.k_factor("LB", size)
+            fitted.append(size)
+        except ValueError:
+            continue
+    usable = np.flatnonzero((pipes.inner_diameter > 0) & np.isin(pipes.size, fitted))
+    water = tables.fluid("Water").properties(293.15, 0.0)
+    rng = np.random.default_rng(0)
+
+    for count in args.segments:
+        index = rng.choice(usable, count)
+        area = np.pi * pipes.inner_diameter[index] ** 2 / 4.0
+        flow = area * rng.uniform(1.0, 3.0, count)
+        length = rng.uniform(10.0, 500.0, count)
+        segments = [
+            {"pipe_id": pipes.ids[i], "length_m": float(l), "flow_rate_m3_per_h": float(q * 3600.0), "fittings": {"LB": 2}}
+            for i, l, q in zip(index, length, flow)
+        ]
+        print(f"\n{count:,} segments, {args.repeat} runs each")
+        for method in ("swamee_jain", "colebrook"):
+            report(f"  calculate_segments {method}", measure(
+                lambda: calculate_segments(tables, "Water", segments, method=method), args.repeat
+            ), count)
+            report(f"  pressure_drop core {method}", measure(
+                lambda: pressure_drop(
+                    flow, pipes.inner_diameter[index], pipes.roughness[index], length,
+                    water["density"][0], water["viscosity"][0], k_total=0.8, method=method,
+                ), args.repeat
+            ), count)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
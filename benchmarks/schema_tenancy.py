@@ -0,0 +1,123 @@
+"""
+Connections and latency with many active tenants, per TENANCY_MODE. PostgreSQL.
+
+    python -m benchmarks.schema_tenancy --mode schema [--tenants 1000] [--workers 50] [--duration 30] [--provision]
+
+One process stands in for one warm container. --workers threads pick a
+tenant at random from bench0000..bench<N-1> for every request and run
+get_db for it, as a route would, then a small query on network_flow. In
+database mode each tenant has its own database and get_db goes through the
+tenant engine registry; in schema mode each tenant has its own schema in
+TENANT_SCHEMA_DBNAME behind the single shared pool. A separate connection
+samples pg_stat_activity every 0.5 s for the connections this user holds.
+
+--provision first creates the tenants that do not exist yet through
+create_tenant_database (Alembic per schema, so 1,000 schemas take a while);
+they are left in place for the next run.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+from benchmarks.common import percentile
+
+
+def _tenant_ids(count: int) -> list:
+    return [f"bench{n:04d}" for n in range(count)]
+
+
+def _provision(tenants: list):
+    from shared.provisioning import create_tenant_database, tenant_exists
+    missing = [tenant for tenant in tenants if not tenant_exists(tenant)]
+    print(f"provisioning {len(missing)} of {len(tenants)} tenants")
+    started = time.perf_counter()
+    for n, tenant in enumerate(missing, 1):
+        create_tenant_database(tenant)
+        if n % 100 == 0:
+            print(f"  {n} provisioned in {time.perf_counter() - started:.0f} s")
+
+
+def _sample_connections(stop: threading.Event, samples: list):
+    from sqlalchemy import create_engine, text, pool
+    from shared.provisioning import _server_url
+    engine = create_engine(_server_url(os.getenv('dev_dbname')), poolclass=pool.NullPool)
+    try:
+        with engine.connect() as conn:
+            while not stop.is_set():
+                count = conn.execute(text(
+                    "SELECT count(*) FROM pg_stat_activity WHERE usename = current_user AND pid <> pg_backend_pid()"
+                )).scalar()
+                samples.append(count)
+                conn.commit()
+                stop.wait(0.5)
+    finally:
+        engine.dispose()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test tenant sessions with many tenants")
+    parser.add_argument("--mode", choices=["database", "schema"], required=True, help="TENANCY_MODE to run under")
+    parser.add_argument("--tenants", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--provision", action="store_true", help="create the missing benchmark tenants first")
+    args = parser.parse_args(argv)
+
+    # shared.config reads TENANCY_MODE at import time
+    os.environ["TENANCY_MODE"] = args.mode
+    from sqlalchemy import select, func
+    from shared.db import get_db, tenant_engines, get_schema_engine
+    from shared.models import NetworkFlow
+
+    tenants = _tenant_ids(args.tenants)
+    if args.provision:
+        _provision(tenants)
+
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.duration
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            tenant = rng.choice(tenants)
+            started = time.perf_counter()
+            sessions = get_db({"custom:tenant_id": tenant})
+            try:
+                db = next(sessions)
+                db.execute(select(func.count()).select_from(NetworkFlow)).scalar()
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+            finally:
+                sessions.close()
+
+    stop, samples = threading.Event(), []
+    sampler = threading.Thread(target=_sample_connections, args=(stop, samples), daemon=True)
+    sampler.start()
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(args.workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stop.set()
+    sampler.join()
+
+    print(f"{args.mode} mode, {args.tenants} tenants, {args.workers} workers, {args.duration:.0f} s")
+    print(
+        f"  {len(latencies) / args.duration:9.1f} req/s  p50 {percentile(latencies, 50) * 1000:8.2f} ms"
+        f"  p99 {percentile(latencies, 99) * 1000:8.2f} ms  errors {len(errors)}"
+    )
+    print(f"  server connections: max {max(samples, default=0)}, last {samples[-1] if samples else 0}")
+    if args.mode == "database":
+        print(f"  tenant_engines {tenant_engines.stats()}")
+    else:
+        print(f"  shared pool: {get_schema_engine().pool.status()}")
+    for error in sorted(set(errors))[:5]:
+        print(f"  error: {error}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+List-endpoint serialization: per-row Pydantic validation vs FAST_SERIALIZATION.
+
+    python -m benchmarks.serialization [--rows 1000 100000] [--repeat 5]
+
+GET /role/all runs through the userrole app on an in-memory SQLite database
+holding the given number of active roles, once per serialization path. The
+encode-only lines time the step each path replaces, on rows already
+fetched: RoleOut.from_orm + jsonable_encoder + json.dumps for the default
+path, select_rows + dumps for the fast one.
+"""
+import sys
+import json
+import uuid
+import argparse
+from datetime import datetime, timedelta
+from benchmarks.common import measure, report, sqlite_sessionmaker
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the default and fast list serialization paths")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.testclient import TestClient
+    import user_role_permission_lambda.router as user_router
+    from user_role_permission_lambda.main import app
+    from shared.db import get_db
+    from shared.models import Role
+    from shared.schemas import RoleOut
+    from shared.security import verify_token
+    from shared.serialization import select_rows, dumps
+
+    for rows in args.rows:
+        SessionLocal = sqlite_sessionmaker()
+        started = datetime(2025, 1, 1)
+        with SessionLocal() as db:
+            db.bulk_insert_mappings(Role, [
+                {"id": uuid.uuid4(), "name": f"role-{i}", "is_active": True, "created_at": started + timedelta(seconds=i)}
+                for i in range(rows)
+            ])
+            db.commit()
+
+        def sqlite_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = sqlite_db
+        app.dependency_overrides[verify_token] = lambda: {"custom:tenant_id": "benchmark", "sub": "benchmark"}
+        client = TestClient(app)
+
+        print(f"\n{rows:,} rows, {args.repeat} runs each")
+        for fast in (False, True):
+            user_router.FAST_SERIALIZATION = fast
+            response = client.get("/role/all")
+            assert response.status_code == 200 and len(response.json()) == rows
+            label = "  GET /role/all " + ("fast" if fast else "default")
+            report(label, measure(lambda: client.get("/role/all"), args.repeat), rows)
+
+        with SessionLocal() as db:
+            roles = db.query(Role).filter(Role.is_active == True).all()
+            report("  encode only, default", measure(
+                lambda: json.dumps(jsonable_encoder([RoleOut.from_orm(role) for role in roles])), args.repeat
+            ), rows)
+            report("  encode only, fast (incl. select)", measure(
+                lambda: dumps(select_rows(db, Role, RoleOut, Role.is_active == True)), args.repeat
+            ), rows)
+        app.dependency_overrides.clear()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Time to provision a tenant database with each TENANT_PROVISIONING_MODE. PostgreSQL.
+
+    python -m benchmarks.tenant_provisioning [--tenants 10] [--modes ddl,template]
+
+Creates --tenants throwaway databases named benchmark_<mode>_<n> per mode
+through create_tenant_database and drops each one again, untimed. The
+template is created and migrated to the Alembic head before the template
+runs start, and that one-off cost is reported on its own. Needs a role that
+may CREATE DATABASE and TENANCY_MODE=database.
+"""
+import sys
+import time
+import argparse
+from benchmarks.common import report
+
+
+def _drop_database(db_name: str):
+    from sqlalchemy import text
+    from shared.provisioning import _admin_engine
+    engine = _admin_engine()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{db_name}"'))
+    finally:
+        engine.dispose()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark tenant database provisioning per mode")
+    parser.add_argument("--tenants", type=int, default=10)
+    parser.add_argument("--modes", default="ddl,template")
+    args = parser.parse_args(argv)
+
+    from shared.config import TENANCY_MODE
+    from shared.provisioning import create_tenant_database, ensure_template_database, TENANT_TEMPLATE_DB
+    if TENANCY_MODE == "schema":
+        print("TENANCY_MODE=schema provisions schemas, not databases; see benchmarks.schema_tenancy")
+        return 1
+
+    modes = [mode.strip().lower() for mode in args.modes.split(",") if mode.strip()]
+    for mode in modes:
+        if mode == "template":
+            started = time.perf_counter()
+            ensure_template_database(force=True)
+            print(f"template {TENANT_TEMPLATE_DB} at the Alembic head in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        durations = []
+        for n in range(args.tenants):
+            db_name = f"benchmark_{mode}_{n}"
+            _drop_database(db_name)
+            started = time.perf_counter()
+            try:
+                create_tenant_database(db_name, mode)
+                durations.append(time.perf_counter() - started)
+            finally:
+                _drop_database(db_name)
+        report(f"{mode}, {args.tenants} tenants", durations)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
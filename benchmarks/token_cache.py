@@ -0,0 +1,106 @@
+"""
+Per-request auth cost with and without the verified-token cache.
+
+    python -m benchmarks.token_cache [--requests 2000]
+
+Tokens are RS256-signed with a throwaway key published through
+COGNITO_JWKS_FILE, so signature, expiry, audience and issuer checks run as
+they do in production without reaching Cognito. Reports verify_token on its
+own and GET /role/all through the userrole app on an in-memory SQLite
+database, each with the cache cleared before every request (cold) and kept
+(warm).
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import tempfile
+from benchmarks.common import measure, report, sqlite_sessionmaker
+
+
+def _signing_key(directory: str) -> str:
+    """Write a one-key JWKS document for a fresh RSA key and return the private key PEM."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from jose import jwk
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    public_jwk = {**jwk.construct(public_pem, "RS256").to_dict(), "kid": "benchmark", "alg": "RS256", "use": "sig"}
+    path = os.path.join(directory, "jwks.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"keys": [public_jwk]}, f)
+    os.environ["COGNITO_JWKS_FILE"] = path
+    os.environ["COGNITO_VERIFY_SIGNATURE"] = "true"
+    return private_pem
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark verify_token with and without the token cache")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        private_pem = _signing_key(directory)
+        # Imported only now: shared.security reads the JWKS settings at import time
+        from jose import jwt
+        from fastapi import Depends
+        from fastapi.testclient import TestClient
+        from shared.db import get_db
+        from shared.models import Role
+        from shared.security import verify_token, token_cache, jwks_cache, COGNITO_ISSUER, COGNITO_APP_CLIENT_ID
+        from user_role_permission_lambda.main import app
+
+        claims = {
+            "sub": str(uuid.uuid4()),
+            "custom:tenant_id": "benchmark",
+            "role": "admin",
+            "iss": COGNITO_ISSUER,
+            "aud": COGNITO_APP_CLIENT_ID,
+            "token_use": "id",
+            "exp": int(time.time()) + 3600,
+        }
+        token = jwt.encode(claims, private_pem, algorithm="RS256", headers={"kid": "benchmark"})
+        jwks_cache.refresh()
+
+        print(f"verify_token, {args.requests} calls")
+        report("  cold (cache cleared per call)", measure(lambda: verify_token(token), args.requests, token_cache.clear))
+        report("  warm", measure(lambda: verify_token(token), args.requests))
+
+        SessionLocal = sqlite_sessionmaker()
+        with SessionLocal() as db:
+            db.add(Role(id=uuid.uuid4(), name="engineer", is_active=True))
+            db.commit()
+
+        # Keeps get_db's own verify_token dependency, as the real one has
+        def sqlite_db(token: dict = Depends(verify_token)):
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = sqlite_db
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {token}"}
+        assert client.get("/role/all", headers=headers).status_code == 200
+
+        def request():
+            client.get("/role/all", headers=headers)
+
+        print(f"\nGET /role/all, {args.requests} requests")
+        report("  cold (cache cleared per request)", measure(request, args.requests, token_cache.clear))
+        report("  warm", measure(request, args.requests))
+        print(f"\ntoken_cache {token_cache.stats()}")
+        print(f"jwks_cache {jwks_cache.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
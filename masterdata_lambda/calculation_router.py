@@ -0,0 +1,115 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from shared.db import get_db
+from shared.hydraulics import hydraulic_tables, calculate_segments, size_pipes, fluid_properties, CENTIPOISE, BAR
+from shared.schemas import (
+    PressureDropRequest, PressureDropResponse, PipeSizingRequest, PipeSizingResponse,
+    FluidPropertyRequest, FluidPropertyResponse, GasFlowRequest, GasFlowResponse,
+)
+from shared.gas_flow import gas_flow
+from shared.serialization import json_response
+from shared.security import verify_token
+
+router = APIRouter()
+
+def _optional(values) -> list:
+    # NaN marks values the calculation cannot give; JSON gets null instead
+    return [None if value != value else value for value in values.tolist()]
+
+@router.post("/calculation/pressure-drop", response_model=PressureDropResponse)
+def calculate_pressure_drop(request: PressureDropRequest, db: Session = Depends(get_db), token: dict = Depends(verify_token)):
+    # Catalogue arrays come from the masterdata cache; warm containers do not query the database
+    tables = hydraulic_tables.get(db, token.get("custom:tenant_id"))
+    try:
+        result = calculate_segments(
+            tables,
+            request.fluid,
+            [segment.dict() for segment in request.segments],
+            temperature=request.temperature_in_k,
+            pressure=request.pressure_in_bar_g,
+            method=request.friction_method,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    columns = {
+        "inner_diameter_m": result["inner_diameter"].tolist(),
+        "velocity_m_per_s": result["velocity"].tolist(),
+        "reynolds": result["reynolds"].tolist(),
+        "flow_regime": result["flow_regime"].tolist(),
+        "friction_factor": result["friction_factor"].tolist(),
+        "k_total": result["k_total"].tolist(),
+        "major_loss_pa": result["major_loss"].tolist(),
+        "minor_loss_pa": result["minor_loss"].tolist(),
+        "elevation_loss_pa": result["elevation_loss"].tolist(),
+        "pressure_drop_pa": result["pressure_drop"].tolist(),
+    }
+    names = list(columns)
+    segments = [dict(zip(names, values)) for values in zip(*columns.values())]
+    return json_response({"fluid": tables.fluid(request.fluid).name, "segments": segments})
+
+@router.post("/calculation/pipe-sizing", response_model=PipeSizingResponse)
+def calculate_pipe_sizing(request: PipeSizingRequest, db: Session = Depends(get_db), token: dict = Depends(verify_token)):
+    tables = hydraulic_tables.get(db, token.get("custom:tenant_id"))
+    try:
+        results = size_pipes(tables, [line.dict() for line in request.lines], method=request.friction_method)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response({"lines": [{"candidates": candidates} for candidates in results]})
+
+def _fluid_property_result(point: dict) -> dict:
+    # Report in the units of the gas and liquid masterdata tables
+    result = {
+        "fluid": point["fluid"],
+        "state": point["state"],
+        "in_range": point["in_range"],
+        "density_kg_per_m3": point["density"],
+        "viscosity_centipoise": point["viscosity"] / CENTIPOISE,
+    }
+    if "specific_heat_ratio" in point:
+        result["specific_heat_ratio"] = point["specific_heat_ratio"]
+    if "vapour_pressure" in point:
+        result["vapour_pressure_kpa_absolute"] = point["vapour_pressure"] / 1e3
+    return result
+
+@router.post("/calculation/fluid-properties", response_model=FluidPropertyResponse)
+def calculate_fluid_properties(request: FluidPropertyRequest, db: Session = Depends(get_db), token: dict = Depends(verify_token)):
+    tables = hydraulic_tables.get(db, token.get("custom:tenant_id"))
+    try:
+        points = fluid_properties(tables, [point.dict() for point in request.points])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response({"points": [_fluid_property_result(point) for point in points]})
+
+@router.post("/calculation/gas-flow", response_model=GasFlowResponse)
+def calculate_gas_flow(request: GasFlowRequest, db: Session = Depends(get_db), token: dict = Depends(verify_token)):
+    tables = hydraulic_tables.get(db, token.get("custom:tenant_id"))
+    try:
+        result = gas_flow(
+            tables,
+            [line.dict() for line in request.lines],
+            mode=request.mode,
+            segments=request.segments,
+            method=request.friction_method,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    columns = {
+        "mass_flow_kg_per_h": (result["mass_flow"] * 3600.0).tolist(),
+        "inner_diameter_m": result["inner_diameter"].tolist(),
+        "inlet_density_kg_per_m3": result["inlet_density"].tolist(),
+        "inlet_velocity_m_per_s": result["inlet_velocity"].tolist(),
+        "inlet_mach": result["inlet_mach"].tolist(),
+        "outlet_pressure_bar_g": _optional(result["outlet_pressure"] / BAR),
+        "outlet_temperature_k": _optional(result["outlet_temperature"]),
+        "outlet_density_kg_per_m3": _optional(result["outlet_density"]),
+        "outlet_velocity_m_per_s": _optional(result["outlet_velocity"]),
+        "outlet_mach": _optional(result["outlet_mach"]),
+        "pressure_drop_bar": _optional(result["pressure_drop"] / BAR),
+        "reynolds": result["reynolds"].tolist(),
+        "friction_factor": result["friction_factor"].tolist(),
+        "choked": result["choked"].tolist(),
+        "choke_length_m": _optional(result["choke_length"]),
+    }
+    names = list(columns)
+    lines = [dict(zip(names, values)) for values in zip(*columns.values())]
+    return json_response({"mode": request.mode, "lines": lines})
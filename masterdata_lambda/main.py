@@ -1,9 +1,11 @@
 from fastapi import FastAPI
 from shared import models, schemas, db, security
 from masterdata_lambda.router import router as masterdata_router
+from masterdata_lambda.calculation_router import router as calculation_router
 
 app = FastAPI()
 app.include_router(masterdata_router)
+app.include_router(calculation_router)
 
 from mangum import Mangum
 handler = Mangum(app)
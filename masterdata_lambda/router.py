@@ -1,29 +1,59 @@
-
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
 from sqlalchemy.orm import Session
 from shared.db import get_db
-from shared.models import Pipe, Component, Fitting, Gas, Liquid, Unit
-from shared.schemas import PipeOut, ComponentOut, FittingOut, GasOut, LiquidOut, UnitOut
-from shared.security import verify_token
+from shared.masterdata import RESOURCES, masterdata_cache, query_masterdata
+from shared.snapshots import MASTERDATA_SNAPSHOT_MODE, snapshot_store
+from shared.serialization import json_response, etag_matches
+from shared.permissions import require_permission
 
 router = APIRouter()
 
 @router.get("/masterdata/{resource_type}")
-def get_masterdata(resource_type: str, db: Session = Depends(get_db), token: dict = Depends(verify_token)):
-    # Permission check can be added here
-    model_map = {
-        "pipe": Pipe,
-        "component": Component,
-        "fitting": Fitting,
-        "gas": Gas,
-        "liquid": Liquid,
-        "unit": Unit
-    }
-    Model = model_map.get(resource_type.lower())
-    if not Model:
+def get_masterdata(
+    resource_type: str,
+    db: Session = Depends(get_db),
+    token: dict = Depends(require_permission("masterdata:read")),
+    if_none_match: str = Header(None),
+    accept_encoding: str = Header(None),
+    material: Optional[str] = None,
+    schedule_or_class: Optional[str] = None,
+    type: Optional[str] = None,
+    state: Optional[str] = None,
+    size: Optional[float] = None,
+    size_min: Optional[float] = None,
+    size_max: Optional[float] = None,
+    fields: Optional[str] = Query(None, description="Comma separated list of fields to return"),
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = Query(None, description="next_cursor value from the previous page"),
+):
+    resource_type = resource_type.lower()
+    if resource_type not in RESOURCES:
         raise HTTPException(status_code=404, detail="Resource type not found")
-    data = db.query(Model).all()
-    if(data.__len__()> 0):
-         return data
+    filters = {"material": material, "schedule_or_class": schedule_or_class, "type": type, "state": state, "size": size}
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    if any(v is not None for v in filters.values()) or any(v is not None for v in (size_min, size_max, field_list, limit, cursor)):
+        # Slices go to the indexed tables; only the full catalogue is cached
+        rows, next_cursor = query_masterdata(db, resource_type, filters, size_min, size_max, field_list, limit, cursor)
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return json_response(rows, headers=headers)
+    if MASTERDATA_SNAPSHOT_MODE:
+        snapshot = snapshot_store.get(resource_type, accept_encoding)
+        if snapshot:
+            body, encoding, etag = snapshot
+            headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers=headers)
+            if encoding != "identity":
+                headers["Content-Encoding"] = encoding
+            return Response(content=body, media_type="application/json", headers=headers)
+    # Warm containers answer from memory; the session only connects when the
+    # cached entry has to be revalidated or loaded
+    entry = masterdata_cache.get(db, token.get("custom:tenant_id"), resource_type)
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    if len(entry.rows) > 0:
+        return Response(content=entry.body, media_type="application/json", headers=headers)
     else:
         raise HTTPException(status_code=404, detail=f"No data found for resource type '{resource_type}'")
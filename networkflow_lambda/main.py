@@ -1,6 +1,6 @@
 from fastapi import FastAPI
 from shared import models, schemas, db, security
-from networkflow_lambda import router as networkflow_router
+from networkflow_lambda.router import router as networkflow_router
 
 app = FastAPI()
 app.include_router(networkflow_router)
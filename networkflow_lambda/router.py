@@ -1,57 +1,186 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from typing import Optional
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Response, status, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from shared.db import get_db
+from shared.async_db import get_async_db
 from shared.models import NetworkFlow
-from shared.schemas import NetworkFlowCreate, NetworkFlowOut
+from shared.schemas import (
+    NetworkFlowCreate, NetworkFlowOut, UploadInitiate, UploadInitiateOut, NetworkFlowUploadComplete,
+    NetworkSolveRequest, NetworkSolveResponse, NetworkScenarioBatchRequest,
+)
 from shared.security import verify_token
-import boto3
-import os
+from shared.serialization import FAST_SERIALIZATION, fast_list_response, json_response, dumps, etag_matches
+from shared.uploads import initiate_upload, complete_upload, object_url, upload_key, upload_owner
+from shared.flow_storage import store_flow_file, adopt_uploaded_flow_file, release_flow_file
 import uuid
-
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-    region_name=os.getenv('AWS_REGION')
-)
-S3_BUCKET = os.getenv('AWS_S3_BUCKET')
+import hashlib
 
 router = APIRouter()
 
+def _flow_etag(flow: NetworkFlow, *variant) -> Optional[str]:
+    # Led by the flow file's content hash; variant covers whatever else shapes the
+    # response. Rows stored before content hashing get no ETag.
+    if not flow.content_hash:
+        return None
+    digest = hashlib.sha256(repr(variant).encode()).hexdigest()[:16]
+    return f'"{flow.content_hash}-{digest}"'
+
 @router.post("/network-flow/create", response_model=NetworkFlowOut)
 async def create_network_flow(
     name: str = Form(...),
     flow_file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token: dict = Depends(verify_token)
 ):
-    user_id = token.get("user_id")
-    s3_key = f"network_flows/{user_id}_{flow_file.filename}"
-    s3_client.upload_fileobj(flow_file.file, S3_BUCKET, s3_key, ExtraArgs={"ACL": "public-read"})
-    flow_url = f"https://{S3_BUCKET}.s3.amazonaws.com/{s3_key}"
+    # Stored by content hash; identical files are only uploaded once per tenant
+    content_hash, s3_key = await store_flow_file(db, token.get("custom:tenant_id"), flow_file.file)
     new_flow = NetworkFlow(
         name=name,
-        flow_url=flow_url,
+        flow_url=object_url(s3_key),
+        content_hash=content_hash,
         is_active=True
     )
     db.add(new_flow)
-    db.commit()
-    db.refresh(new_flow)
+    await db.commit()
+    await db.refresh(new_flow)
     return new_flow
 
+@router.post("/network-flow/upload/initiate", response_model=UploadInitiateOut)
+async def initiate_network_flow_upload(body: UploadInitiate, token: dict = Depends(verify_token)):
+    key = upload_key(f"network_flows/{upload_owner(token)}", body.filename)
+    return await run_in_threadpool(initiate_upload, key, body.size, body.content_type)
+
+@router.post("/network-flow/upload/complete", response_model=NetworkFlowOut)
+async def complete_network_flow_upload(
+    body: NetworkFlowUploadComplete,
+    db: AsyncSession = Depends(get_async_db),
+    token: dict = Depends(verify_token)
+):
+    # Only keys handed out by initiate for this user can be completed
+    if not body.key.startswith(f"network_flows/{upload_owner(token)}/"):
+        raise HTTPException(status_code=403, detail="Upload key does not belong to this user")
+    parts = [p.dict() for p in body.parts] if body.parts is not None else None
+    head = await run_in_threadpool(complete_upload, body.key, body.upload_id, parts)
+    content_hash, s3_key = await adopt_uploaded_flow_file(
+        db, token.get("custom:tenant_id"), body.key, head["ContentLength"]
+    )
+    new_flow = NetworkFlow(
+        name=body.name,
+        flow_url=object_url(s3_key),
+        content_hash=content_hash,
+        is_active=True
+    )
+    db.add(new_flow)
+    await db.commit()
+    await db.refresh(new_flow)
+    return new_flow
+
+@router.get("/network-flow/all", response_model=list[NetworkFlowOut])
+def get_all_network_flows(db: Session = Depends(get_db), token: dict = Depends(verify_token)):
+    if FAST_SERIALIZATION:
+        return fast_list_response(db, NetworkFlow, NetworkFlowOut, NetworkFlow.is_active == True)
+    flows = db.query(NetworkFlow).filter(NetworkFlow.is_active == True).all()
+    return flows
+
 @router.get("/network-flow/{id}", response_model=NetworkFlowOut)
-def get_network_flow(id: uuid.UUID, db: Session = Depends(get_db), token: dict = Depends(verify_token)):
+def get_network_flow(
+    id: uuid.UUID,
+    response: Response,
+    db: Session = Depends(get_db),
+    token: dict = Depends(verify_token),
+    if_none_match: str = Header(None)
+):
+    flow = db.query(NetworkFlow).filter(NetworkFlow.id == id).first()
+    if not flow:
+        raise HTTPException(status_code=404, detail="NetworkFlow not found")
+    out = NetworkFlowOut.from_orm(flow)
+    etag = _flow_etag(flow, out.json())
+    if etag:
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+    return out
+
+@router.post("/network-flow/{id}/solve", response_model=NetworkSolveResponse)
+def solve_network_flow(
+    id: uuid.UUID,
+    request: NetworkSolveRequest = Body(None),
+    db: Session = Depends(get_db),
+    token: dict = Depends(verify_token),
+    if_none_match: str = Header(None)
+):
+    # NumPy/SciPy are imported on first solve so the other routes keep a small cold start
+    from shared.hydraulics import hydraulic_tables
+    from shared.network_cache import network_cache
+    from shared.network_solver import solve_flow_file
+    flow = db.query(NetworkFlow).filter(NetworkFlow.id == id).first()
+    if not flow:
+        raise HTTPException(status_code=404, detail="NetworkFlow not found")
+    request = request or NetworkSolveRequest()
+    tenant_id = token.get("custom:tenant_id")
+    tables = hydraulic_tables.get(db, tenant_id)
+    # The same file, catalogue and overrides give the same result, so a match skips the solve
+    etag = _flow_etag(flow, tables.version, request.json())
+    headers = {"ETag": etag, "Cache-Control": "no-cache"} if etag else None
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    try:
+        result = solve_flow_file(
+            None,
+            tables,
+            fluid=request.fluid,
+            temperature=request.temperature_in_k,
+            pressure=request.pressure_in_bar_g,
+            method=request.friction_method,
+            network=network_cache.get(tenant_id, flow, tables),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response(result, headers=headers)
+
+@router.post("/network-flow/{id}/scenarios")
+def run_network_flow_scenarios(
+    id: uuid.UUID,
+    request: NetworkScenarioBatchRequest,
+    db: Session = Depends(get_db),
+    token: dict = Depends(verify_token)
+):
+    """
+    Solve what-if variants of a stored flow. The response is NDJSON, one
+    NetworkScenarioResult per line in completion order. Mangum buffers the
+    body, so behind API Gateway the lines arrive together.
+    """
+    from shared.hydraulics import hydraulic_tables
+    from shared.network_cache import network_cache
+    from shared.scenarios import run_scenarios
     flow = db.query(NetworkFlow).filter(NetworkFlow.id == id).first()
     if not flow:
         raise HTTPException(status_code=404, detail="NetworkFlow not found")
-    return flow
+    tenant_id = token.get("custom:tenant_id")
+    tables = hydraulic_tables.get(db, tenant_id)
+    try:
+        network = network_cache.get(tenant_id, flow, tables)
+        outcomes = run_scenarios(
+            network, tables, [scenario.dict() for scenario in request.scenarios], method=request.friction_method
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse((dumps(outcome) + b"\n" for outcome in outcomes), media_type="application/x-ndjson")
 
 @router.put("/network-flow/update/{id}", response_model=NetworkFlowOut)
 def update_network_flow(id: uuid.UUID, flow: NetworkFlowCreate, db: Session = Depends(get_db), token: dict = Depends(verify_token)):
     db_flow = db.query(NetworkFlow).filter(NetworkFlow.id == id).first()
     if not db_flow:
         raise HTTPException(status_code=404, detail="NetworkFlow not found")
+    if flow.flow_url != db_flow.flow_url:
+        # Pointing the row elsewhere drops its reference to the stored file
+        release_flow_file(db, db_flow.content_hash)
+        db_flow.content_hash = None
     for k, v in flow.dict().items():
         setattr(db_flow, k, v)
     db.commit()
@@ -63,11 +192,7 @@ def delete_network_flow(id: uuid.UUID, db: Session = Depends(get_db), token: dic
     db_flow = db.query(NetworkFlow).filter(NetworkFlow.id == id).first()
     if not db_flow:
         raise HTTPException(status_code=404, detail="NetworkFlow not found")
+    release_flow_file(db, db_flow.content_hash)
     db.delete(db_flow)
     db.commit()
     return
-
-@router.get("/network-flow/all", response_model=list[NetworkFlowOut])
-def get_all_network_flows(db: Session = Depends(get_db), token: dict = Depends(verify_token)):
-    flows = db.query(NetworkFlow).filter(NetworkFlow.is_active == True).all()
-    return flows
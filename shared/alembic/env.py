@@ -47,25 +47,43 @@ def get_database_url():
     return f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{db}"
 
 
+# Schema tenancy mode: -x tenant_schema=<name> migrates that schema inside the
+# target database, keeping its alembic_version table in the schema as well
+def get_tenant_schema():
+    return context.get_x_argument(as_dictionary=True).get("tenant_schema")
+
+
 def run_migrations_offline():
     url = get_database_url()
+    schema = get_tenant_schema()
     context.configure(
         url=url,
         target_metadata=target_metadata,
         literal_binds=True,
         compare_type=True,
+        version_table_schema=schema,
     )
     with context.begin_transaction():
+        if schema:
+            context.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+            context.execute(f'SET search_path TO "{schema}"')
         context.run_migrations()
 
 def run_migrations_online():
     url = get_database_url()
     connectable = create_engine(url, poolclass=pool.NullPool)
+    schema = get_tenant_schema()
     with connectable.connect() as connection:
+        if schema:
+            connection.exec_driver_sql(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+            # Session-level, so unqualified names in every revision resolve to the tenant schema
+            connection.exec_driver_sql(f'SET search_path TO "{schema}"')
+            connection.commit()
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
             compare_type=True,
+            version_table_schema=schema,
         )
         with context.begin_transaction():
             context.run_migrations()
@@ -7,7 +7,7 @@ Create Date: 2025-07-14 23:19:38.581339
 """
 from typing import Sequence, Union
 
-from alembic import op
+from alembic import op, context
 import sqlalchemy as sa
 from sqlalchemy import inspect
 import os
@@ -103,14 +103,19 @@ def upgrade() -> None:
     sa.Column('modified_by', sa.String(length=64), nullable=True),
     sa.PrimaryKeyConstraint('id')
     ) 
-    bind = op.get_bind()
-    inspector = inspect(bind)
-    existing_tables = inspector.get_table_names()
-    db_name = bind.engine.url.database
     expected_db = os.getenv('dev_dbname') 
-    
-    if db_name == expected_db:
+    if context.is_offline_mode():
+        # No connection to inspect in --sql mode; the target URL names the database
+        db_name = sa.engine.make_url(context.get_x_argument(as_dictionary=True).get('db_url')).database
+        existing_tables = []
+    else:
+        bind = op.get_bind()
+        inspector = inspect(bind)
+        db_name = bind.engine.url.database
         existing_tables = inspector.get_table_names()
+    
+    # Tenant schemas share the global database in schema tenancy mode
+    if db_name == expected_db and not context.get_x_argument(as_dictionary=True).get('tenant_schema'):
         if 'tenant' not in existing_tables:
             op.create_table(
                 'tenant',
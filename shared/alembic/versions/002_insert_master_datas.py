@@ -6,10 +6,16 @@ Create Date: 2025-07-14 23:29:31.594026
 
 """
 from typing import Sequence, Union
+import csv
+import io
+import time
 
-from alembic import op
+from alembic import op, context
 import sqlalchemy as sa
 
+from models import Base
+from seed_data import SEED_FILES, NOW, CURRENT_USER, parse_seed_file
+
 
 # revision identifiers, used by Alembic.
 revision: str = '002'
@@ -17,27 +23,87 @@ down_revision: Union[str, Sequence[str], None] = '000'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
+# Rows per multi-row INSERT when COPY is not available
+BATCH_SIZE = 1000
+COPY_NULL = '\\N'
+
+
+def _driver_connection(conn):
+    fairy = conn.connection
+    return getattr(fairy, 'driver_connection', None) or getattr(fairy, 'connection', None)
+
+
+def _copy_rows(conn, table: sa.Table, rows: list) -> bool:
+    """Stream rows through COPY FROM STDIN; returns False if the driver cannot."""
+    driver_conn = _driver_connection(conn)
+    if conn.dialect.name != 'postgresql' or driver_conn is None:
+        return False
+    cursor = driver_conn.cursor()
+    if not hasattr(cursor, 'copy_expert'):
+        return False
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([COPY_NULL if value is None else value for value in row])
+    buffer.seek(0)
+    columns = ', '.join(f'"{column.name}"' for column in table.columns)
+    # The raw cursor shares the migration's transaction
+    cursor.copy_expert(
+        f"COPY \"{table.name}\" ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+        buffer,
+    )
+    return True
 
-def _execute_sql_file(conn, file_path: str) -> None:
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
 
-    for line in lines[:-1]:  # Skip last line (e.g., summary report)
-        line = line.strip()
-        if line and not line.startswith('--'):
-            conn.execute(sa.text(line))
+def _insert_batches(conn, table: sa.Table, rows: list) -> None:
+    names = [column.name for column in table.columns]
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = [dict(zip(names, row)) for row in rows[start:start + BATCH_SIZE]]
+        conn.execute(table.insert().values(batch))
+
+
+def _offline_insert(table_name: str, rows: list) -> None:
+    # --sql mode has no connection, so render multi-row INSERTs that keep the
+    # now()/CURRENT_USER calls from the seed files
+    table = Base.metadata.tables[table_name]
+    names = [column.name for column in table.columns]
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = []
+        for row in rows[start:start + BATCH_SIZE]:
+            values = {}
+            for name, value in zip(names, row):
+                if value is NOW:
+                    value = sa.func.now()
+                elif value is CURRENT_USER:
+                    value = sa.literal_column('CURRENT_USER')
+                values[name] = value
+            batch.append(values)
+        op.execute(table.insert().values(batch))
+
 
 def upgrade() -> None:
+    if context.is_offline_mode():
+        for table_name in SEED_FILES:
+            _offline_insert(table_name, parse_seed_file(table_name))
+        return
+
     conn = op.get_bind()
-    file_paths = [
-        'version_text_files/version01/pipe_inserts.txt',
-        'version_text_files/version01/fitting_inserts.txt',
-        'version_text_files/version01/gas_inserts.txt',
-        'version_text_files/version01/liquid_inserts.txt',
-    ]
-
-    for path in file_paths:
-        _execute_sql_file(conn, path)
+    now, current_user = conn.execute(sa.text('SELECT now(), CURRENT_USER')).one()
+    metadata = sa.MetaData()
+    for table_name in SEED_FILES:
+        started = time.perf_counter()
+        table = sa.Table(table_name, metadata, autoload_with=conn)
+        rows = [
+            [now if value is NOW else current_user if value is CURRENT_USER else value for value in row]
+            for row in parse_seed_file(table_name)
+        ]
+        method = 'COPY'
+        if not _copy_rows(conn, table, rows):
+            method = 'batched INSERT'
+            _insert_batches(conn, table, rows)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"Loaded {len(rows)} rows into {table_name} via {method} in {elapsed_ms:.1f} ms")
+
 
 def downgrade() -> None:
     pass
@@ -0,0 +1,39 @@
+"""Add master data filter indexes
+
+Revision ID: 003
+Revises: 002
+Create Date: 2025-08-04 10:12:45.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, Sequence[str], None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Every index ends with id so equality filters can walk the keyset order
+INDEXES = [
+    ('ix_pipe_material_schedule_size_id', 'pipe', ['material', 'schedule_or_class', 'size', 'id']),
+    ('ix_pipe_size_id', 'pipe', ['size', 'id']),
+    ('ix_fitting_type_size_id', 'fitting', ['type', 'size', 'id']),
+    ('ix_fitting_size_id', 'fitting', ['size', 'id']),
+    ('ix_gas_state_id', 'gas', ['state', 'id']),
+    ('ix_liquid_state_id', 'liquid', ['state', 'id']),
+    ('ix_component_material_id', 'component', ['material', 'id']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,114 @@
+"""create tenant tables
+
+Revision ID: 004
+Revises: 003
+Create Date: 2025-08-11 16:42:07.904113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op, context
+import sqlalchemy as sa
+from sqlalchemy import inspect
+import os
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, Sequence[str], None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _is_global_target(db_name) -> bool:
+    # A tenant schema may live in the global database (schema tenancy mode)
+    return db_name == os.getenv('dev_dbname') and not context.get_x_argument(as_dictionary=True).get('tenant_schema')
+
+
+def _target_database():
+    if context.is_offline_mode():
+        return sa.engine.make_url(context.get_x_argument(as_dictionary=True).get('db_url')).database, []
+    bind = op.get_bind()
+    return bind.engine.url.database, inspect(bind).get_table_names()
+
+
+def upgrade() -> None:
+    """Create the per-tenant tables; databases provisioned before this revision already have them."""
+    db_name, existing_tables = _target_database()
+    if _is_global_target(db_name):
+        return
+
+    if 'role' not in existing_tables:
+        op.create_table('role',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('name', sa.String(length=64), nullable=True),
+        sa.Column('is_active', sa.Boolean(), server_default=sa.true(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('created_by', sa.UUID(), nullable=True),
+        sa.Column('modified_at', sa.DateTime(), nullable=True),
+        sa.Column('modified_by', sa.UUID(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'permission' not in existing_tables:
+        op.create_table('permission',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('code', sa.String(length=64), nullable=True),
+        sa.Column('description', sa.String(length=256), nullable=True),
+        sa.Column('is_active', sa.Boolean(), server_default=sa.true(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('created_by', sa.UUID(), nullable=True),
+        sa.Column('modified_at', sa.DateTime(), nullable=True),
+        sa.Column('modified_by', sa.UUID(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('code')
+        )
+    if 'role_permission' not in existing_tables:
+        op.create_table('role_permission',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('role_id', sa.UUID(), nullable=True),
+        sa.Column('permission_id', sa.UUID(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('created_by', sa.UUID(), nullable=True),
+        sa.Column('modified_at', sa.DateTime(), nullable=True),
+        sa.Column('modified_by', sa.UUID(), nullable=True),
+        sa.ForeignKeyConstraint(['permission_id'], ['permission.id']),
+        sa.ForeignKeyConstraint(['role_id'], ['role.id']),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'user' not in existing_tables:
+        op.create_table('user',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('name', sa.String(length=64), nullable=True),
+        sa.Column('email', sa.String(length=64), nullable=True),
+        sa.Column('role_id', sa.UUID(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('created_by', sa.UUID(), nullable=True),
+        sa.Column('modified_at', sa.DateTime(), nullable=True),
+        sa.Column('modified_by', sa.UUID(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email')
+        )
+    if 'network_flow' not in existing_tables:
+        op.create_table('network_flow',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('name', sa.String(length=64), nullable=True),
+        sa.Column('flow_url', sa.String(length=256), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('created_by', sa.UUID(), nullable=True),
+        sa.Column('modified_at', sa.DateTime(), nullable=True),
+        sa.Column('modified_by', sa.UUID(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade() -> None:
+    db_name, _ = _target_database()
+    if _is_global_target(db_name):
+        return
+    op.drop_table('network_flow')
+    op.drop_table('user')
+    op.drop_table('role_permission')
+    op.drop_table('permission')
+    op.drop_table('role')
@@ -0,0 +1,53 @@
+"""create tenant job table
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-08-18 09:27:51.662031
+
+"""
+from typing import Sequence, Union
+
+from alembic import op, context
+import sqlalchemy as sa
+import os
+
+
+# revision identifiers, used by Alembic.
+revision: str = '005'
+down_revision: Union[str, Sequence[str], None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _is_global_database() -> bool:
+    if context.is_offline_mode():
+        db_name = sa.engine.make_url(context.get_x_argument(as_dictionary=True).get('db_url')).database
+    else:
+        db_name = op.get_bind().engine.url.database
+    return db_name == os.getenv('dev_dbname') and not context.get_x_argument(as_dictionary=True).get('tenant_schema')
+
+
+def upgrade() -> None:
+    """Tenant provisioning jobs live in the global database only."""
+    if not _is_global_database():
+        return
+    op.create_table('tenant_job',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('tenant_id', sa.String(length=128), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('stages', sa.JSON(), nullable=True),
+    sa.Column('error', sa.String(length=1024), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('created_by', sa.UUID(), nullable=True),
+    sa.Column('modified_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tenant_job_tenant_id', 'tenant_job', ['tenant_id'])
+
+
+def downgrade() -> None:
+    if not _is_global_database():
+        return
+    op.drop_index('ix_tenant_job_tenant_id', table_name='tenant_job')
+    op.drop_table('tenant_job')
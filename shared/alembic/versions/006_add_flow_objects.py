@@ -0,0 +1,64 @@
+"""add content-addressed flow objects
+
+Revision ID: 006
+Revises: 005
+Create Date: 2025-08-25 10:12:44.318206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op, context
+import sqlalchemy as sa
+from sqlalchemy import inspect
+import os
+
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, Sequence[str], None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _is_global_target(db_name) -> bool:
+    # A tenant schema may live in the global database (schema tenancy mode)
+    return db_name == os.getenv('dev_dbname') and not context.get_x_argument(as_dictionary=True).get('tenant_schema')
+
+
+def _target_database():
+    if context.is_offline_mode():
+        return sa.engine.make_url(context.get_x_argument(as_dictionary=True).get('db_url')).database, [], []
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = inspector.get_table_names()
+    flow_columns = [c['name'] for c in inspector.get_columns('network_flow')] if 'network_flow' in tables else []
+    return bind.engine.url.database, tables, flow_columns
+
+
+def upgrade() -> None:
+    """Tenant databases provisioned with DDL after this revision already have these."""
+    db_name, existing_tables, flow_columns = _target_database()
+    if _is_global_target(db_name):
+        return
+
+    if 'content_hash' not in flow_columns:
+        op.add_column('network_flow', sa.Column('content_hash', sa.String(length=64), nullable=True))
+        op.create_index('ix_network_flow_content_hash', 'network_flow', ['content_hash'])
+    if 'flow_object' not in existing_tables:
+        op.create_table('flow_object',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('s3_key', sa.String(length=256), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=True),
+        sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('sha256')
+        )
+
+
+def downgrade() -> None:
+    db_name, _, _ = _target_database()
+    if _is_global_target(db_name):
+        return
+    op.drop_table('flow_object')
+    op.drop_index('ix_network_flow_content_hash', table_name='network_flow')
+    op.drop_column('network_flow', 'content_hash')
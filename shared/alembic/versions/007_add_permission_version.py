@@ -0,0 +1,53 @@
+"""add permission version counter
+
+Revision ID: 007
+Revises: 006
+Create Date: 2025-08-27 09:41:03.527114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op, context
+import sqlalchemy as sa
+from sqlalchemy import inspect
+import os
+
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, Sequence[str], None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _is_global_target(db_name) -> bool:
+    # A tenant schema may live in the global database (schema tenancy mode)
+    return db_name == os.getenv('dev_dbname') and not context.get_x_argument(as_dictionary=True).get('tenant_schema')
+
+
+def _target_database():
+    if context.is_offline_mode():
+        return sa.engine.make_url(context.get_x_argument(as_dictionary=True).get('db_url')).database, []
+    bind = op.get_bind()
+    return bind.engine.url.database, inspect(bind).get_table_names()
+
+
+def upgrade() -> None:
+    """Tenant databases provisioned with DDL after this revision already have this table."""
+    db_name, existing_tables = _target_database()
+    if _is_global_target(db_name):
+        return
+
+    if 'permission_version' not in existing_tables:
+        op.create_table('permission_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade() -> None:
+    db_name, _ = _target_database()
+    if _is_global_target(db_name):
+        return
+    op.drop_table('permission_version')
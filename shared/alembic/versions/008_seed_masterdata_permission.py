@@ -0,0 +1,60 @@
+"""seed the masterdata:read permission
+
+Revision ID: 008
+Revises: 007
+Create Date: 2025-08-29 14:06:51.209317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op, context
+import sqlalchemy as sa
+import os
+
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, Sequence[str], None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same id in every tenant; matches TENANT_SEED_STATEMENTS in shared/provisioning.py
+MASTERDATA_READ_ID = '5f0c7d1e-2b7a-5c3e-9d41-6a8e0b3f2c17'
+
+
+def _is_global_target(db_name) -> bool:
+    # A tenant schema may live in the global database (schema tenancy mode)
+    return db_name == os.getenv('dev_dbname') and not context.get_x_argument(as_dictionary=True).get('tenant_schema')
+
+
+def _target_database():
+    if context.is_offline_mode():
+        return sa.engine.make_url(context.get_x_argument(as_dictionary=True).get('db_url')).database
+    return op.get_bind().engine.url.database
+
+
+def upgrade() -> None:
+    """Tenant databases provisioned with DDL after this revision are seeded by provisioning."""
+    if _is_global_target(_target_database()):
+        return
+
+    # Required by GET /masterdata/{resource_type} once PERMISSION_CHECKS is on
+    op.execute(
+        "INSERT INTO permission (id, code, description, is_active, created_at) "
+        f"VALUES ('{MASTERDATA_READ_ID}', 'masterdata:read', 'Read masterdata', TRUE, now()) "
+        "ON CONFLICT (code) DO NOTHING"
+    )
+    # Warm containers recompile their cached permission sets
+    op.execute(
+        "INSERT INTO permission_version (id, version) VALUES (1, 1) "
+        "ON CONFLICT (id) DO UPDATE SET version = permission_version.version + 1"
+    )
+
+
+def downgrade() -> None:
+    if _is_global_target(_target_database()):
+        return
+    op.execute(
+        f"DELETE FROM permission WHERE id = '{MASTERDATA_READ_ID}' "
+        f"AND NOT EXISTS (SELECT 1 FROM role_permission WHERE permission_id = '{MASTERDATA_READ_ID}')"
+    )
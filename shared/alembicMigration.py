@@ -1,29 +1,315 @@
 # Alembic migration helpers
+#
+# Upgrade every tenant database from the repository root with:
+#
+#     python -m shared.alembicMigration --workers 8 --timeout 600
+#
+# Progress is written to a JSON file after every tenant, so an interrupted
+# run resumes where it stopped. --dry-run writes the offline SQL per tenant
+# instead of applying it. With TENANCY_MODE=schema each tenant is a schema in
+# TENANT_SCHEMA_DBNAME and the names listed are schema names.
 import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from multiprocessing.connection import wait
+from collections import deque
+from datetime import datetime
 from alembic.config import Config
 from alembic import command
-from dotenv import load_dotenv
-from shared.secrets import get_secret
+from alembic.script import ScriptDirectory
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, text, pool
+from shared.config import TENANCY_MODE, TENANT_SCHEMA_DBNAME, tenant_schema_name
 
 
-load_dotenv()
-def run_alembic_upgrade(db_name: str, revision: str = "head"):
-    print(f"Running Alembic migrations for database: {db_name} with revision: {revision}...")
-    """
-    Run Alembic migrations for the given tenant database name.
-    Constructs the full DB URL using environment values.
-    """
-    db_url = (
+SHARED_DIR = os.path.dirname(os.path.abspath(__file__))
+ALEMBIC_INI = os.path.join(SHARED_DIR, "alembic.ini")
+DEFAULT_PROGRESS_FILE = "migration_progress.json"
+DEFAULT_SQL_DIR = "migration_sql"
+# Seconds an upgrade run from inside a service may take before it is terminated
+MIGRATION_TIMEOUT = float(os.getenv('MIGRATION_TIMEOUT', '120'))
+
+
+def build_db_url(db_name: str) -> str:
+    return (
         f"postgresql+psycopg2://{os.getenv('dev_username')}:{os.getenv('dev_password')}"
         f"@{os.getenv('dev_host')}:{os.getenv('dev_port')}/{db_name}"
     )
 
-    alembic_cfg = Config("shared/alembic.ini")  # path relative to your current working dir
-    alembic_cfg.set_main_option("sqlalchemy.url", db_url)
 
-    # Optional: if you use -x options in env.py
-    alembic_cfg.cmd_opts = type('obj', (object,), {'x': [f'db_url={db_url}']})
+def get_alembic_config(db_url: str, schema: str = None) -> Config:
+    alembic_cfg = Config(ALEMBIC_INI)
+    # Absolute, so migrations run from any working directory
+    alembic_cfg.set_main_option("script_location", os.path.join(SHARED_DIR, "alembic"))
+    # Revisions import models/seed_data as top-level modules
+    alembic_cfg.set_main_option("prepend_sys_path", SHARED_DIR)
+    alembic_cfg.set_main_option("sqlalchemy.url", db_url.replace("%", "%%"))
+    # env.py reads the target database from -x db_url=... and the tenant schema from -x tenant_schema=...
+    x_args = [f'db_url={db_url}']
+    if schema:
+        x_args.append(f'tenant_schema={schema}')
+    alembic_cfg.cmd_opts = type('obj', (object,), {'x': x_args})
+    return alembic_cfg
+
+
+def resolve_revision(revision: str = "head") -> str:
+    script = ScriptDirectory.from_config(get_alembic_config(build_db_url(os.getenv('dev_dbname', ''))))
+    return script.get_revision(revision).revision
+
+
+def get_current_revision(db_name: str, schema: str = None):
+    engine = create_engine(build_db_url(db_name), poolclass=pool.NullPool)
+    try:
+        with engine.connect() as conn:
+            return MigrationContext.configure(conn, opts={"version_table_schema": schema}).get_current_revision()
+    finally:
+        engine.dispose()
+
+
+def run_alembic_upgrade(db_name: str, revision: str = "head", sql_output: str = None, schema: str = None):
+    """
+    Run Alembic migrations for the given tenant database name, or for the
+    given schema inside it. Constructs the full DB URL using environment
+    values. With sql_output the migration runs in offline mode and the SQL is
+    written to that file instead.
+    """
+    target = f"{db_name}.{schema}" if schema else db_name
+    print(f"Running Alembic migrations for database: {target} with revision: {revision}...")
+    alembic_cfg = get_alembic_config(build_db_url(db_name), schema=schema)
+    if sql_output:
+        with open(sql_output, "w", encoding="utf-8") as f:
+            alembic_cfg.output_buffer = f
+            command.upgrade(alembic_cfg, revision, sql=True)
+    else:
+        command.upgrade(alembic_cfg, revision)
+
+
+def _isolated_upgrade_worker(db_name: str, revision: str, schema, conn):
+    # Runs in a child process: Alembic's op/context proxies are process-global
+    # and env.py reconfigures logging
+    try:
+        run_alembic_upgrade(db_name, revision, schema=schema)
+        conn.send(("ok", None))
+    except Exception as e:
+        conn.send(("failed", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def run_alembic_upgrade_in_subprocess(db_name: str, revision: str = "head", schema: str = None,
+                                      timeout: float = MIGRATION_TIMEOUT):
+    """
+    run_alembic_upgrade in a child process, for callers inside a running
+    service. Raises RuntimeError when the upgrade fails or is still running
+    after timeout seconds.
+    """
+    target = f"{db_name}.{schema}" if schema else db_name
+    parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(
+        target=_isolated_upgrade_worker, args=(db_name, revision, schema, child_conn), daemon=True
+    )
+    process.start()
+    child_conn.close()
+    try:
+        if not parent_conn.poll(timeout):
+            process.terminate()
+            raise RuntimeError(f"Alembic upgrade of {target} exceeded {timeout}s")
+        try:
+            status, error = parent_conn.recv()
+        except EOFError:
+            status, error = "failed", "worker exited without reporting"
+    finally:
+        process.join()
+        parent_conn.close()
+    if status != "ok":
+        raise RuntimeError(f"Alembic upgrade of {target} failed: {error}")
+
+
+def list_tenant_databases() -> list:
+    """
+    Tenant database names (schema names in schema tenancy mode) from the global
+    tenant table; create_tenant lower-cases them.
+    """
+    engine = create_engine(build_db_url(os.getenv('dev_dbname')), poolclass=pool.NullPool)
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT tenant_id FROM tenant ORDER BY tenant_id")).all()
+    finally:
+        engine.dispose()
+    return [row[0].lower() for row in rows]
+
+
+def _load_progress(path: str, target: str) -> dict:
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            progress = json.load(f)
+        if progress.get("revision") == target:
+            return progress
+    return {"revision": target, "tenants": {}}
+
+
+def _save_progress(path: str, progress: dict):
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(progress, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _resolve_target(name: str):
+    """(database, schema) for a fleet entry; the global and template databases are never schemas."""
+    if TENANCY_MODE != "schema" or name in (os.getenv('dev_dbname'), os.getenv('TENANT_TEMPLATE_DB', 'tenant_template')):
+        return name, None
+    return TENANT_SCHEMA_DBNAME, tenant_schema_name(name)
+
+
+def _upgrade_worker(name: str, revision: str, sql_dir: str, conn):
+    # Runs in a child process: Alembic's op/context proxies are process-global
+    try:
+        db_name, schema = _resolve_target(name)
+        sql_output = None
+        if sql_dir:
+            try:
+                current = get_current_revision(db_name, schema)
+            except Exception:
+                current = None  # unreachable or not created yet; render from base
+            revision = f"{current}:{revision}" if current else revision
+            sql_output = os.path.join(sql_dir, f"{name}.sql")
+        run_alembic_upgrade(db_name, revision, sql_output=sql_output, schema=schema)
+        conn.send(("ok", None))
+    except Exception as e:
+        conn.send(("failed", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(results: dict) -> dict:
+    durations = [r["duration"] for r in results.values() if r.get("status") == "ok"]
+    statuses = {}
+    for r in results.values():
+        statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+    return {
+        "statuses": statuses,
+        "p50": percentile(durations, 50),
+        "p90": percentile(durations, 90),
+        "p99": percentile(durations, 99),
+        "max": max(durations) if durations else 0.0,
+    }
+
+
+def run_fleet_upgrade(
+    revision: str = "head",
+    databases: list = None,
+    max_workers: int = 4,
+    timeout: float = 600,
+    progress_file: str = DEFAULT_PROGRESS_FILE,
+    dry_run: bool = False,
+    sql_dir: str = DEFAULT_SQL_DIR,
+) -> dict:
+    """
+    Upgrade tenant databases concurrently in at most max_workers processes.
+    A tenant still running after timeout seconds is terminated and marked
+    'timeout'. Tenants already upgraded to the target are skipped on resume.
+    """
+    target = resolve_revision(revision)
+    databases = databases if databases is not None else list_tenant_databases()
+    progress = _load_progress(None if dry_run else progress_file, target)
+    done = {name for name, r in progress["tenants"].items() if r.get("status") == "ok"}
+    pending = deque(name for name in databases if name not in done)
+    print(f"Upgrading {len(pending)} of {len(databases)} databases to {target} with {max_workers} workers")
+    if dry_run:
+        os.makedirs(sql_dir, exist_ok=True)
+
+    results = {}
+
+    def record(db_name: str, status: str, error, duration: float):
+        result = {"status": status, "error": error, "duration": duration, "finished_at": datetime.utcnow().isoformat()}
+        results[db_name] = progress["tenants"][db_name] = result
+        if status != "ok":
+            print(f"{db_name}: {status} ({error})")
+        if not dry_run:
+            _save_progress(progress_file, progress)
+
+    running = {}  # parent end of pipe -> (db name, process, started)
+    while pending or running:
+        while pending and len(running) < max_workers:
+            db_name = pending.popleft()
+            parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(
+                target=_upgrade_worker,
+                args=(db_name, target, sql_dir if dry_run else None, child_conn),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            running[parent_conn] = (db_name, process, time.monotonic())
+
+        for conn in wait(list(running), timeout=1.0):
+            db_name, process, started = running.pop(conn)
+            try:
+                status, error = conn.recv()
+            except EOFError:
+                status, error = "failed", "worker exited without reporting"
+            process.join()
+            record(db_name, status, error, time.monotonic() - started)
+
+        now = time.monotonic()
+        for conn, (db_name, process, started) in list(running.items()):
+            if now - started > timeout:
+                process.terminate()
+                process.join()
+                running.pop(conn)
+                record(db_name, "timeout", f"exceeded {timeout}s", now - started)
+
+    summary = summarize(results)
+    print(
+        f"Migrated {len(results)} databases: {summary['statuses']} "
+        f"p50={summary['p50']:.2f}s p90={summary['p90']:.2f}s p99={summary['p99']:.2f}s max={summary['max']:.2f}s"
+    )
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Upgrade all tenant databases with Alembic")
+    parser.add_argument("--revision", default="head")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=600, help="seconds allowed per tenant")
+    parser.add_argument("--progress-file", default=DEFAULT_PROGRESS_FILE)
+    parser.add_argument("--dry-run", action="store_true", help="write offline SQL instead of migrating")
+    parser.add_argument("--sql-dir", default=DEFAULT_SQL_DIR)
+    parser.add_argument("--databases", nargs="*", help="defaults to every tenant in the global tenant table")
+    parser.add_argument("--include-global", action="store_true", help="also upgrade the global database")
+    parser.add_argument("--include-template", action="store_true", help="also upgrade the tenant template database")
+    args = parser.parse_args(argv)
+
+    databases = args.databases or list_tenant_databases()
+    if args.include_global:
+        databases = [os.getenv('dev_dbname')] + databases
+    if args.include_template:
+        databases = [os.getenv('TENANT_TEMPLATE_DB', 'tenant_template')] + databases
+    summary = run_fleet_upgrade(
+        revision=args.revision,
+        databases=databases,
+        max_workers=args.workers,
+        timeout=args.timeout,
+        progress_file=args.progress_file,
+        dry_run=args.dry_run,
+        sql_dir=args.sql_dir,
+    )
+    return 0 if set(summary["statuses"]) <= {"ok"} else 1
 
-    command.upgrade(alembic_cfg, revision)
 
-run_alembic_upgrade("naadidevdb",'000')  # Run migrations for the global DB on startup
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
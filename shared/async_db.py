@@ -0,0 +1,114 @@
+# Async tenant sessions for routers that opt in with Depends(get_async_db), and
+# async global-database sessions through Depends(get_async_global_db).
+#
+# Uses SQLAlchemy's asyncio extension with the asyncpg driver. Engines are kept
+# per tenant database in the same LRU/idle-TTL registry as the sync engines, or
+# as one shared engine in schema tenancy mode. asyncpg connections belong to
+# the event loop that opened them; Mangum reuses one loop per container, so the
+# pools survive across warm invocations.
+import os
+import asyncio
+from fastapi import HTTPException, Depends
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from shared.config import TENANCY_MODE, TENANT_SCHEMA_DBNAME, tenant_schema_name
+from shared.db import (
+    TenantEngineRegistry,
+    TenantSession,
+    TENANT_ENGINE_CACHE_SIZE,
+    TENANT_ENGINE_IDLE_TTL,
+    TENANT_ENGINE_POOL_SIZE,
+    TENANT_ENGINE_MAX_OVERFLOW,
+    TENANT_SCHEMA_POOL_SIZE,
+    TENANT_SCHEMA_MAX_OVERFLOW,
+)
+from shared.security import verify_token
+
+
+def build_async_db_url(db_name: str) -> str:
+    return f"postgresql+asyncpg://{os.getenv('dev_username')}:{os.getenv('dev_password')}@{os.getenv('dev_host')}:{os.getenv('dev_port')}/{db_name}"
+
+
+def _sessionmaker(engine):
+    # TenantSession carries the search_path listener used in schema tenancy mode
+    return async_sessionmaker(engine, sync_session_class=TenantSession, autoflush=False, expire_on_commit=False)
+
+
+class AsyncTenantEngineRegistry(TenantEngineRegistry):
+    """TenantEngineRegistry holding AsyncEngine/async_sessionmaker pairs."""
+
+    def _create(self, tenant_db_name: str):
+        engine = create_async_engine(
+            build_async_db_url(tenant_db_name),
+            pool_pre_ping=True,
+            pool_size=TENANT_ENGINE_POOL_SIZE,
+            max_overflow=TENANT_ENGINE_MAX_OVERFLOW,
+        )
+        return engine, _sessionmaker(engine)
+
+    def _dispose(self, engine):
+        # AsyncEngine.dispose() is a coroutine; close evicted pools in the background
+        try:
+            asyncio.get_running_loop().create_task(engine.dispose())
+        except RuntimeError:
+            asyncio.run(engine.dispose())
+
+
+async_tenant_engines = AsyncTenantEngineRegistry(TENANT_ENGINE_CACHE_SIZE, TENANT_ENGINE_IDLE_TTL)
+
+_async_global_engine = None
+_AsyncGlobalSession = None
+
+def get_async_global_sessionmaker():
+    # Created on first use, like the sync global engine in shared/db.py
+    global _async_global_engine, _AsyncGlobalSession
+    if _AsyncGlobalSession is None:
+        _async_global_engine = create_async_engine(build_async_db_url(os.getenv('dev_dbname')), pool_pre_ping=True)
+        _AsyncGlobalSession = async_sessionmaker(_async_global_engine, autoflush=False, expire_on_commit=False)
+    return _AsyncGlobalSession
+
+
+_async_schema_engine = None
+_AsyncSchemaSession = None
+
+def get_async_schema_sessionmaker():
+    global _async_schema_engine, _AsyncSchemaSession
+    if _AsyncSchemaSession is None:
+        _async_schema_engine = create_async_engine(
+            build_async_db_url(TENANT_SCHEMA_DBNAME),
+            pool_pre_ping=True,
+            pool_size=TENANT_SCHEMA_POOL_SIZE,
+            max_overflow=TENANT_SCHEMA_MAX_OVERFLOW,
+        )
+        _AsyncSchemaSession = _sessionmaker(_async_schema_engine)
+    return _AsyncSchemaSession
+
+
+def AsyncTenantSessionLocal(tenant_id: str):
+    if TENANCY_MODE == "schema":
+        return get_async_schema_sessionmaker()(info={"tenant_schema": tenant_schema_name(tenant_id)})
+    _, SessionLocal = async_tenant_engines.get(tenant_id)
+    return SessionLocal()
+
+
+async def get_async_db(token: dict = Depends(verify_token)):
+    tenant_id = token.get("custom:tenant_id")
+    if not tenant_id:
+        raise HTTPException(status_code=400, detail="Tenant ID missing in token")
+    try:
+        db = AsyncTenantSessionLocal(tenant_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected database error occurred: '{str(e)}'")
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def get_async_global_db():
+    db = get_async_global_sessionmaker()()
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -0,0 +1,32 @@
+# Lazily created AWS clients. boto3 is imported and clients are built on first
+# use, so lambdas that never touch S3 do not pay for them at cold start.
+import os
+import threading
+import shared.config  # noqa: F401
+
+S3_BUCKET = os.getenv('AWS_S3_BUCKET')
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(service: str):
+    client = _clients.get(service)
+    if client is None:
+        with _lock:
+            client = _clients.get(service)
+            if client is None:
+                import boto3
+                client = boto3.client(
+                    service,
+                    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+                    region_name=os.getenv('AWS_REGION'),
+                    endpoint_url=os.getenv('AWS_ENDPOINT_URL') or None,
+                )
+                _clients[service] = client
+    return client
+
+
+def get_s3_client():
+    return get_client('s3')
@@ -0,0 +1,27 @@
+# Loads .env into the environment once per process. Shared modules import this
+# before reading os.getenv so repeated load_dotenv() calls are not needed.
+import os
+import re
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# TENANCY_MODE selects where a tenant's tables live:
+#   database - one Postgres database per tenant, one connection pool per database
+#   schema   - one schema per tenant inside TENANT_SCHEMA_DBNAME, served from a
+#              single shared pool with search_path set per transaction
+TENANCY_MODE = os.getenv('TENANCY_MODE', 'database').lower()
+TENANT_SCHEMA_DBNAME = os.getenv('TENANT_SCHEMA_DBNAME') or os.getenv('dev_dbname')
+
+_SCHEMA_NAME = re.compile(r'^[a-z_][a-z0-9_]{0,62}$')
+
+
+def tenant_schema_name(tenant_id: str) -> str:
+    """
+    Schema name for a tenant. It is interpolated into SET search_path and
+    CREATE SCHEMA, so anything that is not a plain identifier is rejected.
+    """
+    name = (tenant_id or '').lower()
+    if not _SCHEMA_NAME.match(name) or name in ('public', 'information_schema') or name.startswith('pg_'):
+        raise ValueError(f"Tenant id '{tenant_id}' is not a valid schema name")
+    return name
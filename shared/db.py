@@ -1,12 +1,11 @@
 
 import os
-from dotenv import load_dotenv
+from shared.config import TENANCY_MODE, TENANT_SCHEMA_DBNAME, tenant_schema_name
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import create_engine, event
 from shared.security import verify_token
 from fastapi import HTTPException, Depends
-load_dotenv()
 
 
 Base = declarative_base()
@@ -14,30 +13,171 @@ Base = declarative_base()
 # Global DB URL
 GLOBAL_DB_URL = f"postgresql+psycopg2://{os.getenv('dev_username')}:{os.getenv('dev_password')}@{os.getenv('dev_host')}:{os.getenv('dev_port')}/{os.getenv('dev_dbname')}"
 
-global_engine = create_engine(GLOBAL_DB_URL, pool_pre_ping=True)
-GlobalSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=global_engine)
+# Created on first use so lambdas that never touch the global DB do not build a pool
+_global_engine = None
+_GlobalSession = sessionmaker(autocommit=False, autoflush=False)
+
+def get_global_engine():
+    global _global_engine
+    if _global_engine is None:
+        _global_engine = create_engine(GLOBAL_DB_URL, pool_pre_ping=True)
+    return _global_engine
+
+def GlobalSessionLocal():
+    return _GlobalSession(bind=get_global_engine())
 
 from sqlalchemy.exc import OperationalError, ProgrammingError
 from fastapi import HTTPException, status
- 
+import threading
+import time
+from collections import OrderedDict
+
+# Tenant engine registry limits. A warm container keeps at most
+# TENANT_ENGINE_CACHE_SIZE pools open and drops pools idle for longer than
+# TENANT_ENGINE_IDLE_TTL seconds.
+TENANT_ENGINE_CACHE_SIZE = int(os.getenv('TENANT_ENGINE_CACHE_SIZE', '32'))
+TENANT_ENGINE_IDLE_TTL = float(os.getenv('TENANT_ENGINE_IDLE_TTL', '900'))
+TENANT_ENGINE_POOL_SIZE = int(os.getenv('TENANT_ENGINE_POOL_SIZE', '2'))
+# Schema mode serves every tenant from one pool, so it is sized for the whole container
+TENANT_SCHEMA_POOL_SIZE = int(os.getenv('TENANT_SCHEMA_POOL_SIZE', '5'))
+TENANT_SCHEMA_MAX_OVERFLOW = int(os.getenv('TENANT_SCHEMA_MAX_OVERFLOW', '5'))
+TENANT_ENGINE_MAX_OVERFLOW = int(os.getenv('TENANT_ENGINE_MAX_OVERFLOW', '3'))
+
+
+class TenantEngineRegistry:
+    """
+    Keeps one engine (and its connection pool) per tenant database across
+    warm invocations, evicting the least recently used engine when full and
+    any engine that has been idle longer than the TTL.
+    """
+
+    def __init__(self, max_size: int, idle_ttl: float):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._entries = OrderedDict()  # db name -> (engine, sessionmaker, last_used)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _create(self, tenant_db_name: str):
+        url = f"postgresql+psycopg2://{os.getenv('dev_username')}:{os.getenv('dev_password')}@{os.getenv('dev_host')}:{os.getenv('dev_port')}/{tenant_db_name}"
+        engine = create_engine(
+            url,
+            pool_pre_ping=True,
+            pool_size=TENANT_ENGINE_POOL_SIZE,
+            max_overflow=TENANT_ENGINE_MAX_OVERFLOW,
+        )
+        return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def _dispose(self, engine):
+        engine.dispose()
+
+    def _evict_idle(self, now: float):
+        expired = [name for name, (_, _, last_used) in self._entries.items() if now - last_used > self.idle_ttl]
+        evicted = []
+        for name in expired:
+            evicted.append(self._entries.pop(name)[0])
+        while len(self._entries) >= self.max_size:
+            evicted.append(self._entries.popitem(last=False)[1][0])
+        self.evictions += len(evicted)
+        return evicted
+
+    def get(self, tenant_db_name: str):
+        """Return (engine, sessionmaker) for the tenant database."""
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            entry = self._entries.get(tenant_db_name)
+            if entry and now - entry[2] <= self.idle_ttl:
+                self.hits += 1
+                self._entries[tenant_db_name] = (entry[0], entry[1], now)
+                self._entries.move_to_end(tenant_db_name)
+                return entry[0], entry[1]
+            self.misses += 1
+            if entry:
+                evicted.append(self._entries.pop(tenant_db_name)[0])
+                self.evictions += 1
+            evicted.extend(self._evict_idle(now))
+            engine, SessionLocal = self._create(tenant_db_name)
+            self._entries[tenant_db_name] = (engine, SessionLocal, now)
+        # Dispose outside the lock; closing connections can block on the network
+        for old_engine in evicted:
+            self._dispose(old_engine)
+        return engine, SessionLocal
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            engines = [engine for engine, _, _ in self._entries.values()]
+            self._entries.clear()
+        for engine in engines:
+            self._dispose(engine)
+
+
+tenant_engines = TenantEngineRegistry(TENANT_ENGINE_CACHE_SIZE, TENANT_ENGINE_IDLE_TTL)
+
 def get_tenant_engine(tenant_db_name: str):
-    url = f"postgresql+psycopg2://{os.getenv('dev_username')}:{os.getenv('dev_password')}@{os.getenv('dev_host')}:{os.getenv('dev_port')}/{tenant_db_name}"
-    print(url)
-    return create_engine(url, pool_pre_ping=True)
+    engine, _ = tenant_engines.get(tenant_db_name)
+    return engine
+
+class TenantSession(Session):
+    """Session that scopes every transaction to info['tenant_schema'] when set."""
+
+
+@event.listens_for(TenantSession, "after_begin")
+def _set_tenant_search_path(session, transaction, connection):
+    schema = session.info.get("tenant_schema")
+    if schema:
+        # SET LOCAL ends with the transaction, so a pooled connection never
+        # carries one tenant's search_path into another tenant's checkout
+        connection.exec_driver_sql(f'SET LOCAL search_path TO "{schema}", public')
+
+
+_schema_engine = None
+_SchemaSession = sessionmaker(class_=TenantSession, autocommit=False, autoflush=False)
+_schema_engine_lock = threading.Lock()
+
+def get_schema_engine():
+    global _schema_engine
+    with _schema_engine_lock:
+        if _schema_engine is None:
+            url = f"postgresql+psycopg2://{os.getenv('dev_username')}:{os.getenv('dev_password')}@{os.getenv('dev_host')}:{os.getenv('dev_port')}/{TENANT_SCHEMA_DBNAME}"
+            _schema_engine = create_engine(
+                url,
+                pool_pre_ping=True,
+                pool_size=TENANT_SCHEMA_POOL_SIZE,
+                max_overflow=TENANT_SCHEMA_MAX_OVERFLOW,
+            )
+    return _schema_engine
+
+def TenantSchemaSessionLocal(tenant_id: str):
+    return _SchemaSession(bind=get_schema_engine(), info={"tenant_schema": tenant_schema_name(tenant_id)})
 
 def get_db(token: dict = Depends(verify_token)):
     tenant_id = token.get("custom:tenant_id")
-    print(tenant_id)
     if not tenant_id:
         raise HTTPException(status_code=400, detail="Tenant ID missing in token")
     
     try:
-        engine = get_tenant_engine(tenant_id)
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        db = SessionLocal()
+        if TENANCY_MODE == "schema":
+            db = TenantSchemaSessionLocal(tenant_id)
+        else:
+            _, SessionLocal = tenant_engines.get(tenant_id)
+            db = SessionLocal()
 
         # Ping DB to check if it exists
         # db.execute("SELECT 1")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except OperationalError as e:
          raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -59,3 +199,10 @@ def get_db(token: dict = Depends(verify_token)):
     finally:
         db.close()
 
+
+def get_global_db():
+    db = GlobalSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,187 @@
+# Content-addressed storage for network flow files.
+#
+# A flow file is stored once per tenant under its sha256:
+#
+#     network_flows/<tenant_id>/sha256/<hash>
+#
+# The flow_object table in the tenant database counts the network_flow rows
+# that point at each object, so uploading content that is already stored
+# only bumps the counter. Dropping the last reference leaves the row as a
+# tombstone (ref_count 0); once that transaction has committed, a separate
+# transaction deletes the tombstone, and the S3 object with it, only if it is
+# still at 0. A request storing the same content meanwhile claims the row
+# before writing the object, so either it revives the tombstone and the
+# delete is skipped, or it waits for the delete and writes the object again.
+# The hash is exposed as NetworkFlow.content_hash and keys anything derived
+# from the file.
+import base64
+import hashlib
+from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event, update, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from shared.aws import S3_BUCKET, get_s3_client
+from shared.models import FlowObject
+from shared.uploads import object_url
+
+HASH_CHUNK_SIZE = 1024 * 1024
+# Session.info entry holding the hashes of objects tombstoned in the session
+_RELEASED_OBJECTS = "flow_storage_released_objects"
+
+
+def flow_object_key(tenant_id: str, sha256: str) -> str:
+    return f"network_flows/{tenant_id.lower()}/sha256/{sha256}"
+
+
+def hash_fileobj(fileobj) -> tuple:
+    """Return (sha256 hex, size) of a seekable file, leaving it rewound."""
+    digest = hashlib.sha256()
+    size = 0
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest(), size
+
+
+def _checksum_s3_object(key: str) -> str:
+    # An in-place copy with ChecksumAlgorithm makes S3 compute the full-object
+    # SHA-256 server side, so the file never passes through the Lambda. A
+    # completed multipart upload only carries a composite checksum of its
+    # parts, and CopyObject handles up to 5 GiB, the S3_UPLOAD_MAX_BYTES default.
+    result = get_s3_client().copy_object(
+        Bucket=S3_BUCKET, Key=key, CopySource={"Bucket": S3_BUCKET, "Key": key},
+        ChecksumAlgorithm="SHA256", MetadataDirective="REPLACE",
+    )
+    return base64.b64decode(result["CopyObjectResult"]["ChecksumSHA256"]).hex()
+
+
+async def _add_reference(db: AsyncSession, sha256: str) -> bool:
+    # Only a live row guarantees the object exists; tombstones are claimed below
+    result = await db.execute(
+        update(FlowObject)
+        .where(FlowObject.sha256 == sha256, FlowObject.ref_count > 0)
+        .values(ref_count=FlowObject.ref_count + 1)
+    )
+    return result.rowcount == 1
+
+
+async def _claim_object(db: AsyncSession, sha256: str, key: str, size: int):
+    # Taken before the object is written. The row lock is held until the
+    # caller commits, so a pending delete of a tombstone either finishes first
+    # or finds the row referenced again.
+    try:
+        async with db.begin_nested():
+            db.add(FlowObject(sha256=sha256, s3_key=key, size=size, ref_count=1, created_at=datetime.utcnow()))
+    except IntegrityError:
+        # A tombstone, or another request storing the same content meanwhile
+        await db.execute(
+            update(FlowObject).where(FlowObject.sha256 == sha256).values(ref_count=FlowObject.ref_count + 1)
+        )
+
+
+async def store_flow_file(db: AsyncSession, tenant_id: str, fileobj) -> tuple:
+    """
+    Store an uploaded flow file by content and take a reference on it.
+    Returns (sha256, s3 key). The caller commits together with its
+    network_flow row.
+    """
+    sha256, size = await run_in_threadpool(hash_fileobj, fileobj)
+    key = flow_object_key(tenant_id, sha256)
+    if await _add_reference(db, sha256):
+        return sha256, key  # already stored: metadata only
+    await _claim_object(db, sha256, key, size)
+    await run_in_threadpool(
+        get_s3_client().upload_fileobj, fileobj, S3_BUCKET, key,
+        ExtraArgs={"ACL": "public-read", "Metadata": {"sha256": sha256}},
+    )
+    return sha256, key
+
+
+def _adopt_object(upload_key: str, key: str, sha256: str, exists: bool):
+    s3 = get_s3_client()
+    if not exists:
+        s3.copy_object(
+            Bucket=S3_BUCKET, Key=key, CopySource={"Bucket": S3_BUCKET, "Key": upload_key},
+            ACL="public-read", Metadata={"sha256": sha256}, MetadataDirective="REPLACE", ChecksumAlgorithm="SHA256",
+        )
+    s3.delete_object(Bucket=S3_BUCKET, Key=upload_key)
+
+
+async def adopt_uploaded_flow_file(db: AsyncSession, tenant_id: str, upload_key: str, size: int) -> tuple:
+    """
+    Move a completed direct upload of size bytes to its content address (or
+    drop it when the content is already stored) and take a reference on it.
+    Returns (sha256, s3 key).
+    """
+    sha256 = await run_in_threadpool(_checksum_s3_object, upload_key)
+    key = flow_object_key(tenant_id, sha256)
+    exists = await _add_reference(db, sha256)
+    if not exists:
+        await _claim_object(db, sha256, key, size)
+    await run_in_threadpool(_adopt_object, upload_key, key, sha256, exists)
+    return sha256, key
+
+
+def _purge_object(db: Session, sha256: str):
+    with db.begin():
+        flow_object = db.execute(
+            select(FlowObject).where(FlowObject.sha256 == sha256, FlowObject.ref_count == 0).with_for_update()
+        ).scalars().first()
+        if flow_object is None:
+            return  # referenced again since it was released
+        db.delete(flow_object)
+        db.flush()
+        # Inside the transaction: a failed S3 delete rolls back and keeps the tombstone
+        get_s3_client().delete_object(Bucket=S3_BUCKET, Key=flow_object.s3_key)
+
+
+@event.listens_for(Session, "after_commit")
+def _delete_released_objects(session):
+    released = session.info.pop(_RELEASED_OBJECTS, ())
+    if not released:
+        return
+    # The committed session cannot emit SQL here; a new one on the same bind
+    # and tenant schema can
+    info = {"tenant_schema": session.info["tenant_schema"]} if session.info.get("tenant_schema") else {}
+    with type(session)(bind=session.get_bind(), info=info) as db:
+        for sha256 in released:
+            try:
+                _purge_object(db, sha256)
+            except Exception as e:
+                # The tombstone stays; an undeleted object is only wasted storage
+                print(f"Could not delete released flow object {sha256}: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _keep_released_objects(session):
+    session.info.pop(_RELEASED_OBJECTS, None)
+
+
+def release_flow_file(db: Session, sha256: str):
+    """
+    Drop one reference. The last reference leaves a tombstone that is
+    deleted, with its S3 object, only after the caller's commit, so a rolled
+    back transaction never leaves a row pointing at a missing object.
+    """
+    if not sha256:
+        return
+    flow_object = db.execute(
+        select(FlowObject).where(FlowObject.sha256 == sha256).with_for_update()
+    ).scalars().first()
+    if flow_object is None or flow_object.ref_count <= 0:
+        return
+    flow_object.ref_count -= 1
+    if flow_object.ref_count == 0:
+        db.info.setdefault(_RELEASED_OBJECTS, []).append(sha256)
+
+
+def read_flow_file(flow_url: str) -> bytes:
+    """Download a flow file stored in the flow bucket."""
+    prefix = object_url("")
+    if not flow_url or not flow_url.startswith(prefix):
+        raise ValueError("Flow file is not stored in the flow bucket")
+    return get_s3_client().get_object(Bucket=S3_BUCKET, Key=flow_url[len(prefix):])["Body"].read()
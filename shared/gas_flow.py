@@ -0,0 +1,192 @@
+# Compressible gas flow along constant-area lines.
+#
+# Each line is marched in equal segments. Within a segment the flow follows
+# the closed-form relations for flow with friction in a constant-area duct:
+#
+#   isothermal  (long, uninsulated lines; T stays at the inlet temperature)
+#       4f'L*/D = (1 - kM^2) / (kM^2) + ln(kM^2),  choking at M = 1/sqrt(k)
+#   adiabatic   (Fanno flow; short or insulated lines, stagnation enthalpy kept)
+#       4f'L*/D = (1 - M^2) / (kM^2) + (k+1)/(2k) ln((k+1)M^2 / (2 + (k-1)M^2)),
+#       choking at M = 1
+#
+# with the Darcy friction factor f = 4f'. A segment removes f dL/D (plus its
+# share of the fitting K) from the remaining length-to-choke; the outlet Mach
+# number is found by bisection and gives the outlet pressure, temperature and
+# density. When a segment needs more than the remaining length-to-choke, the
+# line chokes inside it: the given mass flow cannot pass and the result
+# reports where the sonic condition is reached. A line already at or above
+# the limiting Mach number at its inlet chokes at length 0 and is reported
+# without an outlet state (NaN).
+#
+# Marching lets the viscosity, and with it the friction factor, follow the
+# temperature and pressure along the line. All lines of a request advance
+# together as arrays. Elevation changes are neglected for gases.
+import numpy as np
+from shared.hydraulics import HydraulicTables, friction_factor, BAR, ATMOSPHERE, DEFAULT_TEMPERATURE_K
+
+GAS_FLOW_MODES = ("isothermal", "adiabatic")
+GAS_FLOW_SEGMENTS = 20
+GAS_FLOW_MAX_SEGMENTS = 1000
+MACH_BISECTION_STEPS = 60
+
+
+def _choke_mach(k, mode: str):
+    return 1.0 / np.sqrt(k) if mode == "isothermal" else np.ones_like(k)
+
+
+def _length_to_choke(mach, k, mode: str):
+    """fL*/D: friction length (Darcy) still available before the flow chokes."""
+    m2 = mach ** 2
+    if mode == "isothermal":
+        return (1.0 - k * m2) / (k * m2) + np.log(k * m2)
+    return (1.0 - m2) / (k * m2) + (k + 1.0) / (2.0 * k) * np.log((k + 1.0) * m2 / (2.0 + (k - 1.0) * m2))
+
+
+def _outlet_mach(target, mach, choke, k, mode: str):
+    # _length_to_choke falls monotonically from mach to the choke Mach number
+    lo, hi = mach.copy(), choke.copy()
+    for _ in range(MACH_BISECTION_STEPS):
+        mid = (lo + hi) / 2.0
+        above = _length_to_choke(mid, k, mode) > target
+        lo = np.where(above, mid, lo)
+        hi = np.where(above, hi, mid)
+    return (lo + hi) / 2.0
+
+
+def _state_ratios(inlet_mach, outlet_mach, k, mode: str) -> tuple:
+    """Outlet/inlet ratios of absolute pressure and temperature."""
+    if mode == "isothermal":
+        return inlet_mach / outlet_mach, np.ones_like(k)
+    temperature_ratio = (2.0 + (k - 1.0) * inlet_mach ** 2) / (2.0 + (k - 1.0) * outlet_mach ** 2)
+    return inlet_mach / outlet_mach * np.sqrt(temperature_ratio), temperature_ratio
+
+
+def _viscosity(groups: list, temperature, pressure_abs) -> np.ndarray:
+    viscosity = np.empty(len(temperature))
+    for fluid, positions in groups:
+        viscosity[positions] = fluid.properties(
+            temperature[positions], (pressure_abs[positions] - ATMOSPHERE) / BAR
+        )["viscosity"]
+    return viscosity
+
+
+def gas_flow(tables: HydraulicTables, lines: list, mode: str = "isothermal", segments: int = GAS_FLOW_SEGMENTS,
+             method: str = "swamee_jain") -> dict:
+    """
+    Outlet conditions for a batch of gas lines. Each line is a dict with a
+    gas fluid, pipe_id (or material, schedule_or_class and size), length_m,
+    inlet_pressure_bar_g, optional inlet_temperature_in_k, either
+    mass_flow_kg_per_h or flow_rate_m3_per_h (at inlet conditions) and
+    optional fittings.
+    Returns arrays per result field.
+    """
+    if mode not in GAS_FLOW_MODES:
+        raise ValueError(f"Unknown gas flow mode '{mode}'; expected one of {', '.join(GAS_FLOW_MODES)}")
+    if not 1 <= segments <= GAS_FLOW_MAX_SEGMENTS:
+        raise ValueError(f"segments must be between 1 and {GAS_FLOW_MAX_SEGMENTS}")
+    pipes = tables.pipes
+    count = len(lines)
+    index = np.empty(count, dtype=np.int64)
+    length = np.empty(count)
+    k_total = np.zeros(count)
+    temperature = np.empty(count)
+    pressure = np.empty(count)
+    mass_flow = np.empty(count)
+    by_fluid = {}
+    for i, line in enumerate(lines):
+        fluid = tables.fluid(line["fluid"])
+        if fluid.state != "gas" or "specific_heat_ratio" not in fluid.grids:
+            raise ValueError(f"{fluid.name} is not a gas with a specific heat ratio")
+        by_fluid.setdefault(fluid, []).append(i)
+        index[i] = pipes.index(line.get("pipe_id"), line.get("material"), line.get("schedule_or_class"), line.get("size"))
+        length[i] = line["length_m"]
+        temperature[i] = line.get("inlet_temperature_in_k") or DEFAULT_TEMPERATURE_K
+        pressure[i] = line["inlet_pressure_bar_g"]
+        for fitting_type, fitting_count in (line.get("fittings") or {}).items():
+            k_total[i] += fitting_count * tables.fittings.k_factor(fitting_type, pipes.size[index[i]])
+    groups = [(fluid, np.array(positions, dtype=np.int64)) for fluid, positions in by_fluid.items()]
+
+    density = np.empty(count)
+    viscosity = np.empty(count)
+    k = np.empty(count)
+    for fluid, positions in groups:
+        properties = fluid.properties(temperature[positions], pressure[positions])
+        density[positions] = properties["density"]
+        viscosity[positions] = properties["viscosity"]
+        k[positions] = properties["specific_heat_ratio"]
+    for i, line in enumerate(lines):
+        if line.get("mass_flow_kg_per_h") is not None:
+            mass_flow[i] = line["mass_flow_kg_per_h"] / 3600.0
+        elif line.get("flow_rate_m3_per_h") is not None:
+            mass_flow[i] = line["flow_rate_m3_per_h"] / 3600.0 * density[i]
+        else:
+            raise ValueError("Each line needs mass_flow_kg_per_h or flow_rate_m3_per_h")
+    if (mass_flow <= 0).any() or (length <= 0).any():
+        raise ValueError("Mass flow and length must be positive")
+
+    diameter = pipes.inner_diameter[index]
+    relative_roughness = pipes.roughness[index] / diameter
+    mass_flux = mass_flow / (np.pi * diameter ** 2 / 4.0)
+    pressure_abs = pressure * BAR + ATMOSPHERE
+    # P/rho from the tabulated density carries the real-gas compressibility at the inlet
+    pv = pressure_abs / density
+    inlet_density = density.copy()
+    inlet_mach = mass_flux / density / np.sqrt(k * pv)
+    choke = _choke_mach(k, mode)
+
+    mach = inlet_mach.copy()
+    state_pressure = pressure_abs.copy()
+    state_temperature = temperature.copy()
+    choked = inlet_mach >= choke
+    choke_length = np.where(choked, 0.0, np.nan)
+    re = mass_flux * diameter / viscosity
+    f = friction_factor(re, relative_roughness, method)
+    step = length / segments
+    for segment in range(segments):
+        active = np.flatnonzero(~choked)
+        if not len(active):
+            break
+        viscosity = _viscosity(groups, state_temperature, state_pressure)
+        re = mass_flux * diameter / viscosity
+        f = friction_factor(re, relative_roughness, method)
+        resistance = (f * step / diameter + k_total / segments)[active]
+        available = _length_to_choke(mach[active], k[active], mode)
+        target = available - resistance
+        chokes = target <= 0
+        if chokes.any():
+            choking = active[chokes]
+            choke_length[choking] = step[choking] * (segment + available[chokes] / resistance[chokes])
+            target[chokes] = 0.0
+        outlet = _outlet_mach(target, mach[active], choke[active], k[active], mode)
+        pressure_ratio, temperature_ratio = _state_ratios(mach[active], outlet, k[active], mode)
+        state_pressure[active] *= pressure_ratio
+        state_temperature[active] *= temperature_ratio
+        mach[active] = outlet
+        if chokes.any():
+            choked[active[chokes]] = True
+            mach[active[chokes]] = choke[active[chokes]]
+
+    outlet_density = inlet_density * (state_pressure / pressure_abs) * (temperature / state_temperature)
+    # A line choked at the inlet cannot pass the given mass flow at all, so it has no outlet state
+    at_inlet = inlet_mach >= choke
+
+    def outlet(values):
+        return np.where(at_inlet, np.nan, values)
+
+    return {
+        "mass_flow": mass_flow,
+        "inner_diameter": diameter,
+        "inlet_density": inlet_density,
+        "inlet_velocity": mass_flux / inlet_density,
+        "inlet_mach": inlet_mach,
+        "outlet_pressure": outlet(state_pressure - ATMOSPHERE),
+        "outlet_temperature": outlet(state_temperature),
+        "outlet_density": outlet(outlet_density),
+        "outlet_velocity": outlet(mass_flux / outlet_density),
+        "outlet_mach": outlet(mach),
+        "pressure_drop": outlet(pressure_abs - state_pressure),
+        "reynolds": re,
+        "friction_factor": f,
+        "choked": choked,
+        "choke_length": choke_length,
+    }
@@ -0,0 +1,509 @@
+# Single-phase pressure-drop calculations over the masterdata catalogue.
+#
+# The pipe, fitting, gas and liquid tables are turned into NumPy arrays once per
+# masterdata version (see HydraulicTableCache) and every calculation is
+# vectorized over the segments of a request, so thousands of line segments are
+# evaluated per call without touching the database.
+#
+# Units are SI throughout: m, m/s, m3/s, kg/m3, Pa.s, Pa.
+import hashlib
+import threading
+import numpy as np
+from shared.masterdata import masterdata_cache
+
+INCH = 0.0254
+CENTIPOISE = 1e-3
+GRAVITY = 9.80665
+BAR = 1e5
+ATMOSPHERE = 101325.0
+
+# Below LAMINAR_RE the flow is laminar, above TURBULENT_RE fully turbulent; the
+# friction factor is blended linearly in between so it stays continuous
+LAMINAR_RE = 2000.0
+TURBULENT_RE = 4000.0
+
+FRICTION_METHODS = ("swamee_jain", "colebrook")
+COLEBROOK_MAX_ITERATIONS = 50
+COLEBROOK_TOLERANCE = 1e-10
+
+DEFAULT_TEMPERATURE_K = 293.15
+DEFAULT_PRESSURE_BAR_G = 0.0
+
+
+def _normalize(value) -> str:
+    # Catalogue values carry inconsistent spacing, e.g. "Sch.  10S"
+    return " ".join(str(value).split()).lower() if value is not None else ""
+
+
+def _array(rows: list, name: str) -> np.ndarray:
+    return np.array([np.nan if row.get(name) is None else float(row[name]) for row in rows], dtype=np.float64)
+
+
+def reynolds(density, velocity, diameter, viscosity):
+    return density * np.abs(velocity) * diameter / viscosity
+
+
+def _swamee_jain(re, relative_roughness):
+    return 0.25 / np.log10(relative_roughness / 3.7 + 5.74 / re ** 0.9) ** 2
+
+
+def _colebrook(re, relative_roughness):
+    # Fixed-point iteration on x = 1/sqrt(f), seeded with Swamee-Jain
+    x = 1.0 / np.sqrt(_swamee_jain(re, relative_roughness))
+    for _ in range(COLEBROOK_MAX_ITERATIONS):
+        x_next = -2.0 * np.log10(relative_roughness / 3.7 + 2.51 * x / re)
+        converged = np.max(np.abs(x_next - x), initial=0.0) < COLEBROOK_TOLERANCE
+        x = x_next
+        if converged:
+            break
+    return 1.0 / x ** 2
+
+
+def friction_factor(re, relative_roughness, method: str = "swamee_jain"):
+    """Darcy friction factor for arrays of Reynolds numbers and relative roughness (e/D)."""
+    if method not in FRICTION_METHODS:
+        raise ValueError(f"Unknown friction method '{method}'; expected one of {', '.join(FRICTION_METHODS)}")
+    re = np.asarray(re, dtype=np.float64)
+    relative_roughness = np.broadcast_to(np.asarray(relative_roughness, dtype=np.float64), re.shape)
+    flowing = re > 0
+    # Laminar branch, evaluated at LAMINAR_RE or above to avoid dividing by zero
+    laminar = 64.0 / np.maximum(re, 1e-12)
+    turbulent_re = np.maximum(re, TURBULENT_RE)
+    turbulent = (_colebrook if method == "colebrook" else _swamee_jain)(turbulent_re, relative_roughness)
+    laminar_at_bound = 64.0 / LAMINAR_RE
+    weight = np.clip((re - LAMINAR_RE) / (TURBULENT_RE - LAMINAR_RE), 0.0, 1.0)
+    transition = laminar_at_bound + weight * (turbulent - laminar_at_bound)
+    f = np.where(re <= LAMINAR_RE, laminar, np.where(re >= TURBULENT_RE, turbulent, transition))
+    return np.where(flowing, f, 0.0)
+
+
+def flow_regime(re):
+    re = np.asarray(re)
+    return np.where(re <= LAMINAR_RE, "laminar", np.where(re >= TURBULENT_RE, "turbulent", "transitional"))
+
+
+def pressure_drop(flow_rate, diameter, roughness, length, density, viscosity, k_total=0.0, elevation_change=0.0,
+                  method: str = "swamee_jain") -> dict:
+    """
+    Darcy-Weisbach pressure drop for arrays of line segments. Returns arrays of
+    velocity, Reynolds number, friction factor and the major (straight run),
+    minor (fittings), elevation and total pressure drop in Pa.
+    """
+    area = np.pi * diameter ** 2 / 4.0
+    velocity = flow_rate / area
+    re = reynolds(density, velocity, diameter, viscosity)
+    f = friction_factor(re, roughness / diameter, method)
+    dynamic_pressure = density * velocity * np.abs(velocity) / 2.0
+    major = f * length / diameter * dynamic_pressure
+    minor = k_total * dynamic_pressure
+    elevation = density * GRAVITY * elevation_change
+    return {
+        "velocity": velocity,
+        "reynolds": re,
+        "friction_factor": f,
+        "major_loss": major,
+        "minor_loss": minor,
+        "elevation_loss": elevation,
+        "pressure_drop": major + minor + elevation,
+    }
+
+
+class PipeTable:
+    """Pipe catalogue as arrays; inner diameter = outside diameter - 2 x wall thickness."""
+
+    def __init__(self, rows: list):
+        self.ids = [str(row["id"]) for row in rows]
+        self.material = np.array([row.get("material") or "" for row in rows], dtype=object)
+        self.schedule = np.array([row.get("schedule_or_class") or "" for row in rows], dtype=object)
+        self.size = _array(rows, "size")
+        self.outside_diameter = _array(rows, "outside_diameter_in_inch") * INCH
+        self.wall_thickness = _array(rows, "wall_thickness_in_inch") * INCH
+        self.inner_diameter = self.outside_diameter - 2.0 * self.wall_thickness
+        self.roughness = np.nan_to_num(_array(rows, "internal_roughness_in_inch") * INCH)
+        self._by_id = {pipe_id: index for index, pipe_id in enumerate(self.ids)}
+        self._by_spec = {
+            (_normalize(row.get("material")), _normalize(row.get("schedule_or_class")), float(row["size"])): index
+            for index, row in enumerate(rows)
+            if row.get("size") is not None
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    def index(self, pipe_id=None, material=None, schedule_or_class=None, size=None) -> int:
+        if pipe_id is not None:
+            index = self._by_id.get(str(pipe_id))
+        else:
+            index = self._by_spec.get((_normalize(material), _normalize(schedule_or_class), float(size or 0)))
+        if index is None:
+            label = pipe_id if pipe_id is not None else f"{material} / {schedule_or_class} / {size}"
+            raise ValueError(f"Pipe not found: {label}")
+        if not self.inner_diameter[index] > 0:
+            raise ValueError(f"Pipe {self.ids[index]} has no usable inner diameter")
+        return index
+
+
+class PipeIndex:
+    """
+    Usable pipes sorted by (material, schedule_or_class, inner diameter), so
+    every material/schedule combination is a contiguous slice with ascending
+    diameters that can be binary searched.
+    """
+
+    def __init__(self, pipes: PipeTable):
+        usable = np.flatnonzero(pipes.inner_diameter > 0)
+        material = np.array([_normalize(value) for value in pipes.material[usable]])
+        schedule = np.array([_normalize(value) for value in pipes.schedule[usable]])
+        order = np.lexsort((pipes.inner_diameter[usable], schedule, material))
+        self.pipe = usable[order]  # position in the PipeTable
+        self.diameter = pipes.inner_diameter[self.pipe]
+        self.roughness = pipes.roughness[self.pipe]
+        material, schedule = material[order], schedule[order]
+        self.groups = {}  # (material, schedule) -> (start, stop)
+        boundaries = np.flatnonzero((material[1:] != material[:-1]) | (schedule[1:] != schedule[:-1])) + 1
+        for start, stop in zip(np.r_[0, boundaries], np.r_[boundaries, len(order)]):
+            self.groups[(material[start], schedule[start])] = (int(start), int(stop))
+
+    def select_groups(self, material: str = None, schedule_or_class: str = None) -> list:
+        material, schedule = _normalize(material), _normalize(schedule_or_class)
+        groups = [
+            bounds for (group_material, group_schedule), bounds in self.groups.items()
+            if (not material or group_material == material) and (not schedule or group_schedule == schedule)
+        ]
+        if not groups:
+            raise ValueError(f"No pipes for material '{material or '*'}' and schedule '{schedule or '*'}'")
+        return groups
+
+
+class FittingTable:
+    """K-factors keyed by (fitting type, nominal pipe size in mm)."""
+
+    def __init__(self, rows: list):
+        self._k = {}
+        for row in rows:
+            if row.get("k_factor") is None or row.get("size") is None:
+                continue
+            self._k[(_normalize(row.get("type")), int(row["size"]))] = float(row["k_factor"])
+        self.types = sorted({fitting_type for fitting_type, _ in self._k})
+
+    def k_factor(self, fitting_type: str, size) -> float:
+        k = self._k.get((_normalize(fitting_type), int(size)))
+        if k is None:
+            raise ValueError(f"No K-factor for fitting '{fitting_type}' at size {size}")
+        return k
+
+
+def _bracket(axis: np.ndarray, x: np.ndarray) -> tuple:
+    """Lower/upper grid index and linear weight of each x on a sorted axis, clamped to its ends."""
+    if len(axis) == 1:
+        zero = np.zeros(len(x), dtype=np.int64)
+        return zero, zero, np.zeros(len(x))
+    lower = np.clip(np.searchsorted(axis, x, side="right") - 1, 0, len(axis) - 2)
+    weight = np.clip((x - axis[lower]) / (axis[lower + 1] - axis[lower]), 0.0, 1.0)
+    return lower, lower + 1, weight
+
+
+def _fill_grid(grid: np.ndarray, temperature: np.ndarray, pressure: np.ndarray) -> np.ndarray:
+    # The rows are scattered points, not a full grid: fill each pressure column
+    # along temperature from the points it has, then the rest along pressure
+    for j in range(grid.shape[1]):
+        known = ~np.isnan(grid[:, j])
+        if known.any():
+            grid[:, j] = np.interp(temperature, temperature[known], grid[known, j])
+    for i in range(grid.shape[0]):
+        known = ~np.isnan(grid[i])
+        if known.any():
+            grid[i] = np.interp(pressure, pressure[known], grid[i, known])
+    return grid
+
+
+class Fluid:
+    """
+    Property rows of one gas or liquid as grids over sorted temperature and
+    pressure axes, interpolated bilinearly. Outside the tabulated range values
+    are clamped to the nearest edge, except gas density, which follows the
+    ideal gas law from that edge.
+    """
+
+    def __init__(self, name: str, state: str, rows: list):
+        self.name = name
+        self.state = state
+        temperature = _array(rows, "temperature_in_k")
+        pressure = np.nan_to_num(_array(rows, "pressure_in_bar_g"))
+        self.temperature = np.unique(temperature)
+        self.pressure = np.unique(pressure)
+        t_index = np.searchsorted(self.temperature, temperature)
+        p_index = np.searchsorted(self.pressure, pressure)
+        columns = {
+            "density": _array(rows, "density_in_kg_or_meter_cube"),
+            "viscosity": _array(rows, "viscosity_centipoise") * CENTIPOISE,
+            "specific_heat_ratio": _array(rows, "specific_heat_ratio") if state == "gas" else None,
+            "vapour_pressure": _array(rows, "vapour_pressure_in_kpa_absolute") * 1e3 if state == "liquid" else None,
+        }
+        shape = (len(self.temperature), len(self.pressure))
+        self.grids = {}
+        for name, values in columns.items():
+            if values is None or np.isnan(values).all():
+                continue
+            # Rows repeated at the same (temperature, pressure) are averaged
+            known = ~np.isnan(values)
+            total = np.zeros(shape)
+            count = np.zeros(shape)
+            np.add.at(total, (t_index[known], p_index[known]), values[known])
+            np.add.at(count, (t_index[known], p_index[known]), 1.0)
+            with np.errstate(invalid="ignore"):
+                grid = total / count
+            self.grids[name] = _fill_grid(grid, self.temperature, self.pressure)
+
+    def in_range(self, temperature, pressure) -> np.ndarray:
+        temperature, pressure = np.broadcast_arrays(np.atleast_1d(temperature), np.atleast_1d(pressure))
+        return (temperature >= self.temperature[0]) & (temperature <= self.temperature[-1]) \
+            & (pressure >= self.pressure[0]) & (pressure <= self.pressure[-1])
+
+    def properties(self, temperature, pressure) -> dict:
+        """Interpolated properties (SI units) at each (temperature K, pressure bar g) point."""
+        temperature, pressure = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(temperature, dtype=np.float64)),
+            np.atleast_1d(np.asarray(pressure, dtype=np.float64)),
+        )
+        if (temperature <= 0).any() or (pressure * BAR + ATMOSPHERE <= 0).any():
+            raise ValueError("Temperature must be above 0 K and pressure above full vacuum")
+        t0, t1, wt = _bracket(self.temperature, temperature)
+        p0, p1, wp = _bracket(self.pressure, pressure)
+        result = {}
+        for name, grid in self.grids.items():
+            result[name] = (grid[t0, p0] * (1 - wt) * (1 - wp) + grid[t1, p0] * wt * (1 - wp)
+                            + grid[t0, p1] * (1 - wt) * wp + grid[t1, p1] * wt * wp)
+        if self.state == "gas":
+            clamped_t = np.clip(temperature, self.temperature[0], self.temperature[-1])
+            clamped_p = np.clip(pressure, self.pressure[0], self.pressure[-1])
+            result["density"] = result["density"] * (pressure * BAR + ATMOSPHERE) / (clamped_p * BAR + ATMOSPHERE) \
+                * clamped_t / temperature
+        return result
+
+
+def _fluids(rows: list, state: str) -> dict:
+    grouped = {}
+    for row in rows:
+        if row.get("density_in_kg_or_meter_cube") is None or row.get("viscosity_centipoise") is None:
+            continue
+        grouped.setdefault(_normalize(row.get("name")), (row.get("name"), []))[1].append(row)
+    return {key: Fluid(name, state, fluid_rows) for key, (name, fluid_rows) in grouped.items()}
+
+
+class HydraulicTables:
+    def __init__(self, pipe_rows: list, fitting_rows: list, gas_rows: list, liquid_rows: list, version: str = ""):
+        # Identifies the masterdata the arrays were built from, for caches of derived data
+        self.version = version
+        self.pipes = PipeTable(pipe_rows)
+        self.pipe_index = PipeIndex(self.pipes)
+        self.fittings = FittingTable(fitting_rows)
+        self.fluids = _fluids(liquid_rows, "liquid")
+        self.fluids.update(_fluids(gas_rows, "gas"))
+
+    def fluid(self, name: str) -> Fluid:
+        fluid = self.fluids.get(_normalize(name))
+        if fluid is None:
+            raise ValueError(f"Fluid not found: {name}")
+        return fluid
+
+
+def fluid_properties(tables: HydraulicTables, points: list) -> list:
+    """
+    Interpolated properties for a batch of {fluid, temperature_in_k,
+    pressure_in_bar_g} points, evaluated in one call per fluid. Returns one
+    dict per point in request order; properties a fluid does not tabulate
+    are left out.
+    """
+    by_fluid = {}
+    for i, point in enumerate(points):
+        by_fluid.setdefault(tables.fluid(point["fluid"]), []).append(i)
+    results = [None] * len(points)
+    for fluid, positions in by_fluid.items():
+        temperature = np.array([points[i]["temperature_in_k"] for i in positions], dtype=np.float64)
+        pressure = np.array([points[i]["pressure_in_bar_g"] for i in positions], dtype=np.float64)
+        properties = {name: values.tolist() for name, values in fluid.properties(temperature, pressure).items()}
+        in_range = fluid.in_range(temperature, pressure).tolist()
+        for k, i in enumerate(positions):
+            results[i] = {"fluid": fluid.name, "state": fluid.state, "in_range": in_range[k]}
+            results[i].update({name: values[k] for name, values in properties.items()})
+    return results
+
+
+TABLE_RESOURCES = ("pipe", "fitting", "gas", "liquid")
+
+
+class HydraulicTableCache:
+    """
+    HydraulicTables per tenant, rebuilt only when one of the underlying
+    masterdata cache entries changes (compared by ETag).
+    """
+
+    def __init__(self):
+        self._entries = {}  # tenant id -> (etags, tables)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, db, tenant_id: str) -> HydraulicTables:
+        entries = [masterdata_cache.get(db, tenant_id, resource_type) for resource_type in TABLE_RESOURCES]
+        etags = tuple(entry.etag for entry in entries)
+        cached = self._entries.get(tenant_id)
+        if cached and cached[0] == etags:
+            self.hits += 1
+            return cached[1]
+        self.builds += 1
+        version = hashlib.sha256("".join(etags).encode()).hexdigest()[:16]
+        tables = HydraulicTables(*(entry.rows for entry in entries), version=version)
+        with self._lock:
+            self._entries[tenant_id] = (etags, tables)
+        return tables
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "builds": self.builds}
+
+
+hydraulic_tables = HydraulicTableCache()
+
+
+def calculate_segments(tables: HydraulicTables, fluid_name: str, segments: list,
+                       temperature: float = None, pressure: float = None, method: str = "swamee_jain") -> dict:
+    """
+    Pressure drop for a batch of line segments carrying one fluid. Each segment
+    is a dict with pipe_id (or material, schedule_or_class and size),
+    length_m, flow_rate_m3_per_h, optional elevation_change_m and optional
+    fittings ({fitting type: count}). Returns arrays per result field.
+    """
+    fluid = tables.fluid(fluid_name)
+    pipes = tables.pipes
+    count = len(segments)
+    index = np.empty(count, dtype=np.int64)
+    length = np.empty(count)
+    flow_rate = np.empty(count)
+    elevation = np.zeros(count)
+    k_total = np.zeros(count)
+    for i, segment in enumerate(segments):
+        index[i] = pipes.index(segment.get("pipe_id"), segment.get("material"), segment.get("schedule_or_class"), segment.get("size"))
+        length[i] = segment["length_m"]
+        flow_rate[i] = segment["flow_rate_m3_per_h"] / 3600.0
+        elevation[i] = segment.get("elevation_change_m") or 0.0
+        for fitting_type, fitting_count in (segment.get("fittings") or {}).items():
+            k_total[i] += fitting_count * tables.fittings.k_factor(fitting_type, pipes.size[index[i]])
+
+    properties = fluid.properties(
+        DEFAULT_TEMPERATURE_K if temperature is None else temperature,
+        DEFAULT_PRESSURE_BAR_G if pressure is None else pressure,
+    )
+    result = pressure_drop(
+        flow_rate,
+        pipes.inner_diameter[index],
+        pipes.roughness[index],
+        length,
+        properties["density"][0],
+        properties["viscosity"][0],
+        k_total=k_total,
+        elevation_change=elevation,
+        method=method,
+    )
+    result["inner_diameter"] = pipes.inner_diameter[index]
+    result["k_total"] = k_total
+    result["flow_regime"] = flow_regime(result["reynolds"])
+    return result
+
+
+def _pressure_gradient(flow_rate, diameter, roughness, density, viscosity, method: str):
+    """Frictional pressure drop per metre of straight pipe (Pa/m)."""
+    area = np.pi * diameter ** 2 / 4.0
+    velocity = flow_rate / area
+    f = friction_factor(reynolds(density, velocity, diameter, viscosity), roughness / diameter, method)
+    return f / diameter * density * velocity ** 2 / 2.0, velocity
+
+
+def size_pipes(tables: HydraulicTables, lines: list, method: str = "swamee_jain") -> list:
+    """
+    Smallest pipes per material/schedule that keep each line within its
+    velocity and pressure-drop limits. Each line is a dict with fluid,
+    flow_rate_m3_per_h, optional temperature_in_k / pressure_in_bar_g,
+    optional material / schedule_or_class filters, max_velocity_m_per_s
+    and/or max_pressure_drop_bar_per_100m, and candidates (how many to
+    return). Returns, per line, candidate dicts ordered by inner diameter.
+
+    Velocity bounds are found with searchsorted; the pressure-drop bound is
+    a bisection over each group's diameters, run for all (line, group)
+    pairs at once since the gradient falls as the diameter grows.
+    """
+    index = tables.pipe_index
+    pair_line, pair_lo, pair_hi = [], [], []
+    count = len(lines)
+    flow_rate = np.empty(count)
+    density = np.empty(count)
+    viscosity = np.empty(count)
+    max_gradient = np.full(count, np.inf)
+    for i, line in enumerate(lines):
+        if line.get("max_velocity_m_per_s") is None and line.get("max_pressure_drop_bar_per_100m") is None:
+            raise ValueError("Each line needs max_velocity_m_per_s and/or max_pressure_drop_bar_per_100m")
+        limits = (line.get("max_velocity_m_per_s"), line.get("max_pressure_drop_bar_per_100m"))
+        if any(limit is not None and not limit > 0 for limit in limits):
+            raise ValueError("max_velocity_m_per_s and max_pressure_drop_bar_per_100m must be positive")
+        if not abs(line["flow_rate_m3_per_h"]) > 0:
+            raise ValueError("flow_rate_m3_per_h must be non-zero")
+        flow_rate[i] = abs(line["flow_rate_m3_per_h"]) / 3600.0
+        temperature = line.get("temperature_in_k")
+        pressure = line.get("pressure_in_bar_g")
+        properties = tables.fluid(line["fluid"]).properties(
+            DEFAULT_TEMPERATURE_K if temperature is None else temperature,
+            DEFAULT_PRESSURE_BAR_G if pressure is None else pressure,
+        )
+        density[i] = properties["density"][0]
+        viscosity[i] = properties["viscosity"][0]
+        if line.get("max_pressure_drop_bar_per_100m") is not None:
+            max_gradient[i] = line["max_pressure_drop_bar_per_100m"] * BAR / 100.0
+        min_diameter = 0.0
+        if line.get("max_velocity_m_per_s") is not None:
+            min_diameter = np.sqrt(4.0 * flow_rate[i] / (np.pi * line["max_velocity_m_per_s"]))
+        for start, stop in index.select_groups(line.get("material"), line.get("schedule_or_class")):
+            pair_line.append(i)
+            pair_lo.append(start + int(np.searchsorted(index.diameter[start:stop], min_diameter, side="left")))
+            pair_hi.append(stop)
+
+    pair_line = np.array(pair_line, dtype=np.int64)
+    lo = np.array(pair_lo, dtype=np.int64)
+    hi = np.array(pair_hi, dtype=np.int64)
+    stop = hi.copy()
+    # Vectorized bisection: first position in [lo, hi) within the pressure-drop limit
+    while True:
+        active = np.flatnonzero(lo < hi)
+        if not len(active):
+            break
+        mid = (lo[active] + hi[active]) // 2
+        line = pair_line[active]
+        gradient, _ = _pressure_gradient(
+            flow_rate[line], index.diameter[mid], index.roughness[mid], density[line], viscosity[line], method
+        )
+        fits = gradient <= max_gradient[line]
+        hi[active[fits]] = mid[fits]
+        lo[active[~fits]] = mid[~fits] + 1
+
+    found = lo < stop
+    position = lo[found]
+    line = pair_line[found]
+    gradient, velocity = _pressure_gradient(
+        flow_rate[line], index.diameter[position], index.roughness[position], density[line], viscosity[line], method
+    )
+    pipes = tables.pipes
+    results = [[] for _ in range(count)]
+    for i, pos, grad, vel in zip(line.tolist(), position.tolist(), gradient.tolist(), velocity.tolist()):
+        pipe = index.pipe[pos]
+        results[i].append({
+            "pipe_id": pipes.ids[pipe],
+            "material": pipes.material[pipe],
+            "schedule_or_class": pipes.schedule[pipe],
+            "size": float(pipes.size[pipe]),
+            "inner_diameter_m": float(index.diameter[pos]),
+            "velocity_m_per_s": vel,
+            "pressure_drop_bar_per_100m": grad * 100.0 / BAR,
+        })
+    for i, candidates in enumerate(results):
+        candidates.sort(key=lambda candidate: candidate["inner_diameter_m"])
+        del candidates[lines[i].get("candidates") or 3:]
+    return results
@@ -0,0 +1,85 @@
+"""
+Cold import-time report for the lambdas.
+
+    python -m shared.importtime [--top 15] [--check]
+
+Each lambda's main module is imported in a fresh interpreter with
+`python -X importtime`, and the slowest imports are listed by cumulative
+time. With --check the command exits non-zero when a lambda's total import
+time exceeds its budget: IMPORT_TIME_BUDGET_MS, or IMPORT_TIME_BUDGET_MS_<NAME>
+for a single lambda (e.g. IMPORT_TIME_BUDGET_MS_TENANT). tests/test_importtime.py
+asserts the same budgets, so a plain pytest run catches regressions too.
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+LAMBDAS = {
+    "masterdata": "masterdata_lambda.main",
+    "networkflow": "networkflow_lambda.main",
+    "tenant": "tenant_lambda.main",
+    "userrole": "user_role_permission_lambda.main",
+    "api": "api_lambda.main",
+}
+DEFAULT_BUDGET_MS = float(os.getenv('IMPORT_TIME_BUDGET_MS', '2000'))
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module: str) -> list:
+    """Return (self_us, cumulative_us, depth, name) for every import of module."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return entries
+
+
+def total_ms(entries: list) -> float:
+    # Top-level imports (depth 0 after the leading space) add up to the whole cost
+    return sum(cumulative for _, cumulative, depth, _ in entries if depth == 0) / 1000
+
+
+def budget_ms(name: str) -> float:
+    return float(os.getenv(f"IMPORT_TIME_BUDGET_MS_{name.upper()}", DEFAULT_BUDGET_MS))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Report cold import time per lambda")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to list")
+    parser.add_argument("--check", action="store_true", help="fail when a lambda exceeds its budget")
+    parser.add_argument("lambdas", nargs="*", default=list(LAMBDAS))
+    args = parser.parse_args(argv)
+
+    over_budget = []
+    for name in args.lambdas:
+        entries = measure(LAMBDAS[name])
+        total = total_ms(entries)
+        budget = budget_ms(name)
+        print(f"\n{name} ({LAMBDAS[name]}): {total:.1f} ms (budget {budget:.0f} ms)")
+        print(f"  {'cumulative ms':>13} {'self ms':>8}  module")
+        for self_us, cumulative_us, _, module in sorted(entries, key=lambda e: e[1], reverse=True)[:args.top]:
+            print(f"  {cumulative_us / 1000:13.1f} {self_us / 1000:8.1f}  {module}")
+        if total > budget:
+            over_budget.append(name)
+
+    if over_budget:
+        print(f"\nOver import-time budget: {', '.join(over_budget)}")
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+# Pluggable job queues.
+#
+# TENANT_JOB_QUEUE selects the backend:
+#   local  - in-process queue drained by a daemon thread (development and tests)
+#   sqlite - durable queue in the SQLite file JOB_QUEUE_SQLITE_PATH, drained by a polling thread
+#   sqs    - Amazon SQS queue JOB_QUEUE_URL, consumed by a Lambda SQS trigger
+import os
+import json
+import time
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from shared.aws import get_client
+
+JOB_QUEUE_BACKEND = os.getenv('TENANT_JOB_QUEUE', 'local').lower()
+JOB_QUEUE_URL = os.getenv('JOB_QUEUE_URL')
+JOB_QUEUE_SQLITE_PATH = os.getenv('JOB_QUEUE_SQLITE_PATH', '/tmp/jobs.sqlite3')
+JOB_QUEUE_POLL_INTERVAL = float(os.getenv('JOB_QUEUE_POLL_INTERVAL', '1'))
+
+
+class LocalJobQueue:
+    """Runs jobs on a daemon thread in this process."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _run(self):
+        while True:
+            message = self._queue.get()
+            try:
+                self.handler(message)
+            except Exception as e:
+                print(f"Job {message} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def enqueue(self, message: dict):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._queue.put(message)
+
+    def join(self):
+        self._queue.join()
+
+
+class SQLiteJobQueue:
+    """Durable queue in a SQLite file; messages survive a process restart."""
+
+    def __init__(self, handler, path: str = JOB_QUEUE_SQLITE_PATH, poll_interval: float = JOB_QUEUE_POLL_INTERVAL):
+        self.handler = handler
+        self.path = path
+        self.poll_interval = poll_interval
+        self._thread = None
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_queue ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, body TEXT NOT NULL, "
+                "enqueued_at REAL NOT NULL, claimed_at REAL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def claim(self):
+        """Claim the oldest unclaimed message; returns (id, message) or None."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, body FROM job_queue WHERE claimed_at IS NULL ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute("UPDATE job_queue SET claimed_at = ? WHERE id = ?", (time.time(), row[0]))
+            conn.execute("COMMIT")
+        return row[0], json.loads(row[1])
+
+    def ack(self, message_id: int):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM job_queue WHERE id = ?", (message_id,))
+
+    def drain(self) -> int:
+        """Process every queued message on the calling thread."""
+        processed = 0
+        while True:
+            claimed = self.claim()
+            if claimed is None:
+                return processed
+            message_id, message = claimed
+            try:
+                self.handler(message)
+            except Exception as e:
+                print(f"Job {message} failed: {e}")
+            self.ack(message_id)
+            processed += 1
+
+    def _run(self):
+        while True:
+            if not self.drain():
+                time.sleep(self.poll_interval)
+
+    def enqueue(self, message: dict):
+        with self._connect() as conn:
+            conn.execute("INSERT INTO job_queue (body, enqueued_at) VALUES (?, ?)", (json.dumps(message), time.time()))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+
+class SQSJobQueue:
+    """Sends messages to SQS; a Lambda SQS trigger hands them to the handler."""
+
+    def __init__(self, handler, queue_url: str = JOB_QUEUE_URL):
+        if not queue_url:
+            raise RuntimeError("JOB_QUEUE_URL must be set to use the sqs job queue")
+        self.handler = handler
+        self.queue_url = queue_url
+        self._client = get_client('sqs')
+
+    def enqueue(self, message: dict):
+        self._client.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(message))
+
+    def handle_event(self, event: dict):
+        for record in event.get("Records", []):
+            self.handler(json.loads(record["body"]))
+
+
+JOB_QUEUES = {
+    "local": LocalJobQueue,
+    "sqlite": SQLiteJobQueue,
+    "sqs": SQSJobQueue,
+}
+
+
+def create_job_queue(handler, backend: str = None):
+    backend = (backend or JOB_QUEUE_BACKEND).lower()
+    if backend not in JOB_QUEUES:
+        raise ValueError(f"Unknown job queue backend: {backend}")
+    return JOB_QUEUES[backend](handler)
@@ -0,0 +1,191 @@
+import os
+import time
+import hashlib
+import base64
+import threading
+import uuid
+from typing import Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from shared.models import Pipe, Component, Fitting, Gas, Liquid, Unit
+from shared.schemas import PipeOut, ComponentOut, FittingOut, GasOut, LiquidOut, UnitOut
+from shared.serialization import select_rows, dumps, converter
+
+# resource type -> (model, response schema)
+RESOURCES = {
+    "pipe": (Pipe, PipeOut),
+    "component": (Component, ComponentOut),
+    "fitting": (Fitting, FittingOut),
+    "gas": (Gas, GasOut),
+    "liquid": (Liquid, LiquidOut),
+    "unit": (Unit, UnitOut),
+}
+
+# Columns clients may filter on, per resource type. Each has an index from
+# Alembic revision 003.
+FILTER_COLUMNS = {
+    "pipe": ("material", "schedule_or_class", "size"),
+    "fitting": ("type", "size"),
+    "gas": ("state",),
+    "liquid": ("state",),
+    "component": ("material",),
+    "unit": (),
+}
+
+MASTERDATA_MAX_PAGE_SIZE = int(os.getenv('MASTERDATA_MAX_PAGE_SIZE', '1000'))
+
+# Seconds a cached resource is served before its data version is checked again.
+MASTERDATA_CACHE_TTL = float(os.getenv('MASTERDATA_CACHE_TTL', '300'))
+
+
+class MasterdataEntry:
+    def __init__(self, version: tuple, rows: list, body: bytes, etag: str, checked_at: float):
+        self.version = version
+        self.rows = rows
+        self.body = body
+        self.etag = etag
+        self.checked_at = checked_at
+
+
+class MasterdataCache:
+    """
+    Process-wide cache of serialized masterdata keyed by (tenant, resource type).
+    An entry is rebuilt only when the table's data version changes, i.e. its row
+    count or latest created_at/modified_at timestamp.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.loads = 0
+
+    @staticmethod
+    def _data_version(db: Session, Model) -> tuple:
+        count, max_created, max_modified = db.query(
+            func.count(Model.id), func.max(Model.created_at), func.max(Model.modified_at)
+        ).one()
+        return (count, str(max_created), str(max_modified))
+
+    @staticmethod
+    def _build(Model, Schema, db: Session, version: tuple, now: float) -> MasterdataEntry:
+        rows = select_rows(db, Model, Schema)
+        body = dumps(rows)
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        return MasterdataEntry(version, rows, body, etag, now)
+
+    def get(self, db: Session, tenant_id: str, resource_type: str) -> MasterdataEntry:
+        Model, Schema = RESOURCES[resource_type]
+        key = (tenant_id, resource_type)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry and now - entry.checked_at < self.ttl:
+            self.hits += 1
+            return entry
+
+        version = self._data_version(db, Model)
+        if entry and entry.version == version:
+            self.revalidations += 1
+            entry.checked_at = now
+            return entry
+
+        self.loads += 1
+        entry = self._build(Model, Schema, db, version, now)
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def invalidate(self, tenant_id: str = None, resource_type: str = None):
+        with self._lock:
+            for key in list(self._entries):
+                if (tenant_id is None or key[0] == tenant_id) and (resource_type is None or key[1] == resource_type):
+                    del self._entries[key]
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "loads": self.loads,
+        }
+
+
+masterdata_cache = MasterdataCache(MASTERDATA_CACHE_TTL)
+
+def encode_cursor(last_id) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode("ascii")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> uuid.UUID:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return uuid.UUID(base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii"))
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def query_masterdata(
+    db: Session,
+    resource_type: str,
+    filters: dict,
+    size_min: Optional[float] = None,
+    size_max: Optional[float] = None,
+    fields: Optional[list] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+):
+    """
+    Filtered, projected and keyset-paginated read of a masterdata table.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    Model, Schema = RESOURCES[resource_type]
+    allowed = FILTER_COLUMNS[resource_type]
+    unknown = [name for name, value in filters.items() if value is not None and name not in allowed]
+    if unknown or ((size_min is not None or size_max is not None) and "size" not in allowed):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported filter for '{resource_type}'; allowed filters: {', '.join(allowed) or 'none'}",
+        )
+
+    schema_fields = list(Schema.__fields__)
+    if fields:
+        invalid = [name for name in fields if name not in Schema.__fields__]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(invalid)}")
+        selected = list(dict.fromkeys(fields))
+    else:
+        selected = schema_fields
+    # id is always selected so the cursor can be built from the last row
+    columns = [Model.id] + [getattr(Model, name) for name in selected if name != "id"]
+
+    stmt = select(*columns)
+    for name, value in filters.items():
+        if value is not None:
+            stmt = stmt.where(getattr(Model, name) == value)
+    if size_min is not None:
+        stmt = stmt.where(Model.size >= size_min)
+    if size_max is not None:
+        stmt = stmt.where(Model.size <= size_max)
+    if cursor:
+        stmt = stmt.where(Model.id > decode_cursor(cursor))
+    stmt = stmt.order_by(Model.id)
+    if limit is not None:
+        limit = max(1, min(limit, MASTERDATA_MAX_PAGE_SIZE))
+        stmt = stmt.limit(limit + 1)
+
+    result = db.execute(stmt).all()
+    next_cursor = None
+    if limit is not None and len(result) > limit:
+        result = result[:limit]
+        next_cursor = encode_cursor(result[-1][0])
+
+    converters = {name: converter(Schema.__fields__[name]) for name in selected}
+    rows = []
+    for record in result:
+        values = dict(zip(["id"] + [name for name in selected if name != "id"], record))
+        for name, convert in converters.items():
+            if convert is not None and values[name] is not None:
+                values[name] = convert(values[name])
+        rows.append({name: values[name] for name in selected})
+    return rows, next_cursor
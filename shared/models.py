@@ -1,6 +1,6 @@
 
 import uuid
-from sqlalchemy import Column, String, DateTime, Integer, Float, Boolean, ForeignKey, NUMERIC
+from sqlalchemy import Column, String, DateTime, Integer, BigInteger, Float, Boolean, ForeignKey, NUMERIC, JSON, true
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -18,6 +18,18 @@ class Tenant(Base):
     modified_at = Column(DateTime, nullable=True)
     modified_by = Column(UUID(as_uuid=True), nullable=True)
 
+class TenantJob(Base):
+    __tablename__ = 'tenant_job'
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    tenant_id = Column(String(128), nullable=False)
+    status = Column(String(16), nullable=False)
+    payload = Column(JSON)
+    stages = Column(JSON)
+    error = Column(String(1024), nullable=True)
+    created_at = Column(DateTime)
+    created_by = Column(UUID(as_uuid=True))
+    modified_at = Column(DateTime, nullable=True)
+
 class Pipe(Base):
     __tablename__ = 'pipe'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -110,11 +122,13 @@ class Unit(Base):
     modified_by = Column(String(64), nullable=True)
 
 # --- TENANT DATABASE MODELS ---
+# shared/provisioning.py creates these tables from this metadata, so keep them in step with
+# the Alembic revisions: server defaults, constraints and indexes included.
 class Role(Base):
     __tablename__ = 'role'
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(64))
-    is_active = Column(Boolean, default=True)
+    is_active = Column(Boolean, default=True, server_default=true())
     created_at = Column(DateTime)
     created_by = Column(UUID(as_uuid=True))
     modified_at = Column(DateTime, nullable=True)
@@ -125,7 +139,7 @@ class Permission(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     code = Column(String(64), unique=True)
     description = Column(String(256))
-    is_active = Column(Boolean, default=True)
+    is_active = Column(Boolean, default=True, server_default=true())
     created_at = Column(DateTime)
     created_by = Column(UUID(as_uuid=True))
     modified_at = Column(DateTime, nullable=True)
@@ -146,7 +160,8 @@ class User(Base):
     id = Column(UUID(as_uuid=True), primary_key=True)
     name = Column(String(64))
     email = Column(String(64), unique=True)
-    role_id = Column(UUID(as_uuid=True), ForeignKey('role.id'))
+    # No foreign key: revision 004 created the column without one
+    role_id = Column(UUID(as_uuid=True))
     is_active = Column(Boolean)
     created_at = Column(DateTime)
     created_by = Column(UUID(as_uuid=True))
@@ -158,8 +173,26 @@ class NetworkFlow(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(64))
     flow_url = Column(String(256))
+    # sha256 of the flow file; see FlowObject
+    content_hash = Column(String(64), nullable=True, index=True)
     is_active = Column(Boolean)
     created_at = Column(DateTime)
     created_by = Column(UUID(as_uuid=True))
     modified_at = Column(DateTime, nullable=True)
     modified_by = Column(UUID(as_uuid=True), nullable=True)
+
+class FlowObject(Base):
+    # Content-addressed flow file in S3, shared by every network_flow row with the same content_hash
+    __tablename__ = 'flow_object'
+    sha256 = Column(String(64), primary_key=True)
+    s3_key = Column(String(256), nullable=False)
+    size = Column(BigInteger)
+    # 0 marks a tombstone whose object is deleted after the releasing commit; see shared/flow_storage.py
+    ref_count = Column(Integer, nullable=False, default=0, server_default='0')
+    created_at = Column(DateTime)
+
+class PermissionVersion(Base):
+    # Single row bumped by every user/role/permission write; see shared/permissions.py
+    __tablename__ = 'permission_version'
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0, server_default='0')
@@ -0,0 +1,139 @@
+# Two-level cache of parsed network flows.
+#
+#   1. In memory: an LRU of Network objects per container.
+#   2. On local disk: each Network's arrays as .npy files under
+#      NETWORK_CACHE_DIR (/tmp on Lambda), loaded back with mmap_mode="r" so
+#      a warm container that evicted the entry from memory maps the arrays
+#      instead of downloading and parsing the flow file again.
+#
+# Entries are keyed by tenant, flow id, the flow file's content hash and the
+# masterdata version of the HydraulicTables used to parse it, since pipe
+# diameters and fitting K factors are resolved at parse time. A changed file
+# or catalogue therefore misses and is parsed afresh; stale directories are
+# pruned oldest first once the disk budget is exceeded.
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+from shared.hydraulics import HydraulicTables
+from shared.network_solver import Network, parse_network
+from shared.flow_storage import read_flow_file
+
+NETWORK_CACHE_SIZE = int(os.getenv('NETWORK_CACHE_SIZE', '16'))
+NETWORK_CACHE_DIR = os.getenv('NETWORK_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'network_cache'))
+NETWORK_CACHE_DISK_BYTES = int(os.getenv('NETWORK_CACHE_DISK_MB', '256')) * 1024 * 1024
+
+
+class NetworkCache:
+    def __init__(self, max_size: int, directory: str, disk_bytes: int):
+        self.max_size = max_size
+        self.directory = directory
+        self.disk_bytes = disk_bytes
+        self._entries = OrderedDict()  # key -> Network
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(tenant_id: str, flow, tables: HydraulicTables) -> tuple:
+        # Rows stored before content hashing fall back to their URL and modification time
+        version = flow.content_hash or hashlib.sha256(f"{flow.flow_url}|{flow.modified_at}".encode()).hexdigest()
+        return (str(tenant_id), str(flow.id), version, tables.version)
+
+    def _path(self, key: tuple) -> str:
+        return os.path.join(self.directory, hashlib.sha256("|".join(key).encode()).hexdigest()[:32])
+
+    def _remember(self, key: tuple, network: Network):
+        with self._lock:
+            self._entries[key] = network
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _load(self, path: str):
+        try:
+            with open(os.path.join(path, "fluid.json")) as f:
+                fluid = json.load(f)
+            arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in Network.ARRAYS}
+            os.utime(path)  # recently used entries are pruned last
+        except (OSError, ValueError):
+            return None
+        return Network(fluid=fluid, **arrays)
+
+    def _spill(self, path: str, network: Network):
+        # Written to a temporary directory first so readers never see a partial entry
+        staging = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            staging = tempfile.mkdtemp(dir=self.directory, prefix=".")
+            for name in Network.ARRAYS:
+                np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(getattr(network, name)))
+            with open(os.path.join(staging, "fluid.json"), "w") as f:
+                json.dump(network.fluid, f)
+            os.rename(staging, path)
+        except OSError as e:
+            # Another process got there first, or /tmp is full; the memory level still works
+            print(f"Network cache spill skipped: {e}")
+            if staging:
+                shutil.rmtree(staging, ignore_errors=True)
+            return
+        self._prune()
+
+    def _prune(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith("."):
+                continue  # still being written
+            path = os.path.join(self.directory, name)
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+                entries.append((os.stat(path).st_mtime, size, path))
+            except OSError:
+                continue  # pruned by another process meanwhile
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.disk_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def get(self, tenant_id: str, flow, tables: HydraulicTables) -> Network:
+        """Parsed Network for a network_flow row, downloading and parsing only on a miss."""
+        key = self._key(tenant_id, flow, tables)
+        with self._lock:
+            network = self._entries.get(key)
+            if network is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return network
+        path = self._path(key)
+        network = self._load(path)
+        if network is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            network = parse_network(read_flow_file(flow.flow_url), tables)
+            self._spill(path, network)
+        self._remember(key, network)
+        return network
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+network_cache = NetworkCache(NETWORK_CACHE_SIZE, NETWORK_CACHE_DIR, NETWORK_CACHE_DISK_BYTES)
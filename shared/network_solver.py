@@ -0,0 +1,283 @@
+# Steady-state hydraulic network solver for uploaded network flow files.
+#
+# A flow file is JSON:
+#
+#     {
+#       "fluid": "Water", "temperature_in_k": 293.15, "pressure_in_bar_g": 0,
+#       "nodes": [
+#         {"id": "tank", "elevation_m": 10, "pressure_bar_g": 0},     # fixed pressure
+#         {"id": "j1", "elevation_m": 0, "demand_m3_per_h": 12.5}     # junction
+#       ],
+#       "pipes": [
+#         {"id": "p1", "from": "tank", "to": "j1", "length_m": 250,
+#          "pipe_id": "<pipe uuid>",                                   # or material,
+#          "fittings": {"SB": 2}}                                      # schedule_or_class, size
+#       ]
+#     }
+#
+# Flows and heads are solved with the global gradient algorithm (Todini and
+# Pilati): Newton iterations on the head-loss and continuity equations where
+# each step solves one sparse symmetric positive definite system in the
+# junction heads, A21 D A12 dH = rhs, D = diag(1 / (2 r|Q|)).
+import json
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import spsolve
+from shared.hydraulics import (
+    HydraulicTables, friction_factor, reynolds, GRAVITY, BAR,
+    DEFAULT_TEMPERATURE_K, DEFAULT_PRESSURE_BAR_G,
+)
+
+SOLVER_MAX_ITERATIONS = 100
+SOLVER_TOLERANCE = 1e-6  # largest flow change between iterations, relative to the largest flow
+# Keeps 1 / (2 r|Q|) finite for pipes with no flow
+MIN_FLOW = 1e-9
+
+
+class Network:
+    """
+    Node and pipe data as flat arrays. Ids are kept as fixed-width unicode
+    arrays so the whole structure can be saved without pickling.
+    """
+
+    ARRAYS = (
+        "node_ids", "elevation", "demand", "fixed", "fixed_pressure",
+        "pipe_ids", "start", "end", "length", "material", "size", "diameter", "roughness", "k_total",
+    )
+
+    def __init__(self, node_ids, elevation, demand, fixed, fixed_pressure,
+                 pipe_ids, start, end, length, material, size, diameter, roughness, k_total, fluid: dict):
+        self.node_ids = node_ids
+        self.elevation = elevation
+        self.demand = demand
+        self.fixed = fixed
+        self.fixed_pressure = fixed_pressure
+        self.pipe_ids = pipe_ids
+        self.start = start
+        self.end = end
+        self.length = length
+        # Catalogue material and nominal size of each pipe, for swapping schedules
+        self.material = material
+        self.size = size
+        self.diameter = diameter
+        self.roughness = roughness
+        self.k_total = k_total
+        # Fluid name and operating conditions from the flow file
+        self.fluid = fluid
+
+    def replace(self, **arrays) -> "Network":
+        """Copy sharing every array not given in arrays."""
+        values = {name: getattr(self, name) for name in self.ARRAYS}
+        values.update(arrays)
+        return Network(fluid=dict(self.fluid), **values)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def pipe_count(self) -> int:
+        return len(self.pipe_ids)
+
+
+def parse_network(document, tables: HydraulicTables) -> Network:
+    """Build a Network from a flow file (bytes, str or already decoded dict)."""
+    if isinstance(document, (bytes, str)):
+        try:
+            document = json.loads(document)
+        except ValueError as e:
+            raise ValueError(f"Flow file is not valid JSON: {e}")
+    nodes = document.get("nodes") or []
+    pipes = document.get("pipes") or []
+    if not nodes or not pipes:
+        raise ValueError("Flow file must contain nodes and pipes")
+
+    node_index = {}
+    elevation = np.zeros(len(nodes))
+    demand = np.zeros(len(nodes))
+    fixed = np.zeros(len(nodes), dtype=bool)
+    fixed_pressure = np.zeros(len(nodes))
+    for i, node in enumerate(nodes):
+        node_id = str(node["id"])
+        if node_id in node_index:
+            raise ValueError(f"Duplicate node id: {node_id}")
+        node_index[node_id] = i
+        elevation[i] = node.get("elevation_m") or 0.0
+        demand[i] = (node.get("demand_m3_per_h") or 0.0) / 3600.0
+        if node.get("pressure_bar_g") is not None:
+            fixed[i] = True
+            fixed_pressure[i] = node["pressure_bar_g"] * BAR
+    if not fixed.any():
+        raise ValueError("Flow file needs at least one node with a fixed pressure_bar_g")
+
+    start = np.empty(len(pipes), dtype=np.int64)
+    end = np.empty(len(pipes), dtype=np.int64)
+    length = np.empty(len(pipes))
+    pipe_index = np.empty(len(pipes), dtype=np.int64)
+    k_total = np.zeros(len(pipes))
+    for i, pipe in enumerate(pipes):
+        try:
+            start[i] = node_index[str(pipe["from"])]
+            end[i] = node_index[str(pipe["to"])]
+        except KeyError as e:
+            raise ValueError(f"Pipe {pipe.get('id')} references unknown node {e}")
+        length[i] = pipe["length_m"]
+        pipe_index[i] = tables.pipes.index(pipe.get("pipe_id"), pipe.get("material"), pipe.get("schedule_or_class"), pipe.get("size"))
+        for fitting_type, count in (pipe.get("fittings") or {}).items():
+            k_total[i] += count * tables.fittings.k_factor(fitting_type, tables.pipes.size[pipe_index[i]])
+
+    return Network(
+        node_ids=np.array([str(node["id"]) for node in nodes]),
+        elevation=elevation,
+        demand=demand,
+        fixed=fixed,
+        fixed_pressure=fixed_pressure,
+        pipe_ids=np.array([str(pipe.get("id", i)) for i, pipe in enumerate(pipes)]),
+        start=start,
+        end=end,
+        length=length,
+        material=np.array([str(material) for material in tables.pipes.material[pipe_index]]),
+        size=tables.pipes.size[pipe_index],
+        diameter=tables.pipes.inner_diameter[pipe_index],
+        roughness=tables.pipes.roughness[pipe_index],
+        k_total=k_total,
+        fluid={
+            "name": document.get("fluid"),
+            "temperature_in_k": document.get("temperature_in_k"),
+            "pressure_in_bar_g": document.get("pressure_in_bar_g"),
+        },
+    )
+
+
+def _check_connected(network: Network):
+    # Every junction needs a path to a fixed-pressure node, otherwise the system is singular
+    n = network.node_count
+    graph = sp.coo_matrix((np.ones(network.pipe_count), (network.start, network.end)), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    anchored = np.isin(labels, labels[network.fixed])
+    if not anchored.all():
+        floating = network.node_ids[~anchored]
+        raise ValueError(f"{len(floating)} node(s) are not connected to a fixed-pressure node, e.g. {floating[0]}")
+
+
+def solve_network(network: Network, density: float, viscosity: float, method: str = "swamee_jain",
+                  max_iterations: int = SOLVER_MAX_ITERATIONS, tolerance: float = SOLVER_TOLERANCE) -> dict:
+    """
+    Solve for pipe flows (m3/s, positive from 'from' to 'to') and node heads.
+    Returns arrays keyed by result name plus convergence information.
+    """
+    _check_connected(network)
+    junctions = np.flatnonzero(~network.fixed)
+    column = np.full(network.node_count, -1, dtype=np.int64)
+    column[junctions] = np.arange(len(junctions))
+    pipe_rows = np.arange(network.pipe_count)
+
+    # Head of a node in metres of fluid: elevation plus pressure head
+    fixed_head = np.where(network.fixed, network.elevation + network.fixed_pressure / (density * GRAVITY), 0.0)
+
+    # A12 maps junction heads onto pipes (-1 at the start node, +1 at the end node);
+    # A10 does the same for fixed heads
+    def incidence(nodes, sign):
+        mask = column[nodes] >= 0
+        return pipe_rows[mask], column[nodes[mask]], np.full(mask.sum(), sign, dtype=np.float64)
+    rows_s, cols_s, vals_s = incidence(network.start, -1.0)
+    rows_e, cols_e, vals_e = incidence(network.end, 1.0)
+    A12 = sp.csr_matrix(
+        (np.concatenate([vals_s, vals_e]), (np.concatenate([rows_s, rows_e]), np.concatenate([cols_s, cols_e]))),
+        shape=(network.pipe_count, len(junctions)),
+    )
+    A21 = A12.T.tocsr()
+    fixed_term = -fixed_head[network.start] * network.fixed[network.start] + fixed_head[network.end] * network.fixed[network.end]
+    demand = network.demand[junctions]
+
+    area = np.pi * network.diameter ** 2 / 4.0
+    relative_roughness = network.roughness / network.diameter
+    # Initial guess: 1 m/s in every pipe, heads at the mean fixed head
+    flow = area * 1.0
+    head = np.full(len(junctions), fixed_head[network.fixed].mean())
+
+    converged = False
+    change = np.inf
+    for iteration in range(1, max_iterations + 1):
+        velocity = flow / area
+        re = reynolds(density, velocity, network.diameter, viscosity)
+        f = friction_factor(re, relative_roughness, method)
+        # Head loss h = r |Q| Q with r from Darcy-Weisbach plus the fittings
+        r = (f * network.length / network.diameter + network.k_total) / (2.0 * GRAVITY * area ** 2)
+        r_abs_q = np.maximum(r * np.abs(flow), r * MIN_FLOW)
+        # Residuals of the energy (per pipe) and continuity (per junction) equations
+        energy = r_abs_q * flow + A12 @ head + fixed_term
+        continuity = A21 @ flow - demand
+        d = 1.0 / (2.0 * r_abs_q)
+        system = (A21 @ sp.diags(d) @ A12).tocsc()
+        head_step = spsolve(system, continuity - A21 @ (d * energy))
+        flow_step = -d * (energy + A12 @ head_step)
+        head = head + head_step
+        flow = flow + flow_step
+        change = np.max(np.abs(flow_step)) / max(np.max(np.abs(flow)), MIN_FLOW)
+        if change < tolerance:
+            converged = True
+            break
+
+    node_head = fixed_head.copy()
+    node_head[junctions] = head
+    velocity = flow / area
+    re = reynolds(density, velocity, network.diameter, viscosity)
+    f = friction_factor(re, relative_roughness, method)
+    headloss = node_head[network.start] - node_head[network.end]
+    return {
+        "converged": converged,
+        "iterations": iteration,
+        "max_flow_change": float(change),
+        "head": node_head,
+        "pressure": (node_head - network.elevation) * density * GRAVITY,
+        "flow": flow,
+        "velocity": velocity,
+        "reynolds": re,
+        "friction_factor": f,
+        "headloss": headloss,
+    }
+
+
+def solve_flow_file(document, tables: HydraulicTables, fluid: str = None, temperature: float = None,
+                    pressure: float = None, method: str = "swamee_jain", network: Network = None) -> dict:
+    """Parse (unless network is given) and solve a flow file, returning a JSON-ready result."""
+    network = network if network is not None else parse_network(document, tables)
+    fluid_name = fluid or network.fluid.get("name")
+    if not fluid_name:
+        raise ValueError("No fluid given in the request or the flow file")
+    if temperature is None:
+        temperature = network.fluid.get("temperature_in_k") or DEFAULT_TEMPERATURE_K
+    if pressure is None:
+        pressure = network.fluid.get("pressure_in_bar_g") or DEFAULT_PRESSURE_BAR_G
+    properties = tables.fluid(fluid_name).properties(temperature, pressure)
+    density = float(properties["density"][0])
+    result = solve_network(network, density, float(properties["viscosity"][0]), method)
+    return {
+        "fluid": tables.fluid(fluid_name).name,
+        "converged": result["converged"],
+        "iterations": result["iterations"],
+        "max_flow_change": result["max_flow_change"],
+        "nodes": [
+            {"id": node_id, "head_m": head, "pressure_bar_g": node_pressure / BAR, "demand_m3_per_h": demand * 3600.0}
+            for node_id, head, node_pressure, demand in zip(
+                network.node_ids.tolist(), result["head"].tolist(), result["pressure"].tolist(), network.demand.tolist()
+            )
+        ],
+        "pipes": [
+            {
+                "id": pipe_id,
+                "flow_m3_per_h": flow * 3600.0,
+                "velocity_m_per_s": velocity,
+                "reynolds": re,
+                "friction_factor": f,
+                "headloss_m": headloss,
+                "pressure_drop_pa": headloss * density * GRAVITY,
+            }
+            for pipe_id, flow, velocity, re, f, headloss in zip(
+                network.pipe_ids.tolist(), result["flow"].tolist(), result["velocity"].tolist(),
+                result["reynolds"].tolist(), result["friction_factor"].tolist(), result["headloss"].tolist(),
+            )
+        ],
+    }
@@ -0,0 +1,182 @@
+# Role-based permission checks.
+#
+# Per tenant, the user -> role -> role_permission -> permission chain is
+# compiled into:
+#   code_bits   permission code -> bit position
+#   role_bits   role id -> int bitset of the role's permission bits
+#   user_roles  user id -> role id
+# so a check is two dict lookups and a bit test. The compiled set is tagged
+# with the tenant's permission_version row, which every user, role,
+# permission and role_permission write bumps in its own transaction. The
+# container that served the write drops its copy once that commits; other warm
+# containers compare versions at most once per PERMISSION_CACHE_TTL seconds
+# and otherwise run no queries at all. A user missing from the compiled set
+# (perhaps created through another container) triggers an early version check,
+# at most once per PERMISSION_CACHE_TTL per tenant so that tokens of unknown
+# users cannot force a query on every request.
+#
+# Checks are opt-in with PERMISSION_CHECKS while roles are being assigned.
+import os
+import time
+import threading
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from shared.db import get_db
+from shared.models import User, Role, Permission, RolePermission, PermissionVersion
+from shared.security import verify_token
+
+PERMISSION_CHECKS = os.getenv('PERMISSION_CHECKS', 'false').lower() in ('1', 'true', 'yes')
+# Seconds a compiled permission set is trusted before its version is checked again
+PERMISSION_CACHE_TTL = float(os.getenv('PERMISSION_CACHE_TTL', '60'))
+# Session.info entry holding tenants whose cached permissions go stale on commit
+_CHANGED_TENANTS = "permission_changed_tenants"
+
+
+class CompiledPermissions:
+    def __init__(self, version: int, code_bits: dict, role_bits: dict, user_roles: dict, checked_at: float):
+        self.version = version
+        self.code_bits = code_bits
+        self.role_bits = role_bits
+        self.user_roles = user_roles
+        self.checked_at = checked_at
+
+    def allows(self, user_id: str, code: str) -> bool:
+        bit = self.code_bits.get(code)
+        if bit is None:
+            return False
+        return bool(self.role_bits.get(self.user_roles.get(user_id), 0) >> bit & 1)
+
+
+def _version(db: Session) -> int:
+    return db.execute(select(PermissionVersion.version).where(PermissionVersion.id == 1)).scalar() or 0
+
+
+def _compile(db: Session, version: int, now: float) -> CompiledPermissions:
+    # Rows with is_active unset count as active, as the create endpoints leave it to the client
+    permissions = db.execute(
+        select(Permission.id, Permission.code).where(Permission.is_active.isnot(False))
+    ).all()
+    code_bits = {code: bit for bit, (_, code) in enumerate(permissions)}
+    permission_bits = {permission_id: bit for bit, (permission_id, _) in enumerate(permissions)}
+    role_bits = {}
+    assignments = db.execute(
+        select(RolePermission.role_id, RolePermission.permission_id)
+        .join(Role, Role.id == RolePermission.role_id)
+        .where(Role.is_active.isnot(False))
+    ).all()
+    for role_id, permission_id in assignments:
+        bit = permission_bits.get(permission_id)
+        if bit is not None:
+            role_bits[str(role_id)] = role_bits.get(str(role_id), 0) | 1 << bit
+    user_roles = {
+        str(user_id): str(role_id)
+        for user_id, role_id in db.execute(select(User.id, User.role_id).where(User.is_active == True)).all()
+    }
+    return CompiledPermissions(version, code_bits, role_bits, user_roles, now)
+
+
+class PermissionCache:
+    """Compiled permission sets per tenant, revalidated against permission_version."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries = {}  # tenant id -> CompiledPermissions
+        self._forced_at = {}  # tenant id -> time of the last check forced by an unknown user
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.loads = 0
+        self.forced_checks = 0
+
+    def get(self, db: Session, tenant_id: str, force: bool = False) -> CompiledPermissions:
+        now = time.monotonic()
+        entry = self._entries.get(tenant_id)
+        if entry and not force and now - entry.checked_at <= self.ttl:
+            self.hits += 1
+            return entry
+        version = _version(db)
+        if entry and entry.version == version:
+            self.revalidations += 1
+            entry.checked_at = now
+            return entry
+        self.loads += 1
+        entry = _compile(db, version, now)
+        with self._lock:
+            self._entries[tenant_id] = entry
+        return entry
+
+    def _may_force(self, tenant_id: str, now: float) -> bool:
+        with self._lock:
+            forced_at = self._forced_at.get(tenant_id)
+            if forced_at is not None and now - forced_at < self.ttl:
+                return False
+            self._forced_at[tenant_id] = now
+            self.forced_checks += 1
+            return True
+
+    def allows(self, db: Session, tenant_id: str, user_id: str, code: str) -> bool:
+        started = time.monotonic()
+        entry = self.get(db, tenant_id)
+        if user_id not in entry.user_roles and entry.checked_at < started and self._may_force(tenant_id, started):
+            # Possibly a user created through another container; check the version before refusing
+            entry = self.get(db, tenant_id, force=True)
+        return entry.allows(user_id, code)
+
+    def invalidate(self, tenant_id: str):
+        with self._lock:
+            self._entries.pop(tenant_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "loads": self.loads,
+            "forced_checks": self.forced_checks,
+        }
+
+
+permission_cache = PermissionCache(PERMISSION_CACHE_TTL)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_tenants(session):
+    for tenant_id in session.info.pop(_CHANGED_TENANTS, ()):
+        permission_cache.invalidate(tenant_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_tenants(session):
+    session.info.pop(_CHANGED_TENANTS, None)
+
+
+def bump_permission_version(db: Session, tenant_id: str):
+    """
+    Call before committing a user, role, permission or role_permission write.
+    This container's cached set is dropped once the write commits.
+    """
+    # One statement, so the first writes of a new tenant cannot both insert the row
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    table = PermissionVersion.__table__
+    db.execute(
+        insert(table).values(id=1, version=1)
+        .on_conflict_do_update(index_elements=[table.c.id], set_={"version": table.c.version + 1})
+    )
+    db.info.setdefault(_CHANGED_TENANTS, set()).add(tenant_id)
+
+
+def require_permission(code: str):
+    """Dependency that returns the token claims when the caller's role grants code, 403 otherwise."""
+    def dependency(db: Session = Depends(get_db), token: dict = Depends(verify_token)):
+        if not PERMISSION_CHECKS:
+            return token
+        tenant_id = token.get("custom:tenant_id")
+        user_id = token.get("sub")
+        if not tenant_id or not user_id:
+            raise HTTPException(status_code=401, detail="Invalid token: tenant_id or user_id missing")
+        if not permission_cache.allows(db, tenant_id, user_id, code):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Permission '{code}' required")
+        return token
+    return dependency
@@ -0,0 +1,201 @@
+# Tenant database provisioning.
+#
+# TENANT_PROVISIONING_MODE selects how a new tenant database is created:
+#   ddl      - CREATE DATABASE, then the tenant tables are created statement by statement
+#              from the SQLAlchemy models (see tenant_tables_ddl)
+#   template - CREATE DATABASE ... TEMPLATE <TENANT_TEMPLATE_DB>, a file-level copy of a
+#              database kept migrated to the Alembic head
+# With TENANCY_MODE=schema the tenant gets a schema in TENANT_SCHEMA_DBNAME
+# instead, created and migrated to the Alembic head.
+import os
+import time
+import threading
+from shared.config import TENANCY_MODE, TENANT_SCHEMA_DBNAME, tenant_schema_name
+from sqlalchemy import create_engine, text, pool
+from sqlalchemy.exc import OperationalError
+
+TENANT_PROVISIONING_MODE = os.getenv('TENANT_PROVISIONING_MODE', 'ddl').lower()
+TENANT_TEMPLATE_DB = os.getenv('TENANT_TEMPLATE_DB', 'tenant_template')
+# Seconds between checks that the template is still at the Alembic head
+TEMPLATE_CHECK_INTERVAL = float(os.getenv('TENANT_TEMPLATE_CHECK_INTERVAL', '300'))
+# Seconds a failed template check or upgrade is reported again before it is retried
+TEMPLATE_RETRY_INTERVAL = float(os.getenv('TENANT_TEMPLATE_RETRY_INTERVAL', '60'))
+# CREATE DATABASE ... TEMPLATE fails while anything is connected to the template
+TEMPLATE_COPY_RETRIES = int(os.getenv('TENANT_TEMPLATE_COPY_RETRIES', '5'))
+
+# Tables created in a new tenant database; their definitions come from shared/models.py
+TENANT_TABLES = ("role", "permission", "role_permission", "user", "network_flow", "flow_object", "permission_version")
+
+# Rows every tenant starts with, as Alembic revision 008 adds them to existing tenants.
+# masterdata:read gates GET /masterdata/{resource_type} once PERMISSION_CHECKS is on.
+TENANT_SEED_STATEMENTS = [
+    '''INSERT INTO permission (id, code, description, is_active, created_at)
+        VALUES ('5f0c7d1e-2b7a-5c3e-9d41-6a8e0b3f2c17', 'masterdata:read', 'Read masterdata', TRUE, now())
+        ON CONFLICT (code) DO NOTHING''',
+    'INSERT INTO permission_version (id, version) VALUES (1, 1) ON CONFLICT (id) DO NOTHING',
+]
+
+_tenant_tables_ddl = None
+_template_checked_at = 0.0
+_template_failed_at = None
+_template_error = None
+_template_lock = threading.Lock()
+
+
+def tenant_tables_ddl() -> list:
+    """CREATE TABLE / CREATE INDEX statements for TENANT_TABLES, compiled once from Base.metadata."""
+    global _tenant_tables_ddl
+    if _tenant_tables_ddl is None:
+        from sqlalchemy.dialects import postgresql
+        from sqlalchemy.schema import CreateTable, CreateIndex
+        from shared.models import Base
+        dialect = postgresql.dialect()
+        statements = []
+        for name in TENANT_TABLES:
+            table = Base.metadata.tables[name]
+            statements.append(str(CreateTable(table, if_not_exists=True).compile(dialect=dialect)).strip())
+            statements.extend(
+                str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect))
+                for index in sorted(table.indexes, key=lambda index: index.name)
+            )
+        _tenant_tables_ddl = statements
+    return _tenant_tables_ddl
+
+
+def _server_url(db_name: str) -> str:
+    return (
+        f"postgresql://{os.getenv('dev_username')}:{os.getenv('dev_password')}"
+        f"@{os.getenv('dev_host')}:{os.getenv('dev_port', '5432')}/{db_name}"
+    )
+
+
+def _admin_engine():
+    return create_engine(_server_url(os.getenv('dev_dbname')), isolation_level="AUTOCOMMIT", poolclass=pool.NullPool)
+
+
+def _database_exists(conn, db_name: str) -> bool:
+    return conn.execute(text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": db_name}).first() is not None
+
+
+def database_exists(db_name: str) -> bool:
+    engine = _admin_engine()
+    try:
+        with engine.connect() as conn:
+            return _database_exists(conn, db_name)
+    finally:
+        engine.dispose()
+
+
+def schema_exists(schema: str) -> bool:
+    engine = create_engine(_server_url(TENANT_SCHEMA_DBNAME), poolclass=pool.NullPool)
+    try:
+        with engine.connect() as conn:
+            return conn.execute(
+                text("SELECT 1 FROM information_schema.schemata WHERE schema_name = :name"), {"name": schema}
+            ).first() is not None
+    finally:
+        engine.dispose()
+
+
+def tenant_exists(tenant_id: str) -> bool:
+    """Whether the tenant's database (or schema, in schema tenancy mode) exists."""
+    if TENANCY_MODE == "schema":
+        return schema_exists(tenant_schema_name(tenant_id))
+    return database_exists(tenant_id.lower())
+
+
+def ensure_template_database(force: bool = False):
+    """
+    Create the template database if needed and upgrade it whenever the Alembic
+    head moves. Checked at most once per TEMPLATE_CHECK_INTERVAL unless forced;
+    after a failure the error is raised again without retrying for
+    TEMPLATE_RETRY_INTERVAL seconds.
+    """
+    global _template_checked_at, _template_failed_at, _template_error
+    # Alembic is only needed here; keep it out of the tenant lambda's cold start
+    from shared.alembicMigration import resolve_revision, get_current_revision, run_alembic_upgrade_in_subprocess
+    with _template_lock:
+        now = time.monotonic()
+        if not force and now - _template_checked_at < TEMPLATE_CHECK_INTERVAL:
+            return
+        if not force and _template_failed_at is not None and now - _template_failed_at < TEMPLATE_RETRY_INTERVAL:
+            raise RuntimeError(f"Tenant template {TENANT_TEMPLATE_DB} is not usable: {_template_error}")
+        try:
+            engine = _admin_engine()
+            try:
+                with engine.connect() as conn:
+                    if not _database_exists(conn, TENANT_TEMPLATE_DB):
+                        print(f"Creating tenant template database {TENANT_TEMPLATE_DB}")
+                        conn.execute(text(f'CREATE DATABASE "{TENANT_TEMPLATE_DB}"'))
+            finally:
+                engine.dispose()
+
+            head = resolve_revision("head")
+            current = get_current_revision(TENANT_TEMPLATE_DB)
+            if current != head:
+                print(f"Upgrading tenant template {TENANT_TEMPLATE_DB} from {current} to {head}")
+                run_alembic_upgrade_in_subprocess(TENANT_TEMPLATE_DB, head)
+        except Exception as e:
+            _template_failed_at = time.monotonic()
+            _template_error = f"{type(e).__name__}: {e}"
+            raise
+        _template_checked_at = time.monotonic()
+        _template_failed_at = _template_error = None
+
+
+def _create_from_template(db_name: str):
+    ensure_template_database()
+    engine = _admin_engine()
+    try:
+        for attempt in range(TEMPLATE_COPY_RETRIES):
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text(f'CREATE DATABASE "{db_name}" TEMPLATE "{TENANT_TEMPLATE_DB}"'))
+                return
+            except OperationalError as e:
+                if "being accessed by other users" not in str(e) or attempt == TEMPLATE_COPY_RETRIES - 1:
+                    raise
+                time.sleep(0.2 * (2 ** attempt))
+    finally:
+        engine.dispose()
+
+
+def _create_with_ddl(db_name: str):
+    engine = _admin_engine()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text(f'CREATE DATABASE "{db_name}"'))
+    finally:
+        engine.dispose()
+
+    # --- Create essential tenant tables directly (not via Alembic) ---
+    tenant_engine = create_engine(_server_url(db_name), poolclass=pool.NullPool)
+    try:
+        with tenant_engine.begin() as conn:
+            for stmt in tenant_tables_ddl() + TENANT_SEED_STATEMENTS:
+                conn.execute(text(stmt))
+    finally:
+        tenant_engine.dispose()
+
+
+def _create_schema(schema: str):
+    from shared.alembicMigration import run_alembic_upgrade_in_subprocess
+    # env.py creates the schema before migrating into it
+    run_alembic_upgrade_in_subprocess(TENANT_SCHEMA_DBNAME, "head", schema=schema)
+
+
+def create_tenant_database(db_name: str, mode: str = None):
+    started = time.perf_counter()
+    if TENANCY_MODE == "schema":
+        schema = tenant_schema_name(db_name)
+        _create_schema(schema)
+        print(f"Provisioned tenant schema {schema} in {TENANT_SCHEMA_DBNAME} in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return
+    mode = (mode or TENANT_PROVISIONING_MODE).lower()
+    if mode == "template":
+        _create_from_template(db_name)
+    elif mode == "ddl":
+        _create_with_ddl(db_name)
+    else:
+        raise ValueError(f"Unknown tenant provisioning mode: {mode}")
+    print(f"Provisioned tenant database {db_name} via {mode} in {(time.perf_counter() - started) * 1000:.1f} ms")
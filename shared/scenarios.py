@@ -0,0 +1,119 @@
+# What-if scenarios over one parsed network flow.
+#
+# A scenario overrides the fluid and operating conditions, scales every
+# junction demand, and/or moves every pipe to another schedule_or_class (and
+# optionally material) at the same nominal size. The base network is parsed
+# once; scenarios only replace the arrays they change.
+#
+# Batches are solved on a process pool sized to the available cores. The base
+# network and tables reach the workers through the pool initializer: with the
+# fork start method they are inherited rather than pickled, elsewhere they are
+# pickled once per worker instead of once per scenario. Lambda has no
+# /dev/shm, so creating the pool fails there with OSError and the batch runs
+# sequentially in the request process instead.
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from shared.hydraulics import HydraulicTables
+from shared.network_solver import Network, solve_flow_file
+
+SCENARIO_WORKERS = int(os.getenv('SCENARIO_WORKERS', str(os.cpu_count() or 1)))
+SCENARIO_MAX_COUNT = int(os.getenv('SCENARIO_MAX_COUNT', '100'))
+
+# Set in each worker process by _init_worker
+_worker_state = None
+
+
+def apply_scenario(network: Network, tables: HydraulicTables, scenario: dict) -> Network:
+    """Base network with the demand and pipe overrides of one scenario applied."""
+    changes = {}
+    multiplier = scenario.get("demand_multiplier")
+    if multiplier is not None and multiplier != 1:
+        changes["demand"] = network.demand * multiplier
+    schedule = scenario.get("schedule_or_class")
+    if schedule:
+        material = np.full(network.pipe_count, scenario["material"]) if scenario.get("material") else network.material
+        # Look each distinct (material, size) pair up once rather than every pipe
+        _, first, inverse = np.unique(
+            np.char.add(np.char.add(material, "|"), network.size.astype(str)), return_index=True, return_inverse=True
+        )
+        catalogue = np.array([
+            tables.pipes.index(None, material[position], schedule, network.size[position]) for position in first
+        ], dtype=np.int64)
+        pipe_index = catalogue[inverse]
+        changes["material"] = material
+        changes["diameter"] = tables.pipes.inner_diameter[pipe_index]
+        changes["roughness"] = tables.pipes.roughness[pipe_index]
+    return network.replace(**changes)
+
+
+def run_scenario(network: Network, tables: HydraulicTables, scenario: dict, method: str) -> dict:
+    return solve_flow_file(
+        None,
+        tables,
+        fluid=scenario.get("fluid"),
+        temperature=scenario.get("temperature_in_k"),
+        pressure=scenario.get("pressure_in_bar_g"),
+        method=method,
+        network=apply_scenario(network, tables, scenario),
+    )
+
+
+def _outcome(index: int, scenario: dict, run) -> dict:
+    outcome = {"index": index, "name": scenario.get("name")}
+    try:
+        outcome["result"] = run()
+    except ValueError as e:
+        outcome["error"] = str(e)
+    return outcome
+
+
+def _init_worker(network: Network, tables: HydraulicTables, method: str):
+    global _worker_state
+    _worker_state = (network, tables, method)
+
+
+def _run_in_worker(index: int, scenario: dict) -> dict:
+    network, tables, method = _worker_state
+    return _outcome(index, scenario, lambda: run_scenario(network, tables, scenario, method))
+
+
+def _pool(workers: int, network: Network, tables: HydraulicTables, method: str):
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    try:
+        return ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(network, tables, method)
+        )
+    except (OSError, NotImplementedError) as e:
+        print(f"Process pool unavailable ({e}); running scenarios sequentially")
+        return None
+
+
+def _solve_all(network: Network, tables: HydraulicTables, scenarios: list, method: str, workers: int):
+    pool = _pool(workers, network, tables, method) if workers > 1 else None
+    if pool is None:
+        for index, scenario in enumerate(scenarios):
+            yield _outcome(index, scenario, lambda: run_scenario(network, tables, scenario, method))
+        return
+    try:
+        futures = [pool.submit(_run_in_worker, index, scenario) for index, scenario in enumerate(scenarios)]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # Also reached when the client disconnects and the generator is closed
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_scenarios(network: Network, tables: HydraulicTables, scenarios: list, method: str = "swamee_jain",
+                  workers: int = SCENARIO_WORKERS):
+    """
+    Solve every scenario against the base network. Returns an iterator
+    yielding {"index", "name", "result" | "error"} as each one finishes.
+    """
+    if not scenarios:
+        raise ValueError("No scenarios given")
+    if len(scenarios) > SCENARIO_MAX_COUNT:
+        raise ValueError(f"At most {SCENARIO_MAX_COUNT} scenarios per batch")
+    return _solve_all(network, tables, scenarios, method, min(workers, len(scenarios)))
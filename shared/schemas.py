@@ -1,16 +1,7 @@
 
-import os
-from dotenv import load_dotenv
 import uuid
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, EmailStr
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-import uuid
-from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict, List
 from pydantic import BaseModel, EmailStr
 
 class TenantBase(BaseModel):
@@ -27,6 +18,30 @@ class TenantOut(TenantBase):
     class Config:
         orm_mode = True
 
+class TenantJobStage(BaseModel):
+    status: str
+    attempts: int = 0
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    duration_ms: Optional[float]
+    error: Optional[str]
+
+class TenantJobOut(BaseModel):
+    id: uuid.UUID
+    tenant_id: str
+    status: str
+    stages: Dict[str, TenantJobStage]
+    error: Optional[str]
+    created_at: Optional[datetime]
+    modified_at: Optional[datetime]
+    class Config:
+        orm_mode = True
+
+class TenantJobAccepted(BaseModel):
+    job_id: uuid.UUID
+    status: str
+    status_url: str
+
 class UserBase(BaseModel):
     name: str
     email: EmailStr
@@ -209,6 +224,225 @@ class NetworkFlowCreate(NetworkFlowBase):
 
 class NetworkFlowOut(NetworkFlowBase):
     id: uuid.UUID
+    content_hash: Optional[str]
     created_at: Optional[datetime]
     class Config:
         orm_mode = True
+
+class UploadInitiate(BaseModel):
+    filename: str
+    size: int
+    content_type: Optional[str]
+
+class UploadPartUrl(BaseModel):
+    part_number: int
+    url: str
+
+class UploadInitiateOut(BaseModel):
+    upload_id: str
+    key: str
+    part_size: int
+    expires_in: int
+    parts: List[UploadPartUrl]
+
+class UploadPartETag(BaseModel):
+    part_number: int
+    etag: str
+
+class UploadComplete(BaseModel):
+    key: str
+    upload_id: str
+    # Optional; the uploaded parts are listed from S3 when omitted
+    parts: Optional[List[UploadPartETag]]
+
+class NetworkFlowUploadComplete(UploadComplete):
+    name: str
+
+class TenantUploadInitiate(UploadInitiate):
+    tenant_id: str
+
+class TenantUploadComplete(UploadComplete):
+    tenant_id: str
+    company_name: str
+
+class PressureDropSegment(BaseModel):
+    # Either pipe_id or material + schedule_or_class + size (nominal mm)
+    pipe_id: Optional[uuid.UUID]
+    material: Optional[str]
+    schedule_or_class: Optional[str]
+    size: Optional[float]
+    length_m: float
+    flow_rate_m3_per_h: float
+    elevation_change_m: Optional[float] = 0
+    fittings: Optional[Dict[str, int]]
+
+class PressureDropRequest(BaseModel):
+    fluid: str
+    temperature_in_k: Optional[float]
+    pressure_in_bar_g: Optional[float]
+    friction_method: str = "swamee_jain"
+    segments: List[PressureDropSegment]
+
+class PressureDropResult(BaseModel):
+    inner_diameter_m: float
+    velocity_m_per_s: float
+    reynolds: float
+    flow_regime: str
+    friction_factor: float
+    k_total: float
+    major_loss_pa: float
+    minor_loss_pa: float
+    elevation_loss_pa: float
+    pressure_drop_pa: float
+
+class PressureDropResponse(BaseModel):
+    fluid: str
+    segments: List[PressureDropResult]
+
+class NetworkSolveRequest(BaseModel):
+    # Overrides for the fluid and operating conditions given in the flow file
+    fluid: Optional[str]
+    temperature_in_k: Optional[float]
+    pressure_in_bar_g: Optional[float]
+    friction_method: str = "swamee_jain"
+
+class NetworkSolveNode(BaseModel):
+    id: str
+    head_m: float
+    pressure_bar_g: float
+    demand_m3_per_h: float
+
+class NetworkSolvePipe(BaseModel):
+    id: str
+    flow_m3_per_h: float
+    velocity_m_per_s: float
+    reynolds: float
+    friction_factor: float
+    headloss_m: float
+    pressure_drop_pa: float
+
+class NetworkSolveResponse(BaseModel):
+    fluid: str
+    converged: bool
+    iterations: int
+    max_flow_change: float
+    nodes: List[NetworkSolveNode]
+    pipes: List[NetworkSolvePipe]
+
+class NetworkScenario(BaseModel):
+    name: Optional[str]
+    fluid: Optional[str]
+    temperature_in_k: Optional[float]
+    pressure_in_bar_g: Optional[float]
+    # Scales every junction demand of the flow file
+    demand_multiplier: float = 1
+    # Moves every pipe to this schedule_or_class (and material, if given) at its nominal size
+    schedule_or_class: Optional[str]
+    material: Optional[str]
+
+class NetworkScenarioBatchRequest(BaseModel):
+    friction_method: str = "swamee_jain"
+    scenarios: List[NetworkScenario]
+
+# One NDJSON line of the scenario batch response
+class NetworkScenarioResult(BaseModel):
+    index: int
+    name: Optional[str]
+    result: Optional[NetworkSolveResponse]
+    error: Optional[str]
+
+class PipeSizingLine(BaseModel):
+    fluid: str
+    flow_rate_m3_per_h: float
+    temperature_in_k: Optional[float]
+    pressure_in_bar_g: Optional[float]
+    # Optional filters; every material/schedule combination is searched when omitted
+    material: Optional[str]
+    schedule_or_class: Optional[str]
+    max_velocity_m_per_s: Optional[float]
+    max_pressure_drop_bar_per_100m: Optional[float]
+    candidates: int = 3
+
+class PipeSizingRequest(BaseModel):
+    friction_method: str = "swamee_jain"
+    lines: List[PipeSizingLine]
+
+class PipeSizingCandidate(BaseModel):
+    pipe_id: uuid.UUID
+    material: str
+    schedule_or_class: str
+    size: float
+    inner_diameter_m: float
+    velocity_m_per_s: float
+    pressure_drop_bar_per_100m: float
+
+class PipeSizingResult(BaseModel):
+    candidates: List[PipeSizingCandidate]
+
+class PipeSizingResponse(BaseModel):
+    lines: List[PipeSizingResult]
+
+class FluidPropertyPoint(BaseModel):
+    fluid: str
+    temperature_in_k: float
+    pressure_in_bar_g: float = 0
+
+class FluidPropertyRequest(BaseModel):
+    points: List[FluidPropertyPoint]
+
+class FluidPropertyResult(BaseModel):
+    fluid: str
+    state: str
+    # False when the point lies outside the tabulated temperature/pressure range
+    in_range: bool
+    density_kg_per_m3: float
+    viscosity_centipoise: float
+    specific_heat_ratio: Optional[float]
+    vapour_pressure_kpa_absolute: Optional[float]
+
+class FluidPropertyResponse(BaseModel):
+    points: List[FluidPropertyResult]
+
+class GasFlowLine(BaseModel):
+    fluid: str
+    # Either pipe_id or material + schedule_or_class + size (nominal mm)
+    pipe_id: Optional[uuid.UUID]
+    material: Optional[str]
+    schedule_or_class: Optional[str]
+    size: Optional[float]
+    length_m: float
+    inlet_pressure_bar_g: float
+    inlet_temperature_in_k: float = 293.15
+    # Either mass_flow_kg_per_h or flow_rate_m3_per_h at inlet conditions
+    mass_flow_kg_per_h: Optional[float]
+    flow_rate_m3_per_h: Optional[float]
+    fittings: Optional[Dict[str, int]]
+
+class GasFlowRequest(BaseModel):
+    mode: str = "isothermal"
+    segments: int = 20
+    friction_method: str = "swamee_jain"
+    lines: List[GasFlowLine]
+
+class GasFlowResult(BaseModel):
+    mass_flow_kg_per_h: float
+    inner_diameter_m: float
+    inlet_density_kg_per_m3: float
+    inlet_velocity_m_per_s: float
+    inlet_mach: float
+    # Outlet values are null for a line choked at its inlet (choke_length_m 0)
+    outlet_pressure_bar_g: Optional[float]
+    outlet_temperature_k: Optional[float]
+    outlet_density_kg_per_m3: Optional[float]
+    outlet_velocity_m_per_s: Optional[float]
+    outlet_mach: Optional[float]
+    pressure_drop_bar: Optional[float]
+    reynolds: float
+    friction_factor: float
+    choked: bool
+    # Distance from the inlet at which the flow reaches sonic conditions
+    choke_length_m: Optional[float]
+
+class GasFlowResponse(BaseModel):
+    mode: str
+    lines: List[GasFlowResult]
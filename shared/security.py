@@ -1,12 +1,14 @@
 
 import os
-import requests
-from dotenv import load_dotenv
+import json
+import hashlib
+import threading
+import time
+import shared.config  # noqa: F401
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-
-load_dotenv()
+from jose import jwt, jwk, JWTError
+from collections import OrderedDict
 
 # Load AWS Cognito config from environment variables
 COGNITO_REGION = os.environ.get("COGNITO_REGION")
@@ -15,34 +17,222 @@ COGNITO_APP_CLIENT_ID = os.environ.get("COGNITO_APP_CLIENT_ID")
 if not all([COGNITO_REGION, COGNITO_USERPOOL_ID, COGNITO_APP_CLIENT_ID]):
     raise RuntimeError("Missing Cognito configuration in environment variables. Please set COGNITO_REGION, COGNITO_USERPOOL_ID, and COGNITO_APP_CLIENT_ID in your .env file.")
 COGNITO_ISSUER = f"https://cognito-idp.{COGNITO_REGION}.amazonaws.com/{COGNITO_USERPOOL_ID}"
-COGNITO_JWKS_URL = f"{COGNITO_ISSUER}/.well-known/jwks.json"
+COGNITO_JWKS_URL = os.environ.get("COGNITO_JWKS_URL", f"{COGNITO_ISSUER}/.well-known/jwks.json")
+# Optional local JWKS document, used instead of the URL (tests and offline benchmarks)
+COGNITO_JWKS_FILE = os.environ.get("COGNITO_JWKS_FILE")
+# Signature/expiry/audience checks are off until every client sends real Cognito tokens
+COGNITO_VERIFY_SIGNATURE = os.environ.get("COGNITO_VERIFY_SIGNATURE", "false").lower() in ("1", "true", "yes")
+
+# Keys are considered fresh for JWKS_CACHE_TTL seconds; after that they keep being
+# served while a background thread refetches them. An unknown kid, or a cache that
+# has no keys because fetching them failed, forces a refetch at most once every
+# JWKS_MIN_REFRESH_INTERVAL seconds.
+JWKS_CACHE_TTL = float(os.environ.get("JWKS_CACHE_TTL", "3600"))
+JWKS_MIN_REFRESH_INTERVAL = float(os.environ.get("JWKS_MIN_REFRESH_INTERVAL", "60"))
+JWKS_FETCH_TIMEOUT = float(os.environ.get("JWKS_FETCH_TIMEOUT", "5"))
+
+# Verified claim sets are reused for repeat tokens until the token's exp, and
+# never for longer than TOKEN_CACHE_TTL seconds.
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "1024"))
+TOKEN_CACHE_TTL = float(os.environ.get("TOKEN_CACHE_TTL", "300"))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
 def get_cognito_public_keys():
-    resp = requests.get(COGNITO_JWKS_URL)
+    if COGNITO_JWKS_FILE:
+        with open(COGNITO_JWKS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)["keys"]
+    # Imported here: only the signature-verifying path ever fetches keys
+    import requests
+    resp = requests.get(COGNITO_JWKS_URL, timeout=JWKS_FETCH_TIMEOUT)
     resp.raise_for_status()
     return resp.json()["keys"]
 
+
+class JWKSCache:
+    """
+    In-process cache of constructed Cognito public keys indexed by kid.
+    """
+
+    def __init__(self, ttl: float, min_refresh_interval: float):
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._keys = {}  # kid -> (alg, constructed public key)
+        self._fetched_at = 0.0
+        self._last_attempt = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def refresh(self):
+        """Fetch the JWKS document and rebuild the kid index."""
+        with self._lock:
+            self._last_attempt = time.monotonic()
+        keys = {}
+        for key in get_cognito_public_keys():
+            keys[key["kid"]] = (key.get("alg", "RS256"), jwk.construct(key, key.get("alg", "RS256")))
+        with self._lock:
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+            self.refreshes += 1
+
+    def _claim_attempt(self, now: float) -> bool:
+        # Checked and taken under the lock, so concurrent requests start at most one fetch per interval
+        with self._lock:
+            if self._last_attempt is not None and now - self._last_attempt < self.min_refresh_interval:
+                return False
+            self._last_attempt = now
+            return True
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"JWKS background refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def get(self, kid: str):
+        """Return (alg, public_key) for kid, or None if Cognito does not know it."""
+        now = time.monotonic()
+        if not self._keys:
+            # Without keys every request would refetch; while Cognito is failing, fail fast instead
+            if not self._claim_attempt(now):
+                raise RuntimeError("JWKS fetch failed recently; retrying after JWKS_MIN_REFRESH_INTERVAL")
+            self.refresh()
+        else:
+            with self._lock:
+                start_refresh = now - self._fetched_at > self.ttl and not self._refreshing
+                if start_refresh:
+                    self._refreshing = True
+            if start_refresh:
+                # Stale keys stay valid while the refetch runs off the request path
+                threading.Thread(target=self._background_refresh, daemon=True).start()
+
+        key = self._keys.get(kid)
+        if key:
+            self.hits += 1
+            return key
+        self.misses += 1
+        # Unknown kid usually means Cognito rotated its keys; refetch, but rate limited
+        if self._claim_attempt(now):
+            self.refresh()
+            return self._keys.get(kid)
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self._keys),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+        }
+
+
+jwks_cache = JWKSCache(JWKS_CACHE_TTL, JWKS_MIN_REFRESH_INTERVAL)
+
+def _decode_verified(token: str) -> dict:
+    headers = jwt.get_unverified_header(token)
+    kid = headers.get("kid")
+    if not kid:
+        raise HTTPException(status_code=401, detail="Missing 'kid' in token header")
+    try:
+        key = jwks_cache.get(kid)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Could not load Cognito public keys: {str(e)}",
+        )
+    if not key:
+        raise HTTPException(status_code=401, detail="Public key not found in Cognito")
+    alg, public_key = key
+    return jwt.decode(
+        token,
+        public_key,
+        algorithms=[alg],
+        audience=COGNITO_APP_CLIENT_ID,
+        issuer=COGNITO_ISSUER,
+        options={"verify_at_hash": False},
+    )
+
+class TokenCache:
+    """
+    LRU cache of verified claim sets keyed by a SHA-256 hash of the raw token.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # token hash -> (claims, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str):
+        key = self._key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[0])
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, claims: dict):
+        expires_at = time.time() + self.ttl
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        if expires_at <= time.time():
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (dict(claims), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
 def verify_token(token: str = Depends(oauth2_scheme)):
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+    claims = _decode_token(token)
+    token_cache.put(token, claims)
+    return claims
+
+def _decode_token(token: str) -> dict:
     try:
-        # headers = jwt.get_unverified_header(token)
-        # kid = headers.get("kid")
-        # if not kid:
-        #    raise HTTPException(status_code=401, detail="Missing 'kid' in token header")
-        # keys = get_cognito_public_keys()
-        # key = next((k for k in keys if k["kid"] == kid), None)
-        # if not key:
-        #     raise HTTPException(status_code=401, detail="Public key not found in Cognito")
-        # public_key = jwt.construct_rsa_public_key(key)
-        # payload = jwt.decode(
-        #     token,
-        #     public_key,
-        #     algorithms=[key["alg"]],
-        #     audience=COGNITO_APP_CLIENT_ID,
-        #     issuer=COGNITO_ISSUER
-        # )
-        # return payload
+        if COGNITO_VERIFY_SIGNATURE:
+            return _decode_verified(token)
         payload = jwt.decode(
             token,
             key="",  # no key needed
@@ -0,0 +1,95 @@
+# Parser for the masterdata seed files under version_text_files/.
+# Kept free of shared.* imports so Alembic revisions can import it directly.
+import os
+import uuid
+from decimal import Decimal, InvalidOperation
+
+SEED_VERSION = "version01"
+SEED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "version_text_files", SEED_VERSION)
+
+# table name -> seed file, in load order
+SEED_FILES = {
+    "pipe": "pipe_inserts.txt",
+    "fitting": "fitting_inserts.txt",
+    "gas": "gas_inserts.txt",
+    "liquid": "liquid_inserts.txt",
+}
+
+# Row ids are derived from the table and row position instead of gen_random_uuid()
+# so the database, snapshots and clients agree on them.
+SEED_NAMESPACE = uuid.UUID("5b0c3f0e-6f5c-4a59-9d0e-2f7c3c1a9e41")
+
+# Placeholders for the SQL functions used in the seed files
+NOW = object()
+CURRENT_USER = object()
+
+
+def seed_row_id(table: str, index: int) -> uuid.UUID:
+    return uuid.uuid5(SEED_NAMESPACE, f"{SEED_VERSION}:{table}:{index}")
+
+
+def _convert(token: str, quoted: bool):
+    if quoted:
+        return token
+    value = token.strip()
+    lowered = value.lower()
+    if lowered == "null":
+        return None
+    if lowered == "now()":
+        return NOW
+    if lowered == "current_user":
+        return CURRENT_USER
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"Unsupported seed value: {value!r}")
+
+
+def _split_values(values: str) -> list:
+    # Split on top-level commas; quoted strings may contain commas, e.g. 'DWV Drain,Waste,Vent'
+    result, token, quoted, in_quote, i = [], [], False, False, 0
+    while i < len(values):
+        char = values[i]
+        if in_quote:
+            if char == "'" and values[i + 1:i + 2] == "'":
+                token.append("'")
+                i += 1
+            elif char == "'":
+                in_quote = False
+            else:
+                token.append(char)
+        elif char == "'":
+            in_quote, quoted = True, True
+        elif char == ",":
+            result.append(_convert("".join(token), quoted))
+            token, quoted = [], False
+        else:
+            token.append(char)
+        i += 1
+    result.append(_convert("".join(token), quoted))
+    return result
+
+
+def parse_seed_file(table: str, file_path: str = None) -> list:
+    """
+    Parse an INSERT-per-line seed file into value lists in table column order.
+    gen_random_uuid() becomes a deterministic id; now()/CURRENT_USER become the
+    NOW/CURRENT_USER placeholders for the caller to substitute.
+    """
+    file_path = file_path or os.path.join(SEED_DIR, SEED_FILES[table])
+    rows = []
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("--"):
+                continue
+            start = line.lower().index("values") + len("values")
+            values = line[start:].strip().rstrip(";").strip()
+            if not (values.startswith("(") and values.endswith(")")):
+                raise ValueError(f"Unsupported seed statement in {file_path}: {line[:80]}")
+            values = values[1:-1]
+            first, _, rest = values.partition(",")
+            if first.strip().lower() != "gen_random_uuid()":
+                raise ValueError(f"Expected gen_random_uuid() id in {file_path}: {line[:80]}")
+            rows.append([seed_row_id(table, len(rows))] + _split_values(rest))
+    return rows
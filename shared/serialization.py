@@ -0,0 +1,82 @@
+import os
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+# Opt-in: list endpoints skip per-row Pydantic validation and return raw JSON.
+# The declared response_model still documents the schema in OpenAPI.
+FAST_SERIALIZATION = os.getenv('FAST_SERIALIZATION', 'false').lower() in ('1', 'true', 'yes')
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def converter(field):
+    """Type that a schema field's column values are converted to, or None to use them as they are."""
+    # NUMERIC columns come back as Decimal; match the schema's int/float types
+    if field.outer_type_ is int:
+        return int
+    if field.outer_type_ is float:
+        return float
+    return None
+
+
+def select_rows(db: Session, Model, Schema, *criteria, fields=None, order_by=None) -> list:
+    """
+    Select the schema's columns as plain tuples with SQLAlchemy Core and return
+    them as dicts, without hydrating ORM objects.
+    """
+    names = list(fields or Schema.__fields__)
+    stmt = select(*[getattr(Model, name) for name in names])
+    for criterion in criteria:
+        stmt = stmt.where(criterion)
+    if order_by is not None:
+        stmt = stmt.order_by(order_by)
+    converters = [(index, converter(Schema.__fields__[name])) for index, name in enumerate(names)]
+    converters = [(index, convert) for index, convert in converters if convert is not None]
+    rows = []
+    for record in db.execute(stmt):
+        values = list(record)
+        for index, convert in converters:
+            if values[index] is not None:
+                values[index] = convert(values[index])
+        rows.append(dict(zip(names, values)))
+    return rows
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match or not etag:
+        return False
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def json_response(content, status_code: int = 200, headers: dict = None) -> Response:
+    return Response(content=dumps(content), status_code=status_code, media_type="application/json", headers=headers)
+
+
+def fast_list_response(db: Session, Model, Schema, *criteria) -> Response:
+    return json_response(select_rows(db, Model, Schema, *criteria))
@@ -0,0 +1,162 @@
+"""
+Pre-serialized masterdata snapshots.
+
+Run `python -m shared.snapshots` from the repository root (shared_layer/build.sh
+does this) to write one JSON document per seeded resource type, plus gzip and,
+when the brotli package is installed, brotli variants:
+
+    shared/snapshots/<seed version>/<resource>.json[.gz|.br]
+    shared/snapshots/<seed version>/manifest.json
+
+With MASTERDATA_SNAPSHOT_MODE enabled the masterdata lambda serves these bytes
+directly instead of querying the tenant database.
+"""
+import os
+import sys
+import gzip
+import json
+import hashlib
+import threading
+from datetime import datetime
+from fastapi.encoders import jsonable_encoder
+from shared.seed_data import SEED_VERSION, SEED_FILES, NOW, CURRENT_USER, parse_seed_file
+from shared.masterdata import RESOURCES
+
+MASTERDATA_SNAPSHOT_MODE = os.getenv('MASTERDATA_SNAPSHOT_MODE', 'false').lower() in ('1', 'true', 'yes')
+SNAPSHOT_DIR = os.getenv(
+    'MASTERDATA_SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots', SEED_VERSION),
+)
+
+# Snapshot rows carry this created_at so repeated builds produce identical bytes
+SEED_CREATED_AT = datetime(2025, 7, 14, 23, 29, 31)
+
+# Content-Encoding -> file suffix, in server preference order
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"), ("identity", ""))
+
+
+def build_snapshot(resource_type: str) -> bytes:
+    Model, Schema = RESOURCES[resource_type]
+    columns = [column.name for column in Model.__table__.columns]
+    rows = []
+    for values in parse_seed_file(resource_type):
+        row = dict(zip(columns, values))
+        for name, value in row.items():
+            if value is NOW:
+                row[name] = SEED_CREATED_AT
+            elif value is CURRENT_USER:
+                row[name] = None
+        rows.append(jsonable_encoder(Schema(**row)))
+    return json.dumps(rows, separators=(",", ":")).encode("utf-8")
+
+
+def build_snapshots(out_dir: str = SNAPSHOT_DIR) -> dict:
+    try:
+        import brotli
+    except ImportError:  # brotli is optional; gzip variants are always built
+        brotli = None
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {"seed_version": SEED_VERSION, "resources": {}}
+    for resource_type in SEED_FILES:
+        body = build_snapshot(resource_type)
+        path = os.path.join(out_dir, f"{resource_type}.json")
+        with open(path, "wb") as f:
+            f.write(body)
+        # mtime=0 keeps the gzip bytes reproducible between builds
+        with open(path + ".gz", "wb") as f:
+            f.write(gzip.compress(body, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(path + ".br", "wb") as f:
+                f.write(brotli.compress(body, quality=11))
+        manifest["resources"][resource_type] = {
+            "etag": hashlib.sha256(body).hexdigest()[:32],
+            "bytes": len(body),
+        }
+        print(f"Snapshot {resource_type}: {len(body)} bytes")
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _quality(params: str) -> float:
+    q = params.strip()
+    if not q.startswith("q="):
+        return 1.0
+    try:
+        return float(q[2:] or 0)
+    except ValueError:
+        # A malformed weight, e.g. "br;q=x", rules the coding out rather than failing the request
+        return 0.0
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    accepted = {"identity"}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        if _quality(params) == 0:
+            accepted.discard(name)
+            continue
+        accepted.add(name)
+    return accepted
+
+
+class SnapshotStore:
+    """
+    Lazily reads snapshot files and keeps their bytes in memory so warm
+    invocations never touch the filesystem again.
+    """
+
+    def __init__(self, snapshot_dir: str):
+        self.snapshot_dir = snapshot_dir
+        self._manifest = None
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def manifest(self) -> dict:
+        if self._manifest is None:
+            path = os.path.join(self.snapshot_dir, "manifest.json")
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    self._manifest = json.load(f)
+            else:
+                self._manifest = {"resources": {}}
+        return self._manifest
+
+    def _read(self, resource_type: str, suffix: str):
+        key = (resource_type, suffix)
+        body = self._bodies.get(key)
+        if body is None:
+            path = os.path.join(self.snapshot_dir, f"{resource_type}.json{suffix}")
+            if not os.path.exists(path):
+                return None
+            with open(path, "rb") as f:
+                body = f.read()
+            with self._lock:
+                self._bodies[key] = body
+        return body
+
+    def get(self, resource_type: str, accept_encoding: str):
+        """Return (body, content encoding, etag) for the best accepted variant, or None."""
+        info = self.manifest()["resources"].get(resource_type)
+        if not info:
+            return None
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            body = self._read(resource_type, suffix)
+            if body is not None:
+                # Strong ETags must differ between encodings of the same document
+                tag = info["etag"] if encoding == "identity" else f"{info['etag']}-{encoding}"
+                return body, encoding, f'"{tag}"'
+        return None
+
+
+snapshot_store = SnapshotStore(SNAPSHOT_DIR)
+
+
+if __name__ == "__main__":
+    build_snapshots(sys.argv[1] if len(sys.argv) > 1 else SNAPSHOT_DIR)
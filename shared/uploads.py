@@ -0,0 +1,121 @@
+# Direct-to-S3 multipart uploads.
+#
+# Two phases keep file bytes out of the Lambda:
+#   1. initiate_upload starts a multipart upload and returns one presigned
+#      upload_part URL per part; the client PUTs each part straight to S3 and
+#      keeps the ETag header of every response.
+#   2. complete_upload assembles the parts and verifies the object with
+#      head_object before the caller records it.
+# Presigned URLs use the same client as everything else, so AWS_ENDPOINT_URL
+# points them at a local S3 stand-in (moto, localstack, minio).
+import os
+import math
+import uuid
+from fastapi import HTTPException
+from shared.aws import S3_BUCKET, get_s3_client
+
+S3_UPLOAD_PART_SIZE = int(os.getenv('S3_UPLOAD_PART_SIZE', str(8 * 1024 * 1024)))
+S3_UPLOAD_URL_EXPIRY = int(os.getenv('S3_UPLOAD_URL_EXPIRY', '3600'))
+S3_UPLOAD_MAX_BYTES = int(os.getenv('S3_UPLOAD_MAX_BYTES', str(5 * 1024 ** 3)))
+
+# S3 limits: every part but the last must be at least 5 MiB, at most 10,000 parts
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+S3_MAX_PARTS = 10000
+
+
+def object_url(key: str) -> str:
+    return f"https://{S3_BUCKET}.s3.amazonaws.com/{key}"
+
+
+def upload_key(prefix: str, filename: str) -> str:
+    # The random component keeps concurrent uploads of the same filename apart
+    return f"{prefix}/{uuid.uuid4().hex}_{os.path.basename(filename)}"
+
+
+def upload_owner(token: dict) -> str:
+    # Upload keys are scoped to the Cognito subject; a token without one cannot own an upload
+    sub = token.get("sub")
+    if not sub:
+        raise HTTPException(status_code=401, detail="Invalid token: sub missing")
+    return sub
+
+
+def part_size_for(size: int) -> int:
+    part_size = max(S3_UPLOAD_PART_SIZE, S3_MIN_PART_SIZE)
+    return max(part_size, math.ceil(size / S3_MAX_PARTS))
+
+
+def initiate_upload(key: str, size: int, content_type: str = None, max_bytes: int = S3_UPLOAD_MAX_BYTES) -> dict:
+    if size <= 0:
+        raise HTTPException(status_code=400, detail="Upload size must be positive")
+    if size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes} bytes")
+    s3 = get_s3_client()
+    extra = {"ACL": "public-read"}
+    if content_type:
+        extra["ContentType"] = content_type
+    upload_id = s3.create_multipart_upload(Bucket=S3_BUCKET, Key=key, **extra)["UploadId"]
+    part_size = part_size_for(size)
+    parts = [
+        {
+            "part_number": part_number,
+            "url": s3.generate_presigned_url(
+                "upload_part",
+                Params={"Bucket": S3_BUCKET, "Key": key, "UploadId": upload_id, "PartNumber": part_number},
+                ExpiresIn=S3_UPLOAD_URL_EXPIRY,
+            ),
+        }
+        for part_number in range(1, math.ceil(size / part_size) + 1)
+    ]
+    return {
+        "upload_id": upload_id,
+        "key": key,
+        "part_size": part_size,
+        "expires_in": S3_UPLOAD_URL_EXPIRY,
+        "parts": parts,
+    }
+
+
+def _list_parts(s3, key: str, upload_id: str) -> list:
+    parts = []
+    paginator = s3.get_paginator("list_parts")
+    for page in paginator.paginate(Bucket=S3_BUCKET, Key=key, UploadId=upload_id):
+        parts.extend({"part_number": p["PartNumber"], "etag": p["ETag"]} for p in page.get("Parts", []))
+    return parts
+
+
+def complete_upload(key: str, upload_id: str, parts: list = None, max_bytes: int = S3_UPLOAD_MAX_BYTES) -> dict:
+    """
+    Complete the multipart upload and return the object's head_object
+    response. parts is a list of {"part_number", "etag"}; when omitted the
+    uploaded parts are listed from S3.
+    """
+    from botocore.exceptions import ClientError
+    s3 = get_s3_client()
+    try:
+        if parts is None:
+            parts = _list_parts(s3, key, upload_id)
+        if not parts:
+            raise HTTPException(status_code=400, detail="No parts have been uploaded")
+        s3.complete_multipart_upload(
+            Bucket=S3_BUCKET,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={
+                "Parts": [
+                    {"PartNumber": p["part_number"], "ETag": p["etag"]}
+                    for p in sorted(parts, key=lambda p: p["part_number"])
+                ]
+            },
+        )
+        head = s3.head_object(Bucket=S3_BUCKET, Key=key)
+    except ClientError as e:
+        raise HTTPException(status_code=400, detail=f"Upload could not be completed: {e.response['Error'].get('Code')}")
+    if head["ContentLength"] > max_bytes:
+        s3.delete_object(Bucket=S3_BUCKET, Key=key)
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes} bytes")
+    return head
+
+
+def abort_upload(key: str, upload_id: str):
+    get_s3_client().abort_multipart_upload(Bucket=S3_BUCKET, Key=key, UploadId=upload_id)
@@ -10,6 +10,9 @@ mkdir -p python
 echo "📦 Installing third-party dependencies from requirements.txt"
 pip install -r requirements.txt -t python/
 
+echo "🗜️ Building masterdata snapshots"
+(cd .. && python -m shared.snapshots)
+
 echo "📂 Copying internal shared modules"
 cp -r ../shared python/
 
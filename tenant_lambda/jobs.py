@@ -0,0 +1,145 @@
+# Asynchronous tenant provisioning.
+#
+# POST /tenant/createTenantAsync records a TenantJob and enqueues its id; a
+# worker then runs the stages below in order, retrying each one, and records
+# per-stage progress and timings on the job row.
+import os
+import time
+import base64
+import uuid
+from datetime import datetime
+from shared.aws import S3_BUCKET, get_s3_client
+from shared.db import GlobalSessionLocal
+from shared.models import Tenant, TenantJob
+from shared.jobs import create_job_queue
+from shared.provisioning import create_tenant_database, tenant_exists
+
+STAGES = ("tenant_record", "logo_upload", "database")
+TENANT_JOB_MAX_ATTEMPTS = int(os.getenv('TENANT_JOB_MAX_ATTEMPTS', '3'))
+TENANT_JOB_RETRY_BACKOFF = float(os.getenv('TENANT_JOB_RETRY_BACKOFF', '1'))
+
+
+def initial_stages() -> dict:
+    return {stage: {"status": "pending", "attempts": 0} for stage in STAGES}
+
+
+# Every stage is idempotent so a retried or redelivered job can rerun it safely
+def _stage_tenant_record(db, job):
+    tenant = db.query(Tenant).filter(Tenant.tenant_id == job.tenant_id).first()
+    if tenant:
+        return "succeeded"
+    db.add(Tenant(
+        tenant_id=job.tenant_id,
+        company_name=job.payload.get("company_name"),
+        created_by=job.created_by,
+        created_at=datetime.utcnow(),
+    ))
+    db.commit()
+    return "succeeded"
+
+
+def _stage_logo_upload(db, job):
+    logo = job.payload.get("logo")
+    if not logo:
+        return "skipped"
+    s3_key = f"tenant_logos/{job.tenant_id}_{logo['filename']}"
+    get_s3_client().put_object(
+        Bucket=S3_BUCKET,
+        Key=s3_key,
+        Body=base64.b64decode(logo["data"]),
+        ContentType=logo.get("content_type") or "application/octet-stream",
+        ACL="public-read",
+    )
+    tenant = db.query(Tenant).filter(Tenant.tenant_id == job.tenant_id).first()
+    tenant.logo_url = f"https://{S3_BUCKET}.s3.amazonaws.com/{s3_key}"
+    # The logo bytes are not needed once they are in S3
+    job.payload = {k: v for k, v in job.payload.items() if k != "logo"}
+    db.commit()
+    return "succeeded"
+
+
+def _stage_database(db, job):
+    if not tenant_exists(job.tenant_id):
+        create_tenant_database(job.tenant_id.lower())
+    return "succeeded"
+
+
+STAGE_HANDLERS = {
+    "tenant_record": _stage_tenant_record,
+    "logo_upload": _stage_logo_upload,
+    "database": _stage_database,
+}
+
+
+def _update_stage(db, job, stage: str, **changes):
+    # JSON columns only persist when the whole value is reassigned
+    job.stages = {**job.stages, stage: {**job.stages[stage], **changes}}
+    job.modified_at = datetime.utcnow()
+    db.commit()
+
+
+def run_tenant_job(message: dict):
+    db = GlobalSessionLocal()
+    try:
+        job = db.query(TenantJob).filter(TenantJob.id == uuid.UUID(message["job_id"])).first()
+        if not job or job.status == "succeeded":
+            return
+        job.status = "running"
+        job.modified_at = datetime.utcnow()
+        db.commit()
+
+        for stage in STAGES:
+            if job.stages[stage]["status"] in ("succeeded", "skipped"):
+                continue
+            for attempt in range(job.stages[stage]["attempts"] + 1, TENANT_JOB_MAX_ATTEMPTS + 1):
+                started = time.perf_counter()
+                _update_stage(db, job, stage, status="running", attempts=attempt, started_at=datetime.utcnow().isoformat())
+                try:
+                    status = STAGE_HANDLERS[stage](db, job)
+                except Exception as e:
+                    db.rollback()
+                    _update_stage(
+                        db, job, stage,
+                        status="failed",
+                        error=f"{type(e).__name__}: {e}"[:1024],
+                        finished_at=datetime.utcnow().isoformat(),
+                        duration_ms=(time.perf_counter() - started) * 1000,
+                    )
+                    if attempt < TENANT_JOB_MAX_ATTEMPTS:
+                        time.sleep(TENANT_JOB_RETRY_BACKOFF * (2 ** (attempt - 1)))
+                    continue
+                _update_stage(
+                    db, job, stage,
+                    status=status,
+                    error=None,
+                    finished_at=datetime.utcnow().isoformat(),
+                    duration_ms=(time.perf_counter() - started) * 1000,
+                )
+                break
+            if job.stages[stage]["status"] == "failed":
+                job.status = "failed"
+                job.error = f"Stage '{stage}' failed after {job.stages[stage]['attempts']} attempts"
+                job.modified_at = datetime.utcnow()
+                db.commit()
+                return
+
+        job.status = "succeeded"
+        job.modified_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+
+_tenant_job_queue = None
+
+
+def get_tenant_job_queue():
+    global _tenant_job_queue
+    if _tenant_job_queue is None:
+        _tenant_job_queue = create_job_queue(run_tenant_job)
+    return _tenant_job_queue
+
+
+def worker_handler(event, context):
+    """Lambda entry point for the SQS trigger of the sqs job queue."""
+    get_tenant_job_queue().handle_event(event)
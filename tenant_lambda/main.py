@@ -8,3 +8,6 @@ app.include_router(tenant_router)
 
 from mangum import Mangum
 handler = Mangum(app)
+
+# SQS trigger for asynchronous tenant provisioning (TENANT_JOB_QUEUE=sqs)
+from tenant_lambda.jobs import worker_handler
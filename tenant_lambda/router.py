@@ -1,121 +1,154 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from shared.db import get_db
-from shared.models import Tenant
-from shared.schemas import TenantOut
-import boto3
+from sqlalchemy.ext.asyncio import AsyncSession
+from shared.db import get_global_db
+from shared.async_db import get_async_global_db
+from shared.models import Tenant, TenantJob
+from shared.schemas import TenantOut, TenantJobOut, TenantJobAccepted, TenantUploadInitiate, TenantUploadComplete, UploadInitiateOut
+from shared.security import verify_token
+from tenant_lambda.jobs import initial_stages, get_tenant_job_queue
 import os
-from sqlalchemy import create_engine, text
+from shared.provisioning import create_tenant_database
+from shared.config import TENANCY_MODE, tenant_schema_name
 from datetime import datetime
+import base64
 import uuid
+from shared.aws import S3_BUCKET, get_s3_client
+from shared.uploads import initiate_upload, complete_upload, object_url, upload_key, upload_owner
 
-
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-    region_name=os.getenv('AWS_REGION')
-)
-S3_BUCKET = os.getenv('AWS_S3_BUCKET')
+# Logos travel inside the job payload until the worker uploads them; the
+# presigned upload endpoints enforce the same limit
+TENANT_LOGO_MAX_BYTES = int(os.getenv('TENANT_LOGO_MAX_BYTES', str(1024 * 1024)))
 
 router = APIRouter()
 
+def _validate_tenant_id(tenant_id: str):
+    # In schema tenancy mode the tenant id becomes a schema name; reject it before any record is written
+    if TENANCY_MODE == "schema":
+        try:
+            tenant_schema_name(tenant_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+async def _ensure_tenant_id_free(db: AsyncSession, tenant_id: str):
+    db_tenant = (await db.execute(select(Tenant).where(Tenant.tenant_id == tenant_id))).scalars().first()
+    if db_tenant:
+        raise HTTPException(status_code=409, detail="Tenant ID in use")
+
+async def _create_tenant(db: AsyncSession, tenant_id: str, company_name: str, logo_url: str):
+    new_tenant = Tenant(
+        tenant_id=tenant_id,
+        company_name=company_name,
+        logo_url=logo_url,
+        created_by=uuid.uuid4(),  # Assuming created_by is a UUID
+        created_at=datetime.utcnow(),
+        
+    )
+    db.add(new_tenant)
+    await db.commit()
+    await db.refresh(new_tenant)
+
+    # --- Create a new database (or schema) for the tenant ---
+    # Provisioning is sync psycopg2/Alembic work; keep it off the event loop
+    await run_in_threadpool(create_tenant_database, tenant_id.lower())
+
+    return new_tenant
+
 @router.post("/tenant/createTenant", response_model=TenantOut)
 async def create_tenant(
     tenant_id: str = Form(...),
     company_name: str = Form(None),
     logo: UploadFile = File(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_global_db),
+    token: dict = Depends(verify_token)
 ):
-    db_tenant = db.query(Tenant).filter(Tenant.tenant_id == tenant_id).first()
-    if db_tenant:
-        raise HTTPException(status_code=409, detail="Tenant ID in use")
+    _validate_tenant_id(tenant_id)
+    await _ensure_tenant_id_free(db, tenant_id)
     logo_url = None
     if logo:
         s3_key = f"tenant_logos/{tenant_id}_{logo.filename}"
-        s3_client.upload_fileobj(logo.file, S3_BUCKET, s3_key, ExtraArgs={"ACL": "public-read"})
+        # boto3 is blocking; keep the upload off the event loop
+        await run_in_threadpool(
+            get_s3_client().upload_fileobj, logo.file, S3_BUCKET, s3_key, ExtraArgs={"ACL": "public-read"}
+        )
         logo_url = f"https://{S3_BUCKET}.s3.amazonaws.com/{s3_key}"
-    new_tenant = Tenant(
+    return await _create_tenant(db, tenant_id, company_name, logo_url)
+
+@router.post("/tenant/upload/initiate", response_model=UploadInitiateOut)
+async def initiate_tenant_logo_upload(
+    body: TenantUploadInitiate,
+    db: AsyncSession = Depends(get_async_global_db),
+    token: dict = Depends(verify_token)
+):
+    _validate_tenant_id(body.tenant_id)
+    await _ensure_tenant_id_free(db, body.tenant_id)
+    key = upload_key(f"tenant_logos/{body.tenant_id}/{upload_owner(token)}", body.filename)
+    return await run_in_threadpool(initiate_upload, key, body.size, body.content_type, TENANT_LOGO_MAX_BYTES)
+
+@router.post("/tenant/upload/complete", response_model=TenantOut)
+async def complete_tenant_logo_upload(
+    body: TenantUploadComplete,
+    db: AsyncSession = Depends(get_async_global_db),
+    token: dict = Depends(verify_token)
+):
+    _validate_tenant_id(body.tenant_id)
+    # Only keys handed out by initiate to this caller can be completed
+    if not body.key.startswith(f"tenant_logos/{body.tenant_id}/{upload_owner(token)}/"):
+        raise HTTPException(status_code=403, detail="Upload key does not belong to this user")
+    await _ensure_tenant_id_free(db, body.tenant_id)
+    parts = [p.dict() for p in body.parts] if body.parts is not None else None
+    await run_in_threadpool(complete_upload, body.key, body.upload_id, parts, TENANT_LOGO_MAX_BYTES)
+    return await _create_tenant(db, body.tenant_id, body.company_name, object_url(body.key))
+
+@router.post("/tenant/createTenantAsync", response_model=TenantJobAccepted, status_code=202)
+def create_tenant_async(
+    tenant_id: str = Form(...),
+    company_name: str = Form(None),
+    logo: UploadFile = File(None),
+    db: Session = Depends(get_global_db),
+    token: dict = Depends(verify_token)
+):
+    _validate_tenant_id(tenant_id)
+    db_tenant = db.query(Tenant).filter(Tenant.tenant_id == tenant_id).first()
+    active_job = db.query(TenantJob).filter(
+        TenantJob.tenant_id == tenant_id, TenantJob.status.in_(["queued", "running"])
+    ).first()
+    if db_tenant or active_job:
+        raise HTTPException(status_code=409, detail="Tenant ID in use")
+    payload = {"company_name": company_name}
+    if logo:
+        # A plain def runs in the threadpool, so the blocking reads and queries stay off the event loop
+        data = logo.file.read()
+        if len(data) > TENANT_LOGO_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Logo exceeds {TENANT_LOGO_MAX_BYTES} bytes")
+        payload["logo"] = {
+            "filename": logo.filename,
+            "content_type": logo.content_type,
+            "data": base64.b64encode(data).decode("ascii"),
+        }
+    try:
+        created_by = uuid.UUID(token.get("sub"))
+    except (TypeError, ValueError):
+        created_by = None
+    job = TenantJob(
         tenant_id=tenant_id,
-        company_name=company_name,
-        logo_url=logo_url,
-        created_by=uuid.uuid4(),  # Assuming created_by is a UUID
+        status="queued",
+        payload=payload,
+        stages=initial_stages(),
         created_at=datetime.utcnow(),
-        
+        created_by=created_by,
     )
-    db.add(new_tenant)
+    db.add(job)
     db.commit()
-    db.refresh(new_tenant)
-
-    # --- Create a new database for the tenant ---
-    POSTGRES_USER = os.getenv('dev_username')
-    POSTGRES_PASSWORD = os.getenv('dev_password')
-    POSTGRES_SERVER = os.getenv('dev_host')
-    POSTGRES_PORT = os.getenv('dev_port', "5432")
-    POSTGRES_DB = os.getenv('dev_dbname')
-    admin_url = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
-    engine = create_engine(admin_url, isolation_level="AUTOCOMMIT")
-    db_name = tenant_id.lower()
-    with engine.connect() as conn:
-        conn.execute(text(f'CREATE DATABASE "{db_name}"'))
+    get_tenant_job_queue().enqueue({"job_id": str(job.id)})
+    return {"job_id": job.id, "status": job.status, "status_url": f"/tenant/jobs/{job.id}"}
 
-    # --- Create essential tenant tables directly (not via Alembic) ---
-    tenant_db_url = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{db_name}"
-    tenant_engine = create_engine(tenant_db_url)
-    create_table_sql = [
-        '''CREATE TABLE IF NOT EXISTS "user" (
-            id UUID PRIMARY KEY,
-            name VARCHAR(64),
-            email VARCHAR(64) UNIQUE,
-            role_id UUID,
-            is_active BOOLEAN,
-            created_at TIMESTAMP,
-            created_by UUID,
-            modified_at TIMESTAMP,
-            modified_by UUID
-        )''',
-        '''CREATE TABLE IF NOT EXISTS role (
-            id UUID PRIMARY KEY,
-            name VARCHAR(64),
-            is_active BOOLEAN DEFAULT TRUE,
-            created_at TIMESTAMP,
-            created_by UUID,
-            modified_at TIMESTAMP,
-            modified_by UUID
-        )''',
-        '''CREATE TABLE IF NOT EXISTS permission (
-            id UUID PRIMARY KEY,
-            code VARCHAR(64) UNIQUE,
-            description VARCHAR(256),
-            is_active BOOLEAN DEFAULT TRUE,
-            created_at TIMESTAMP,
-            created_by UUID,
-            modified_at TIMESTAMP,
-            modified_by UUID
-        )''',
-        '''CREATE TABLE IF NOT EXISTS role_permission (
-            id UUID PRIMARY KEY,
-            role_id UUID REFERENCES role(id),
-            permission_id UUID REFERENCES permission(id),
-            created_at TIMESTAMP,
-            created_by UUID,
-            modified_at TIMESTAMP,
-            modified_by UUID
-        )''',
-        '''CREATE TABLE IF NOT EXISTS network_flow (
-            id UUID PRIMARY KEY,
-            name VARCHAR(64),
-            flow_url VARCHAR(256),
-            is_active BOOLEAN,
-            created_at TIMESTAMP,
-            created_by UUID,
-            modified_at TIMESTAMP,
-            modified_by UUID
-        )'''
-    ]
-    with tenant_engine.begin() as conn:
-     for stmt in create_table_sql:
-        conn.execute(text(stmt))
-
-    return new_tenant
+@router.get("/tenant/jobs/{id}", response_model=TenantJobOut)
+def get_tenant_job(id: uuid.UUID, db: Session = Depends(get_global_db), token: dict = Depends(verify_token)):
+    job = db.query(TenantJob).filter(TenantJob.id == id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Tenant job not found")
+    return job
@@ -0,0 +1,93 @@
+import os
+import sys
+
+os.environ.setdefault("COGNITO_REGION", "us-east-1")
+os.environ.setdefault("COGNITO_USERPOOL_ID", "test-pool")
+os.environ.setdefault("COGNITO_APP_CLIENT_ID", "test-client")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uuid
+import pytest
+
+# Nominal size (mm) -> (outside diameter, Sch. 40 wall, Sch. 80 wall) in inches, ASME B36.10
+STEEL_PIPES = {
+    25: (1.315, 0.133, 0.179),
+    50: (2.375, 0.154, 0.218),
+    80: (3.5, 0.216, 0.300),
+    100: (4.5, 0.237, 0.337),
+    150: (6.625, 0.280, 0.432),
+    200: (8.625, 0.322, 0.500),
+}
+STEEL_ROUGHNESS_IN = 0.0018  # 0.045 mm
+AIR_GAS_CONSTANT = 287.05
+WATER_DENSITY = 998.2
+WATER_VISCOSITY_CP = 1.002
+AIR_VISCOSITY_CP = 0.0181
+BUCKET = "flow-uploads"
+
+
+def pipe_id(schedule: str, size: int) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"steel/{schedule}/{size}"))
+
+
+def catalogue_rows() -> tuple:
+    """(pipe, fitting, gas, liquid) rows of a small synthetic catalogue with constant fluid properties."""
+    pipes = [
+        {
+            "id": pipe_id(schedule, size),
+            "material": "Steel",
+            "schedule_or_class": schedule,
+            "size": size,
+            "outside_diameter_in_inch": outside,
+            "wall_thickness_in_inch": walls[column],
+            "internal_roughness_in_inch": STEEL_ROUGHNESS_IN,
+        }
+        for size, (outside, *walls) in STEEL_PIPES.items()
+        for column, schedule in enumerate(("Sch. 40", "Sch. 80"))
+    ]
+    fittings = [{"type": "LB", "size": size, "k_factor": 0.3} for size in STEEL_PIPES]
+    liquids = [
+        {
+            "name": "Water", "temperature_in_k": temperature, "pressure_in_bar_g": pressure,
+            "density_in_kg_or_meter_cube": WATER_DENSITY, "viscosity_centipoise": WATER_VISCOSITY_CP,
+            "vapour_pressure_in_kpa_absolute": 2.3,
+        }
+        for temperature in (273.15, 373.15) for pressure in (0.0, 50.0)
+    ]
+    # Ideal gas at 293.15 K; density is linear in pressure, so interpolation is exact there
+    gases = [
+        {
+            "name": "Air", "temperature_in_k": 293.15, "pressure_in_bar_g": pressure,
+            "density_in_kg_or_meter_cube": (pressure * 1e5 + 101325.0) / (AIR_GAS_CONSTANT * 293.15),
+            "viscosity_centipoise": AIR_VISCOSITY_CP, "specific_heat_ratio": 1.4,
+        }
+        for pressure in (0.0, 100.0)
+    ]
+    return pipes, fittings, gases, liquids
+
+
+@pytest.fixture
+def tables():
+    from shared.hydraulics import HydraulicTables
+    return HydraulicTables(*catalogue_rows(), version="test")
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    """Moto S3 client with BUCKET created, used by every S3 call in shared."""
+    from moto import mock_aws
+    import shared.aws
+    import shared.flow_storage
+    import shared.uploads
+    for name, value in {"AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing", "AWS_REGION": "us-east-1"}.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv("AWS_ENDPOINT_URL", raising=False)
+    monkeypatch.setattr(shared.aws, "_clients", {})
+    monkeypatch.setattr(shared.uploads, "S3_BUCKET", BUCKET)
+    monkeypatch.setattr(shared.flow_storage, "S3_BUCKET", BUCKET)
+    # Smallest part size S3 accepts, so a two-part upload stays small
+    monkeypatch.setattr(shared.uploads, "S3_UPLOAD_PART_SIZE", shared.uploads.S3_MIN_PART_SIZE)
+    with mock_aws():
+        client = shared.aws.get_s3_client()
+        client.create_bucket(Bucket=BUCKET)
+        yield client
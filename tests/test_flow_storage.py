@@ -0,0 +1,101 @@
+import asyncio
+import hashlib
+import io
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+import shared.flow_storage as flow_storage
+from shared.flow_storage import flow_object_key, release_flow_file, store_flow_file
+from shared.models import Base, FlowObject
+from conftest import BUCKET
+
+TENANT = "acme"
+CONTENT = b'{"nodes": [], "pipes": []}'
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+KEY = flow_object_key(TENANT, SHA256)
+
+
+@pytest.fixture
+def sessions(tmp_path, s3):
+    path = tmp_path / "tenant.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    AsyncSession = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{path}"), expire_on_commit=False)
+
+    def store():
+        async def run():
+            async with AsyncSession() as db:
+                await store_flow_file(db, TENANT, io.BytesIO(CONTENT))
+                await db.commit()
+        asyncio.run(run())
+
+    return sessionmaker(bind=engine), store
+
+
+def ref_count(SessionLocal):
+    with SessionLocal() as db:
+        flow_object = db.get(FlowObject, SHA256)
+        return None if flow_object is None else flow_object.ref_count
+
+
+def stored(s3) -> bool:
+    return s3.list_objects_v2(Bucket=BUCKET, Prefix=KEY)["KeyCount"] == 1
+
+
+def release(SessionLocal, commit: bool = True):
+    with SessionLocal() as db:
+        release_flow_file(db, SHA256)
+        if commit:
+            db.commit()
+        else:
+            db.rollback()
+
+
+def test_object_is_deleted_after_the_last_release_commits(s3, sessions):
+    SessionLocal, store = sessions
+    store()
+    store()
+    assert ref_count(SessionLocal) == 2 and stored(s3)
+    release(SessionLocal)
+    assert ref_count(SessionLocal) == 1 and stored(s3)
+    release(SessionLocal, commit=False)
+    assert ref_count(SessionLocal) == 1 and stored(s3)
+    release(SessionLocal)
+    assert ref_count(SessionLocal) is None and not stored(s3)
+
+
+def test_object_referenced_again_before_the_purge_is_kept(s3, sessions, monkeypatch):
+    SessionLocal, store = sessions
+    store()
+    purge = flow_storage._purge_object
+
+    def store_then_purge(db, sha256):
+        # Another request stores the same content between the release commit and the purge
+        assert ref_count(SessionLocal) == 0
+        store()
+        purge(db, sha256)
+
+    monkeypatch.setattr(flow_storage, "_purge_object", store_then_purge)
+    release(SessionLocal)
+    assert ref_count(SessionLocal) == 1 and stored(s3)
+
+
+def test_failed_delete_keeps_the_tombstone_and_a_later_store_revives_it(s3, sessions, monkeypatch):
+    SessionLocal, store = sessions
+    store()
+
+    def unavailable(**kwargs):
+        raise ConnectionError("S3 unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(s3, "delete_object", unavailable)
+        release(SessionLocal)
+    assert ref_count(SessionLocal) == 0 and stored(s3)
+
+    # A tombstone whose object is gone (the purge's commit failed after the S3 delete)
+    s3.delete_object(Bucket=BUCKET, Key=KEY)
+    store()
+    assert ref_count(SessionLocal) == 1 and stored(s3)
@@ -0,0 +1,61 @@
+import math
+import numpy as np
+import pytest
+
+from shared.gas_flow import gas_flow
+from shared.hydraulics import ATMOSPHERE, BAR
+from conftest import AIR_GAS_CONSTANT
+
+
+def line(mass_flow_kg_per_h, length_m=1000.0, inlet_pressure_bar_g=10.0):
+    return {
+        "fluid": "Air",
+        "material": "Steel",
+        "schedule_or_class": "Sch. 40",
+        "size": 50,
+        "length_m": length_m,
+        "inlet_pressure_bar_g": inlet_pressure_bar_g,
+        "inlet_temperature_in_k": 293.15,
+        "mass_flow_kg_per_h": mass_flow_kg_per_h,
+    }
+
+
+def test_isothermal_outlet_pressure_matches_closed_form(tables):
+    result = gas_flow(tables, [line(1000.0)], mode="isothermal")
+    assert not result["choked"][0]
+    p1 = 10.0 * BAR + ATMOSPHERE
+    p2 = result["outlet_pressure"][0] + ATMOSPHERE
+    diameter = result["inner_diameter"][0]
+    mass_flux = result["mass_flow"][0] / (math.pi * diameter ** 2 / 4.0)
+    f = result["friction_factor"][0]
+    # Isothermal ideal-gas flow: p1^2 - p2^2 = G^2 R T (f L / D + 2 ln(p1 / p2))
+    rhs = mass_flux ** 2 * AIR_GAS_CONSTANT * 293.15 * (f * 1000.0 / diameter + 2.0 * math.log(p1 / p2))
+    assert p1 ** 2 - p2 ** 2 == pytest.approx(rhs, rel=1e-6)
+    assert result["outlet_temperature"][0] == pytest.approx(293.15)
+
+
+@pytest.mark.parametrize("mode, limit", [("isothermal", 1.0 / math.sqrt(1.4)), ("adiabatic", 1.0)])
+def test_choking_inside_the_line_stops_at_the_limiting_mach(tables, mode, limit):
+    result = gas_flow(tables, [line(15000.0)], mode=mode)
+    assert result["choked"][0]
+    assert 0.0 < result["choke_length"][0] < 1000.0
+    assert result["outlet_mach"][0] == pytest.approx(limit, rel=1e-6)
+    assert result["inlet_mach"][0] < limit
+
+
+@pytest.mark.parametrize("mode", ["isothermal", "adiabatic"])
+def test_line_choked_at_inlet_has_no_outlet_state(tables, mode):
+    result = gas_flow(tables, [line(40000.0), line(2000.0)], mode=mode)
+    limit = 1.0 / math.sqrt(1.4) if mode == "isothermal" else 1.0
+    assert result["inlet_mach"][0] >= limit
+    assert result["choked"][0] and result["choke_length"][0] == 0.0
+    for name in ("outlet_pressure", "outlet_temperature", "outlet_density", "outlet_velocity", "outlet_mach", "pressure_drop"):
+        assert np.isnan(result[name][0])
+        assert not np.isnan(result[name][1])
+
+
+def test_rejects_liquids_and_non_positive_flow(tables):
+    with pytest.raises(ValueError):
+        gas_flow(tables, [{**line(2000.0), "fluid": "Water"}])
+    with pytest.raises(ValueError):
+        gas_flow(tables, [line(0.0)])
@@ -0,0 +1,82 @@
+import math
+import numpy as np
+import pytest
+
+from shared.hydraulics import friction_factor, pressure_drop, size_pipes, BAR, LAMINAR_RE
+from conftest import STEEL_PIPES, STEEL_ROUGHNESS_IN, WATER_DENSITY, WATER_VISCOSITY_CP
+
+INCH = 0.0254
+
+
+@pytest.mark.parametrize("method", ["swamee_jain", "colebrook"])
+def test_laminar_friction_factor_is_64_over_re(method):
+    re = np.array([10.0, 500.0, LAMINAR_RE])
+    assert friction_factor(re, 1e-3, method) == pytest.approx(64.0 / re, rel=1e-12)
+
+
+def test_colebrook_solves_its_equation_and_agrees_with_swamee_jain():
+    re = np.geomspace(5000.0, 1e8, 40)
+    for relative_roughness in (1e-6, 1e-4, 1e-3, 1e-2):
+        f = friction_factor(re, relative_roughness, "colebrook")
+        residual = 1.0 / np.sqrt(f) + 2.0 * np.log10(relative_roughness / 3.7 + 2.51 / (re * np.sqrt(f)))
+        assert np.abs(residual).max() < 1e-6
+        # Swamee-Jain is an explicit fit to Colebrook over Re 5e3-1e8 and e/D 1e-6-1e-2, within 3% there
+        assert friction_factor(re, relative_roughness, "swamee_jain") == pytest.approx(f, rel=0.03)
+
+
+def test_darcy_weisbach_textbook_case():
+    # Water at 2 m/s through 100 m of 100 mm commercial steel (e = 0.045 mm):
+    # Re = 1.99e5, e/D = 4.5e-4, f = 0.0186 from the Moody chart, dp = f L/D rho v^2/2 = 37.1 kPa
+    diameter = 0.1
+    flow = math.pi * diameter ** 2 / 4.0 * 2.0
+    result = pressure_drop(
+        np.array([flow]), np.array([diameter]), np.array([0.045e-3]), np.array([100.0]),
+        WATER_DENSITY, WATER_VISCOSITY_CP / 1000.0, k_total=np.array([1.5]), elevation_change=np.array([10.0]),
+        method="colebrook",
+    )
+    assert result["velocity"][0] == pytest.approx(2.0)
+    assert result["reynolds"][0] == pytest.approx(1.9924e5, rel=1e-4)
+    assert result["friction_factor"][0] == pytest.approx(0.0186, rel=0.01)
+    assert result["major_loss"][0] == pytest.approx(37.07e3, rel=1e-3)
+    assert result["minor_loss"][0] == pytest.approx(1.5 * WATER_DENSITY * 2.0 ** 2 / 2.0)
+    assert result["elevation_loss"][0] == pytest.approx(WATER_DENSITY * 9.80665 * 10.0)
+    assert result["pressure_drop"][0] == pytest.approx(
+        result["major_loss"][0] + result["minor_loss"][0] + result["elevation_loss"][0]
+    )
+
+
+def _gradient_and_velocity(flow, schedule_wall, size):
+    outside, *walls = STEEL_PIPES[size]
+    diameter = (outside - 2.0 * walls[schedule_wall]) * INCH
+    result = pressure_drop(
+        np.array([flow]), np.array([diameter]), np.array([STEEL_ROUGHNESS_IN * INCH]), np.array([100.0]),
+        WATER_DENSITY, WATER_VISCOSITY_CP / 1000.0,
+    )
+    return result["pressure_drop"][0] / BAR, result["velocity"][0]
+
+
+@pytest.mark.parametrize("max_velocity, max_drop", [(3.0, None), (None, 1.0), (3.0, 0.5), (10.0, 5.0)])
+def test_sizing_picks_the_smallest_size_within_the_limits(tables, max_velocity, max_drop):
+    flow_m3_per_h = 60.0
+    line = {
+        "fluid": "Water", "flow_rate_m3_per_h": flow_m3_per_h, "material": "Steel", "schedule_or_class": "Sch. 40",
+        "max_velocity_m_per_s": max_velocity, "max_pressure_drop_bar_per_100m": max_drop, "candidates": 2,
+    }
+    [candidates] = size_pipes(tables, [line])
+
+    def fits(size):
+        drop, velocity = _gradient_and_velocity(flow_m3_per_h / 3600.0, 0, size)
+        return (max_velocity is None or velocity <= max_velocity) and (max_drop is None or drop <= max_drop)
+
+    expected = [size for size in sorted(STEEL_PIPES) if fits(size)]
+    assert [candidate["size"] for candidate in candidates] == expected[:1]
+    smaller = [size for size in STEEL_PIPES if size < expected[0]]
+    assert smaller and not any(fits(size) for size in smaller)
+    drop, velocity = _gradient_and_velocity(flow_m3_per_h / 3600.0, 0, expected[0])
+    assert candidates[0]["velocity_m_per_s"] == pytest.approx(velocity)
+    assert candidates[0]["pressure_drop_bar_per_100m"] == pytest.approx(drop)
+
+
+def test_sizing_rejects_a_line_without_limits(tables):
+    with pytest.raises(ValueError):
+        size_pipes(tables, [{"fluid": "Water", "flow_rate_m3_per_h": 10.0}])
@@ -0,0 +1,13 @@
+import pytest
+
+from shared.importtime import LAMBDAS, measure, total_ms, budget_ms
+
+
+@pytest.mark.parametrize("name", sorted(LAMBDAS))
+def test_cold_import_is_within_budget(name):
+    entries = measure(LAMBDAS[name])
+    slowest = sorted(entries, key=lambda entry: entry[1], reverse=True)[:5]
+    assert total_ms(entries) <= budget_ms(name), (
+        f"{LAMBDAS[name]} imports in {total_ms(entries):.0f} ms; slowest: "
+        + ", ".join(f"{module} {cumulative / 1000:.0f} ms" for _, cumulative, _, module in slowest)
+    )
@@ -0,0 +1,62 @@
+import os
+import sys
+import uuid
+from datetime import datetime
+
+os.environ.setdefault("COGNITO_REGION", "us-east-1")
+os.environ.setdefault("COGNITO_USERPOOL_ID", "test-pool")
+os.environ.setdefault("COGNITO_APP_CLIENT_ID", "test-client")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import networkflow_lambda.router as networkflow_router
+import user_role_permission_lambda.router as user_role_permission_router
+from api_lambda.main import app
+from shared.db import get_db
+from shared.models import Base, Role, Permission, NetworkFlow
+from shared.security import verify_token
+
+ROUTES = ("/role/all", "/permission/all", "/network-flow/all")
+
+
+@pytest.fixture
+def client():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine)
+    db = SessionLocal()
+    now = datetime(2025, 1, 1)
+    db.add(Role(id=uuid.uuid4(), name="engineer", is_active=True, created_at=now))
+    db.add(Permission(id=uuid.uuid4(), code="masterdata:read", description="Read masterdata", is_active=True, created_at=now))
+    db.add(NetworkFlow(id=uuid.uuid4(), name="plant", flow_url="https://bucket/flow.json", is_active=True, created_at=now))
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        session = SessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[verify_token] = lambda: {"custom:tenant_id": "acme", "sub": str(uuid.uuid4())}
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize("fast", [False, True])
+@pytest.mark.parametrize("path", ROUTES)
+def test_all_route_is_not_shadowed_by_id_route(client, monkeypatch, path, fast):
+    monkeypatch.setattr(networkflow_router, "FAST_SERIALIZATION", fast)
+    monkeypatch.setattr(user_role_permission_router, "FAST_SERIALIZATION", fast)
+    response = client.get(path)
+    assert response.status_code == 200, response.text
+    rows = response.json()
+    assert len(rows) == 1
+    uuid.UUID(rows[0]["id"])
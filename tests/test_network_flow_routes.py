@@ -0,0 +1,103 @@
+import hashlib
+import json
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import shared.hydraulics
+import shared.network_cache
+from api_lambda.main import app
+from shared.db import get_db
+from shared.flow_storage import flow_object_key
+from shared.models import Base, NetworkFlow
+from shared.network_cache import NetworkCache
+from shared.security import verify_token
+from shared.uploads import object_url
+from conftest import BUCKET
+
+FLOW = {
+    "fluid": "Water",
+    "nodes": [{"id": "in", "pressure_bar_g": 3.0}, {"id": "out", "demand_m3_per_h": 40.0}],
+    "pipes": [{"id": "p", "from": "in", "to": "out", "length_m": 300.0,
+               "material": "Steel", "schedule_or_class": "Sch. 40", "size": 80}],
+}
+
+
+@pytest.fixture
+def client(s3, tables, tmp_path, monkeypatch):
+    content = json.dumps(FLOW).encode()
+    sha256 = hashlib.sha256(content).hexdigest()
+    key = flow_object_key("acme", sha256)
+    s3.put_object(Bucket=BUCKET, Key=key, Body=content)
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine)
+    flow_id = uuid.uuid4()
+    with SessionLocal() as db:
+        db.add(NetworkFlow(id=flow_id, name="plant", flow_url=object_url(key), content_hash=sha256, is_active=True))
+        db.add(NetworkFlow(id=uuid.uuid4(), name="legacy", flow_url=object_url(key), is_active=True))
+        db.commit()
+
+    def override_get_db():
+        with SessionLocal() as db:
+            yield db
+
+    cache = NetworkCache(4, str(tmp_path), 64 * 1024 * 1024)
+    monkeypatch.setattr(shared.network_cache, "network_cache", cache)
+    monkeypatch.setattr(shared.hydraulics.hydraulic_tables, "get", lambda db, tenant_id: tables)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[verify_token] = lambda: {"custom:tenant_id": "acme", "sub": "user-1"}
+    yield TestClient(app), flow_id, sha256, SessionLocal, cache
+    app.dependency_overrides.clear()
+
+
+def test_get_answers_a_matching_etag_with_304(client):
+    client, flow_id, sha256, SessionLocal, _ = client
+    response = client.get(f"/network-flow/{flow_id}")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag.startswith(f'"{sha256}-')
+
+    response = client.get(f"/network-flow/{flow_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.content == b""
+    assert response.headers["ETag"] == etag
+    assert client.get(f"/network-flow/{flow_id}", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+
+    # Renaming the row changes the body, and with it the ETag
+    with SessionLocal() as db:
+        db.get(NetworkFlow, flow_id).name = "renamed"
+        db.commit()
+    response = client.get(f"/network-flow/{flow_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.json()["name"] == "renamed"
+    assert response.headers["ETag"] != etag
+
+
+def test_solve_skips_the_solve_for_a_matching_etag(client):
+    client, flow_id, sha256, _, cache = client
+    response = client.post(f"/network-flow/{flow_id}/solve")
+    assert response.status_code == 200 and response.json()["converged"]
+    etag = response.headers["ETag"]
+    assert etag.startswith(f'"{sha256}-')
+    assert cache.stats()["misses"] == 1
+
+    response = client.post(f"/network-flow/{flow_id}/solve", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert cache.stats()["hits"] == 0  # answered without loading the network
+
+    # Other overrides give another result
+    response = client.post(
+        f"/network-flow/{flow_id}/solve", json={"friction_method": "colebrook"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+
+
+def test_rows_without_content_hash_get_no_etag(client):
+    client, *_ = client
+    [legacy] = [row for row in client.get("/network-flow/all").json() if row["name"] == "legacy"]
+    response = client.get(f"/network-flow/{legacy['id']}", headers={"If-None-Match": "*"})
+    assert response.status_code == 200 and "ETag" not in response.headers
@@ -0,0 +1,155 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import shared.network_cache as network_cache_module
+from shared.hydraulics import GRAVITY, BAR
+from shared.network_cache import NetworkCache
+from shared.network_solver import Network, parse_network, solve_network, solve_flow_file
+from shared.scenarios import run_scenarios
+from conftest import WATER_DENSITY, WATER_VISCOSITY_CP
+
+VISCOSITY = WATER_VISCOSITY_CP / 1000.0
+
+
+def pipe(pipe_id, start, end, size, length_m=200.0, **extra):
+    return {"id": pipe_id, "from": start, "to": end, "length_m": length_m,
+            "material": "Steel", "schedule_or_class": "Sch. 40", "size": size, **extra}
+
+
+def looped_flow() -> dict:
+    """A tank feeding two loops (a-b-d-c and c-d-f-e) with demands at every junction."""
+    return {
+        "fluid": "Water", "temperature_in_k": 293.15, "pressure_in_bar_g": 0,
+        "nodes": [
+            {"id": "tank", "elevation_m": 30.0, "pressure_bar_g": 2.0},
+            {"id": "a", "elevation_m": 5.0, "demand_m3_per_h": 5.0},
+            {"id": "b", "elevation_m": 3.0, "demand_m3_per_h": 20.0},
+            {"id": "c", "elevation_m": 0.0, "demand_m3_per_h": 15.0},
+            {"id": "d", "elevation_m": 0.0, "demand_m3_per_h": 10.0},
+            {"id": "e", "elevation_m": -2.0, "demand_m3_per_h": 25.0},
+            {"id": "f", "elevation_m": 1.0, "demand_m3_per_h": 12.0},
+        ],
+        "pipes": [
+            pipe("main", "tank", "a", 150, 500.0, fittings={"LB": 4}),
+            pipe("ab", "a", "b", 100),
+            pipe("ac", "a", "c", 100),
+            pipe("bd", "b", "d", 80),
+            pipe("cd", "c", "d", 50),
+            pipe("ce", "c", "e", 80),
+            pipe("df", "d", "f", 80),
+            pipe("fe", "f", "e", 50),
+        ],
+    }
+
+
+def test_looped_network_satisfies_continuity_and_head_loss(tables):
+    network = parse_network(looped_flow(), tables)
+    result = solve_network(network, WATER_DENSITY, VISCOSITY, method="colebrook")
+    assert result["converged"]
+
+    # Continuity: inflow minus outflow equals the demand at every junction
+    net_inflow = np.zeros(network.node_count)
+    np.add.at(net_inflow, network.end, result["flow"])
+    np.subtract.at(net_inflow, network.start, result["flow"])
+    junctions = ~network.fixed
+    assert net_inflow[junctions] == pytest.approx(network.demand[junctions], abs=1e-9)
+    # The tank supplies the total demand
+    assert -net_inflow[network.fixed].sum() == pytest.approx(network.demand.sum())
+
+    # Energy: each pipe's head difference is its Darcy-Weisbach plus fitting loss at the solved flow,
+    # to within the solver's flow tolerance
+    area = np.pi * network.diameter ** 2 / 4.0
+    velocity = result["flow"] / area
+    expected = (result["friction_factor"] * network.length / network.diameter + network.k_total) \
+        * velocity * np.abs(velocity) / (2.0 * GRAVITY)
+    assert result["headloss"] == pytest.approx(expected, rel=1e-4)
+    # Hence the head losses around each loop sum to zero
+    loss = dict(zip(network.pipe_ids.tolist(), result["headloss"]))
+    assert loss["ab"] + loss["bd"] - loss["cd"] - loss["ac"] == pytest.approx(0.0, abs=1e-9)
+    assert loss["cd"] + loss["df"] + loss["fe"] - loss["ce"] == pytest.approx(0.0, abs=1e-9)
+
+    # Fixed node keeps its head; pressure follows from head and elevation
+    assert result["head"][0] == pytest.approx(30.0 + 2.0 * BAR / (WATER_DENSITY * GRAVITY))
+    assert result["pressure"] == pytest.approx((result["head"] - network.elevation) * WATER_DENSITY * GRAVITY)
+
+
+def test_single_pipe_matches_darcy_weisbach(tables):
+    flow = {
+        "nodes": [{"id": "in", "pressure_bar_g": 3.0}, {"id": "out", "demand_m3_per_h": 40.0}],
+        "pipes": [pipe("p", "in", "out", 80, 300.0)],
+    }
+    network = parse_network(flow, tables)
+    result = solve_network(network, WATER_DENSITY, VISCOSITY)
+    assert result["flow"][0] == pytest.approx(40.0 / 3600.0)
+    velocity = result["velocity"][0]
+    loss = result["friction_factor"][0] * 300.0 / network.diameter[0] * velocity ** 2 / (2.0 * GRAVITY)
+    assert result["headloss"][0] == pytest.approx(loss, rel=1e-9)
+
+
+def test_disconnected_junction_is_rejected(tables):
+    flow = looped_flow()
+    flow["nodes"] += [{"id": "island", "demand_m3_per_h": 1.0}, {"id": "shore"}]
+    flow["pipes"].append(pipe("bridge", "island", "shore", 50))
+    network = parse_network(flow, tables)
+    with pytest.raises(ValueError, match="not connected to a fixed-pressure node"):
+        solve_network(network, WATER_DENSITY, VISCOSITY)
+
+
+def test_scenarios_override_demand_and_schedule(tables):
+    network = parse_network(looped_flow(), tables)
+    base = solve_flow_file(None, tables, network=network)
+    scenarios = [
+        {"name": "double", "demand_multiplier": 2.0},
+        {"name": "sch80", "schedule_or_class": "Sch. 80"},
+        {"name": "missing", "schedule_or_class": "Sch. 160"},
+    ]
+    outcomes = {outcome["name"]: outcome for outcome in run_scenarios(network, tables, scenarios, workers=1)}
+    assert [outcomes[name]["index"] for name in ("double", "sch80", "missing")] == [0, 1, 2]
+
+    def flows(result):
+        return np.array([row["flow_m3_per_h"] for row in result["pipes"]])
+
+    def drop(result):
+        return result["nodes"][0]["head_m"] - min(row["head_m"] for row in result["nodes"])
+
+    # Main supplies the total demand, doubled by the scenario
+    assert flows(outcomes["double"]["result"])[0] == pytest.approx(2.0 * flows(base)[0])
+    # Sch. 80 has thicker walls at the same size, so the same demands lose more pressure
+    assert flows(outcomes["sch80"]["result"])[0] == pytest.approx(flows(base)[0])
+    assert drop(outcomes["sch80"]["result"]) > drop(base)
+    assert "error" in outcomes["missing"]
+    # The base network is left as parsed
+    assert network.demand.sum() * 3600.0 == pytest.approx(87.0)
+    assert (network.material == "Steel").all()
+
+
+def test_network_cache_round_trips_through_disk(tables, tmp_path, monkeypatch):
+    reads = []
+
+    def read_flow_file(url):
+        reads.append(url)
+        return json.dumps(looped_flow()).encode()
+
+    monkeypatch.setattr(network_cache_module, "read_flow_file", read_flow_file)
+    cache = NetworkCache(4, str(tmp_path), 64 * 1024 * 1024)
+    flow = SimpleNamespace(id="flow-1", content_hash="abc", flow_url="s3://bucket/flow.json", modified_at=None)
+
+    parsed = cache.get("acme", flow, tables)
+    cache.clear()
+    loaded = cache.get("acme", flow, tables)
+    assert reads == ["s3://bucket/flow.json"]
+    assert cache.stats() == {"size": 1, "hits": 0, "disk_hits": 1, "misses": 1}
+    for name in Network.ARRAYS:
+        array = getattr(loaded, name)
+        assert isinstance(array, np.memmap) and not array.flags.writeable
+        np.testing.assert_array_equal(array, getattr(parsed, name))
+    assert loaded.fluid == parsed.fluid
+    assert solve_flow_file(None, tables, network=loaded) == solve_flow_file(None, tables, network=parsed)
+
+    # A changed file misses on both levels
+    cache.clear()
+    cache.get("acme", SimpleNamespace(**{**vars(flow), "content_hash": "def"}), tables)
+    assert len(reads) == 2
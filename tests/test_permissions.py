@@ -0,0 +1,77 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import shared.permissions as permissions
+from shared.models import Base, User, Role, Permission, RolePermission
+from shared.permissions import PermissionCache, bump_permission_version
+
+TTL = 60.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(permissions, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    role_id, permission_id = uuid.uuid4(), uuid.uuid4()
+    session.add(Role(id=role_id, name="engineer", is_active=True))
+    session.add(Permission(id=permission_id, code="masterdata:read", is_active=True))
+    session.add(RolePermission(id=uuid.uuid4(), role_id=role_id, permission_id=permission_id))
+    session.add(User(id=uuid.uuid4(), name="known", role_id=role_id, is_active=True))
+    bump_permission_version(session, "acme")
+    session.commit()
+    session.statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: session.statements.append(args[2]))
+    yield session
+    session.close()
+
+
+def add_user(db) -> str:
+    user_id = uuid.uuid4()
+    role_id = db.query(Role.id).scalar()
+    db.add(User(id=user_id, name="new", role_id=role_id, is_active=True))
+    bump_permission_version(db, "elsewhere")  # written through another tenant key: no local invalidation
+    db.commit()
+    return str(user_id)
+
+
+def test_unknown_users_force_at_most_one_version_check_per_ttl(db, clock):
+    cache = PermissionCache(TTL)
+    known = str(db.query(User.id).scalar())
+    assert cache.allows(db, "acme", known, "masterdata:read")
+    clock[0] += 1.0
+    db.statements.clear()
+
+    for _ in range(100):
+        assert not cache.allows(db, "acme", str(uuid.uuid4()), "masterdata:read")
+    version_checks = [sql for sql in db.statements if "permission_version" in sql]
+    assert len(version_checks) == 1
+    assert cache.stats()["forced_checks"] == 1
+
+
+def test_user_created_elsewhere_is_allowed_by_a_forced_check(db, clock):
+    cache = PermissionCache(TTL)
+    known = str(db.query(User.id).scalar())
+    assert cache.allows(db, "acme", known, "masterdata:read")
+    clock[0] += 1.0
+    assert cache.allows(db, "acme", add_user(db), "masterdata:read")
+    assert cache.stats()["loads"] == 2
+
+    # Within the TTL of that forced check, a second new user waits for the regular revalidation
+    clock[0] += 1.0
+    newer = add_user(db)
+    assert not cache.allows(db, "acme", newer, "masterdata:read")
+    clock[0] += TTL
+    assert cache.allows(db, "acme", newer, "masterdata:read")
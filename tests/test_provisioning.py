@@ -0,0 +1,49 @@
+import re
+
+import pytest
+
+from shared.alembicMigration import run_alembic_upgrade
+from shared.models import Base
+from shared.provisioning import TENANT_TABLES, tenant_tables_ddl
+
+
+def schema_of(statements) -> tuple:
+    """({table: set of column and constraint definitions}, set of index statements) from PostgreSQL DDL."""
+    tables, indexes = {}, set()
+    for statement in statements:
+        statement = re.sub(r"--[^\n]*", "", statement.replace(" IF NOT EXISTS", ""))
+        statement = re.sub(r"\s+", " ", statement).strip()
+        create = re.match(r'CREATE TABLE "?(\w+)"? \((.*)\)$', statement)
+        add_column = re.match(r'ALTER TABLE "?(\w+)"? ADD COLUMN (.*)$', statement)
+        if create:
+            tables.setdefault(create.group(1), set()).update(part.strip() for part in create.group(2).split(", "))
+        elif add_column:
+            tables.setdefault(add_column.group(1), set()).add(add_column.group(2))
+        elif statement.startswith("CREATE INDEX"):
+            indexes.add(statement)
+    return tables, indexes
+
+
+@pytest.fixture
+def migrated_sql(monkeypatch, tmp_path):
+    """Offline SQL Alembic runs to bring a new tenant database to the head."""
+    for name, value in {"dev_username": "u", "dev_password": "p", "dev_host": "localhost", "dev_dbname": "global"}.items():
+        monkeypatch.setenv(name, value)
+    output = tmp_path / "tenant.sql"
+    run_alembic_upgrade("acme", "base:head", sql_output=str(output))
+    return output.read_text().split(";\n")
+
+
+def test_generated_ddl_matches_the_migrations(migrated_sql):
+    migrated_tables, migrated_indexes = schema_of(migrated_sql)
+    tables, indexes = schema_of(tenant_tables_ddl())
+    assert set(tables) == set(TENANT_TABLES)
+    for name in TENANT_TABLES:
+        assert tables[name] == migrated_tables[name], name
+    assert indexes == {index for index in migrated_indexes if re.search(r" ON \"?(\w+)\"? ", index).group(1) in tables}
+
+
+def test_tenant_tables_only_reference_each_other():
+    for name in TENANT_TABLES:
+        for foreign_key in Base.metadata.tables[name].foreign_keys:
+            assert foreign_key.column.table.name in TENANT_TABLES
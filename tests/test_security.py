@@ -0,0 +1,75 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import shared.security as security
+from shared.security import JWKSCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(security, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def jwks(monkeypatch):
+    """Stand-in for Cognito: counts fetches and fails while jwks['down'] is set."""
+    state = {"fetches": 0, "down": False, "keys": [{"kid": "a"}]}
+
+    def fetch():
+        state["fetches"] += 1
+        if state["down"]:
+            raise ConnectionError("Cognito unreachable")
+        return state["keys"]
+
+    monkeypatch.setattr(security, "get_cognito_public_keys", fetch)
+    monkeypatch.setattr(security.jwk, "construct", lambda key, alg: f"key-{key['kid']}")
+    return state
+
+
+def test_failed_first_fetch_is_retried_at_most_once_per_interval(clock, jwks):
+    cache = JWKSCache(ttl=3600, min_refresh_interval=60)
+    jwks["down"] = True
+    for _ in range(10):
+        with pytest.raises(Exception):
+            cache.get("a")
+    assert jwks["fetches"] == 1
+
+    clock[0] += 60
+    jwks["down"] = False
+    assert cache.get("a") == ("RS256", "key-a")
+    assert jwks["fetches"] == 2
+
+
+def test_unknown_kid_refetches_at_most_once_per_interval(clock, jwks):
+    cache = JWKSCache(ttl=3600, min_refresh_interval=60)
+    assert cache.get("a")
+    clock[0] += 60
+    jwks["keys"] = [{"kid": "a"}, {"kid": "b"}]
+    assert cache.get("b") == ("RS256", "key-b")
+    assert [cache.get("c") for _ in range(5)] == [None] * 5
+    assert jwks["fetches"] == 2
+
+
+def test_stale_keys_start_one_background_refresh(clock, jwks, monkeypatch):
+    cache = JWKSCache(ttl=3600, min_refresh_interval=60)
+    assert cache.get("a")
+    started = []
+
+    def deferred_thread(target, daemon):
+        return SimpleNamespace(start=lambda: started.append(target))
+
+    monkeypatch.setattr(security, "threading", SimpleNamespace(Thread=deferred_thread))
+    clock[0] += 3601
+
+    threads = [threading.Thread(target=cache.get, args=("a",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(started) == 1
+    started[0]()
+    assert jwks["fetches"] == 2 and not cache._refreshing
@@ -0,0 +1,208 @@
+import asyncio
+import base64
+import hashlib
+import uuid
+
+import pytest
+import requests
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+import shared.uploads
+from api_lambda.main import app
+from shared.async_db import get_async_db, get_async_global_db
+from shared.flow_storage import flow_object_key
+from shared.models import Base, FlowObject, Tenant
+from shared.security import verify_token
+from shared.uploads import S3_MIN_PART_SIZE
+from conftest import BUCKET
+
+TENANT = "acme"
+
+
+@pytest.fixture
+def user(tmp_path, s3):
+    path = tmp_path / "tenant.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    AsyncSession = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{path}"), expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    claims = {"custom:tenant_id": TENANT, "sub": "user-1"}
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    # One SQLite file stands in for both the tenant and the global database
+    app.dependency_overrides[get_async_global_db] = override_get_async_db
+    app.dependency_overrides[verify_token] = lambda: claims
+    yield claims, AsyncSession
+    app.dependency_overrides.clear()
+
+
+def initiate(client, content: bytes) -> dict:
+    response = client.post("/network-flow/upload/initiate", json={
+        "filename": "plant.json", "size": len(content), "content_type": "application/json",
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def put_parts(upload: dict, content: bytes, part_size: int) -> list:
+    parts = []
+    for part in upload["parts"]:
+        start = (part["part_number"] - 1) * part_size
+        response = requests.put(part["url"], data=content[start:start + part_size])
+        assert response.status_code == 200, response.text
+        parts.append({"part_number": part["part_number"], "etag": response.headers["ETag"]})
+    return parts
+
+
+@pytest.mark.parametrize("send_parts", [True, False])
+def test_multipart_upload_is_completed_verified_and_adopted(s3, user, send_parts):
+    client = TestClient(app)
+    content = b"{" + b" " * S3_MIN_PART_SIZE + b"}"
+    upload = initiate(client, content)
+    assert upload["key"].startswith("network_flows/user-1/")
+    assert upload["part_size"] == S3_MIN_PART_SIZE
+    assert [part["part_number"] for part in upload["parts"]] == [1, 2]
+
+    parts = put_parts(upload, content, upload["part_size"])
+    response = client.post("/network-flow/upload/complete", json={
+        "key": upload["key"], "upload_id": upload["upload_id"], "name": "plant",
+        "parts": parts if send_parts else None,
+    })
+    assert response.status_code == 200, response.text
+
+    sha256 = hashlib.sha256(content).hexdigest()
+    key = flow_object_key(TENANT, sha256)
+    flow = response.json()
+    assert flow["flow_url"] == shared.uploads.object_url(key)
+    head = s3.head_object(Bucket=BUCKET, Key=key)
+    assert head["ContentLength"] == len(content)
+    assert head["Metadata"] == {"sha256": sha256}
+    checksum = s3.head_object(Bucket=BUCKET, Key=key, ChecksumMode="ENABLED")["ChecksumSHA256"]
+    assert checksum == base64.b64encode(hashlib.sha256(content).digest()).decode()
+    assert s3.get_object(Bucket=BUCKET, Key=key)["Body"].read() == content
+    # The upload key is dropped once the object has its content address
+    assert s3.list_objects_v2(Bucket=BUCKET, Prefix="network_flows/user-1/")["KeyCount"] == 0
+
+
+def test_same_content_through_both_paths_is_stored_once(s3, user):
+    _, AsyncSession = user
+    client = TestClient(app)
+    content = b'{"nodes": [], "pipes": []}'
+    upload = initiate(client, content)
+    response = client.post("/network-flow/upload/complete", json={
+        "key": upload["key"], "upload_id": upload["upload_id"], "name": "direct",
+        "parts": put_parts(upload, content, upload["part_size"]),
+    })
+    assert response.status_code == 200, response.text
+    response = client.post("/network-flow/create", data={"name": "form"}, files={"flow_file": ("plant.json", content)})
+    assert response.status_code == 200, response.text
+    assert response.json()["content_hash"] == hashlib.sha256(content).hexdigest()
+
+    async def stored():
+        async with AsyncSession() as db:
+            return (await db.execute(select(FlowObject))).scalars().all()
+    [flow_object] = asyncio.run(stored())
+    assert flow_object.ref_count == 2 and flow_object.size == len(content)
+    assert s3.list_objects_v2(Bucket=BUCKET)["KeyCount"] == 1
+
+
+def test_upload_rejects_sizes_outside_the_limits(s3, user):
+    client = TestClient(app)
+    response = client.post("/network-flow/upload/initiate", json={"filename": "plant.json", "size": 0})
+    assert response.status_code == 400
+    response = client.post("/network-flow/upload/initiate", json={
+        "filename": "plant.json", "size": shared.uploads.S3_UPLOAD_MAX_BYTES + 1,
+    })
+    assert response.status_code == 413
+    # Past 10,000 parts the part size grows instead
+    assert shared.uploads.part_size_for(S3_MIN_PART_SIZE * 20000) == S3_MIN_PART_SIZE * 2
+
+
+def test_upload_rejects_parts_below_the_minimum_size(s3, user):
+    client = TestClient(app)
+    content = b"x" * (S3_MIN_PART_SIZE + 10)
+    upload = initiate(client, content)
+    # Split at 1 MiB instead of the part size handed out: part 1 is below the S3 minimum
+    parts = put_parts(upload, content, 1024 * 1024)
+    response = client.post("/network-flow/upload/complete", json={
+        "key": upload["key"], "upload_id": upload["upload_id"], "name": "plant", "parts": parts,
+    })
+    assert response.status_code == 400
+    assert "EntityTooSmall" in response.json()["detail"]
+
+
+def test_upload_key_of_another_user_is_rejected(s3, user):
+    claims, AsyncSession = user
+    client = TestClient(app)
+    content = b"{}"
+    upload = initiate(client, content)
+    parts = put_parts(upload, content, upload["part_size"])
+
+    claims["sub"] = "user-2"
+    response = client.post("/network-flow/upload/complete", json={
+        "key": upload["key"], "upload_id": upload["upload_id"], "name": "plant", "parts": parts,
+    })
+    assert response.status_code == 403
+    # Nothing was assembled or recorded
+    assert s3.list_objects_v2(Bucket=BUCKET)["KeyCount"] == 0
+
+    async def stored():
+        async with AsyncSession() as db:
+            return (await db.execute(select(FlowObject))).scalars().all()
+    assert asyncio.run(stored()) == []
+
+    del claims["sub"]
+    response = client.post("/network-flow/upload/initiate", json={"filename": "plant.json", "size": 2})
+    assert response.status_code == 401
+
+
+def test_tenant_logo_key_of_another_user_is_rejected(s3, user):
+    claims, _ = user
+    client = TestClient(app)
+    tenant_id = f"t{uuid.uuid4().hex[:8]}"
+    response = client.post("/tenant/upload/initiate", json={
+        "tenant_id": tenant_id, "filename": "logo.png", "size": 10, "content_type": "image/png",
+    })
+    assert response.status_code == 200, response.text
+    upload = response.json()
+    assert upload["key"].startswith(f"tenant_logos/{tenant_id}/user-1/")
+
+    claims["sub"] = "user-2"
+    response = client.post("/tenant/upload/complete", json={
+        "tenant_id": tenant_id, "company_name": "Acme", "key": upload["key"], "upload_id": upload["upload_id"],
+    })
+    assert response.status_code == 403
+
+
+def test_tenant_logo_upload_creates_the_tenant(s3, user, monkeypatch):
+    _, AsyncSession = user
+    provisioned = []
+    monkeypatch.setattr("tenant_lambda.router.create_tenant_database", provisioned.append)
+    client = TestClient(app)
+    content = b"\x89PNG" + b"\0" * 60
+    upload = client.post("/tenant/upload/initiate", json={
+        "tenant_id": "Acme2", "filename": "logo.png", "size": len(content), "content_type": "image/png",
+    }).json()
+    parts = put_parts(upload, content, upload["part_size"])
+    response = client.post("/tenant/upload/complete", json={
+        "tenant_id": "Acme2", "company_name": "Acme", "key": upload["key"], "upload_id": upload["upload_id"],
+        "parts": parts,
+    })
+    assert response.status_code == 200, response.text
+    assert response.json()["logo_url"] == shared.uploads.object_url(upload["key"])
+    assert provisioned == ["acme2"]
+
+    async def tenants():
+        async with AsyncSession() as db:
+            return (await db.execute(select(Tenant.tenant_id))).scalars().all()
+    assert asyncio.run(tenants()) == ["Acme2"]
+
+    response = client.post("/tenant/upload/initiate", json={
+        "tenant_id": "Acme2", "filename": "logo.png", "size": len(content), "content_type": "image/png",
+    })
+    assert response.status_code == 409
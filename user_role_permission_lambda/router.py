@@ -5,6 +5,8 @@ from shared.db import get_db
 from shared.models import User, Role, Permission, RolePermission
 from shared.schemas import UserCreate, UserOut, RoleCreate, RoleOut, PermissionCreate, PermissionOut, RolePermissionCreate, RolePermissionOut
 from shared.security import verify_token
+from shared.permissions import bump_permission_version
+from shared.serialization import FAST_SERIALIZATION, fast_list_response
 import uuid
 from datetime import datetime
 
@@ -28,6 +30,7 @@ def create_user(user: UserCreate, db: Session = Depends(get_db), token: dict = D
     new_user.modified_at = None
     new_user.modified_by = None
     db.add(new_user)
+    bump_permission_version(db, token.get("custom:tenant_id"))
     db.commit()
     db.refresh(new_user)
     return new_user
@@ -54,6 +57,7 @@ def update_user(user: UserCreate, db: Session = Depends(get_db), token: dict = D
         raise HTTPException(status_code=404, detail="User not found")
     for k, v in user.dict().items():
         setattr(db_user, k, v)
+    bump_permission_version(db, token.get("custom:tenant_id"))
     db.commit()
     db.refresh(db_user)
     return db_user
@@ -68,6 +72,7 @@ def delete_user(db: Session = Depends(get_db), token: dict = Depends(verify_toke
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     db_user.is_active = False
+    bump_permission_version(db, token.get("custom:tenant_id"))
     db.commit()
     return {"message": "User deactivated successfully"}
 
@@ -78,6 +83,8 @@ def get_all_users(db: Session = Depends(get_db), token: dict = Depends(verify_to
     role = token.get("role")
     if not tenant_id or not user_id or not role:
         raise HTTPException(status_code=401, detail="Invalid token: tenant_id, user_id, or role missing")
+    if FAST_SERIALIZATION:
+        return fast_list_response(db, User, UserOut, User.is_active == True)
     users = db.query(User).filter(User.is_active == True).all()
     return users
 
@@ -91,10 +98,18 @@ def create_role(role: RoleCreate, db: Session = Depends(get_db), token: dict = D
         raise HTTPException(status_code=401, detail="Invalid token: tenant_id, user_id, or role missing")
     new_role = Role(**role.dict())
     db.add(new_role)
+    bump_permission_version(db, token.get("custom:tenant_id"))
     db.commit()
     db.refresh(new_role)
     return new_role
 
+@router.get("/role/all", response_model=list[RoleOut])
+def get_all_roles(db: Session = Depends(get_db), token: dict = Depends(verify_token)):
+    if FAST_SERIALIZATION:
+        return fast_list_response(db, Role, RoleOut, Role.is_active == True)
+    roles = db.query(Role).filter(Role.is_active == True).all() if hasattr(Role, 'is_active') else db.query(Role).all()
+    return roles
+
 @router.get("/role/{id}", response_model=RoleOut)
 def get_role(id: uuid.UUID, db: Session = Depends(get_db), token: dict = Depends(verify_token)):
     role = db.query(Role).filter(Role.id == id).first()
@@ -102,11 +117,6 @@ def get_role(id: uuid.UUID, db: Session = Depends(get_db), token: dict = Depends
         raise HTTPException(status_code=404, detail="Role not found")
     return role
 
-@router.get("/role/all", response_model=list[RoleOut])
-def get_all_roles(db: Session = Depends(get_db), token: dict = Depends(verify_token)):
-    roles = db.query(Role).filter(Role.is_active == True).all() if hasattr(Role, 'is_active') else db.query(Role).all()
-    return roles
-
 @router.put("/role/update/{id}", response_model=RoleOut)
 def update_role(id: uuid.UUID, role: RoleCreate, db: Session = Depends(get_db), token: dict = Depends(verify_token)):
     db_role = db.query(Role).filter(Role.id == id).first()
@@ -114,6 +124,7 @@ def update_role(id: uuid.UUID, role: RoleCreate, db: Session = Depends(get_db),
         raise HTTPException(status_code=404, detail="Role not found")
     for k, v in role.dict().items():
         setattr(db_role, k, v)
+    bump_permission_version(db, token.get("custom:tenant_id"))
     db.commit()
     db.refresh(db_role)
     return db_role
@@ -127,6 +138,7 @@ def delete_role(id: uuid.UUID, db: Session = Depends(get_db), token: dict = Depe
         db_role.is_active = False
     else:
         db.delete(db_role)
+    bump_permission_version(db, token.get("custom:tenant_id"))
     db.commit()
     return
 
@@ -135,10 +147,18 @@ def delete_role(id: uuid.UUID, db: Session = Depends(get_db), token: dict = Depe
 def create_permission(permission: PermissionCreate, db: Session = Depends(get_db), token: dict = Depends(verify_token)):
     new_permission = Permission(**permission.dict())
     db.add(new_permission)
+    bump_permission_version(db, token.get("custom:tenant_id"))
     db.commit()
     db.refresh(new_permission)
     return new_permission
 
+@router.get("/permission/all", response_model=list[PermissionOut])
+def get_all_permissions(db: Session = Depends(get_db), token: dict = Depends(verify_token)):
+    if FAST_SERIALIZATION:
+        return fast_list_response(db, Permission, PermissionOut)
+    permissions = db.query(Permission).all()
+    return permissions
+
 @router.get("/permission/{id}", response_model=PermissionOut)
 def get_permission(id: uuid.UUID, db: Session = Depends(get_db), token: dict = Depends(verify_token)):
     permission = db.query(Permission).filter(Permission.id == id).first()
@@ -146,11 +166,6 @@ def get_permission(id: uuid.UUID, db: Session = Depends(get_db), token: dict = D
         raise HTTPException(status_code=404, detail="Permission not found")
     return permission
 
-@router.get("/permission/all", response_model=list[PermissionOut])
-def get_all_permissions(db: Session = Depends(get_db), token: dict = Depends(verify_token)):
-    permissions = db.query(Permission).all()
-    return permissions
-
 @router.put("/permission/update/{id}", response_model=PermissionOut)
 def update_permission(id: uuid.UUID, permission: PermissionCreate, db: Session = Depends(get_db), token: dict = Depends(verify_token)):
     db_permission = db.query(Permission).filter(Permission.id == id).first()
@@ -158,6 +173,7 @@ def update_permission(id: uuid.UUID, permission: PermissionCreate, db: Session =
         raise HTTPException(status_code=404, detail="Permission not found")
     for k, v in permission.dict().items():
         setattr(db_permission, k, v)
+    bump_permission_version(db, token.get("custom:tenant_id"))
     db.commit()
     db.refresh(db_permission)
     return db_permission
@@ -168,6 +184,7 @@ def delete_permission(id: uuid.UUID, db: Session = Depends(get_db), token: dict
     if not db_permission:
         raise HTTPException(status_code=404, detail="Permission not found")
     db.delete(db_permission)
+    bump_permission_version(db, token.get("custom:tenant_id"))
     db.commit()
     return
 
@@ -176,6 +193,7 @@ def delete_permission(id: uuid.UUID, db: Session = Depends(get_db), token: dict
 def assign_role_permission(rp: RolePermissionCreate, db: Session = Depends(get_db), token: dict = Depends(verify_token)):
     new_rp = RolePermission(**rp.dict())
     db.add(new_rp)
+    bump_permission_version(db, token.get("custom:tenant_id"))
     db.commit()
     db.refresh(new_rp)
     return new_rp
@@ -186,6 +204,7 @@ def remove_role_permission(id: uuid.UUID, db: Session = Depends(get_db), token:
     if not rp:
         raise HTTPException(status_code=404, detail="RolePermission not found")
     db.delete(rp)
+    bump_permission_version(db, token.get("custom:tenant_id"))
     db.commit()
     return
 